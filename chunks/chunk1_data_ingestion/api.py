@@ -1,10 +1,21 @@
+import asyncio
 import json
-import psycopg2
+import sys
+import asyncpg
 import redis
-from fastapi import FastAPI, HTTPException
-from datetime import datetime
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import AsyncIterator, List, Literal, Optional, Tuple
+sys.path.append('.')
+
+from src.connections import async_health_check, close_async_pools, get_async_pg_pool, get_async_redis
+from chunks.chunk1_data_ingestion.processors.cache_manager import SingleFlight, read_price_window, store_price_window
+from chunks.chunk1_data_ingestion.processors.range_encoder import ENCODERS, records_to_batch
+
+# Errors raised by asyncpg when a query fails or the database cannot be reached
+DB_ERRORS = (asyncpg.PostgresError, asyncpg.InterfaceError, OSError, asyncio.TimeoutError)
 
 # Pydantic Models - A simplified version for API responses
 class FearGreedResponse(BaseModel):
@@ -28,27 +39,32 @@ class SentimentResponse(BaseModel):
     volume: int
     mentions: int
 
-# --- Database and Cache Connections ---
-def get_db_connection():
-    return psycopg2.connect(
-        host="localhost",
-        database="trading_framework",
-        user="user",
-        password="password"
-    )
+class SnapshotResponse(BaseModel):
+    fear_greed: Optional[FearGreedResponse] = None
+    prices: List[MarketDataResponse]
+    sentiment: List[SentimentResponse]
 
-def get_redis_connection():
-    return redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+app = FastAPI()
 
+# Concurrent cache misses for the same price window share one database query
+_price_window_loads = SingleFlight()
 
-app = FastAPI()
+@app.on_event("shutdown")
+async def shutdown():
+    await close_async_pools()
+
+@app.get("/health")
+async def get_health():
+    status = await async_health_check()
+    if not all(status.values()):
+        raise HTTPException(status_code=503, detail=status)
+    return status
 
 @app.get("/latest/fear_greed", response_model=FearGreedResponse)
-def get_latest_fear_greed():
+async def get_latest_fear_greed():
     redis_key = "fear_greed_index:latest"
     try:
-        redis_conn = get_redis_connection()
-        cached_data = redis_conn.get(redis_key)
+        cached_data = await get_async_redis().get(redis_key)
         if cached_data:
             data = json.loads(cached_data)
             data['timestamp'] = datetime.fromtimestamp(int(data['timestamp']))
@@ -56,44 +72,54 @@ def get_latest_fear_greed():
     except redis.RedisError as e:
         print(f"Redis error: {e}") # Log error but proceed to DB
 
-    db_conn = None
     try:
-        db_conn = get_db_connection()
-        with db_conn.cursor() as cur:
-            cur.execute("SELECT timestamp, value, value_classification FROM trading_framework.fear_greed_index ORDER BY timestamp DESC LIMIT 1")
-            record = cur.fetchone()
-            if not record:
-                raise HTTPException(status_code=404, detail="Fear & Greed data not found.")
-            return {"timestamp": record[0], "value": record[1], "value_classification": record[2]}
-    except psycopg2.Error as e:
+        pool = await get_async_pg_pool()
+        record = await pool.fetchrow("SELECT timestamp, value, value_classification FROM trading_framework.fear_greed_index ORDER BY timestamp DESC LIMIT 1")
+    except DB_ERRORS as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
-    finally:
-        if db_conn:
-            db_conn.close()
+    if not record:
+        raise HTTPException(status_code=404, detail="Fear & Greed data not found.")
+    return {"timestamp": record[0], "value": record[1], "value_classification": record[2]}
+
+async def _load_price_window(asset_id: int, limit: int, generation: Optional[str]) -> Optional[str]:
+    """Queries a price window, serializes it as the response body and caches it under `generation`."""
+    pool = await get_async_pg_pool()
+    records = await pool.fetch("SELECT asset_id, timestamp, open::float8, high::float8, low::float8, close::float8 FROM trading_framework.market_data WHERE asset_id = $1 ORDER BY timestamp DESC LIMIT $2", asset_id, limit)
+    if not records:
+        return None
+    body = json.dumps([{"asset_id": r[0], "timestamp": r[1].isoformat(), "open": r[2], "high": r[3], "low": r[4], "close": r[5]} for r in records])
+    if generation is not None:
+        try:
+            await store_price_window(get_async_redis(), asset_id, generation, limit, body)
+        except redis.RedisError as e:
+            print(f"Redis error: {e}")
+    return body
 
 @app.get("/latest/prices", response_model=List[MarketDataResponse])
-def get_latest_prices(asset_id: int = 1, limit: int = 100):
-    db_conn = None
+async def get_latest_prices(asset_id: int = 1, limit: int = Query(100, ge=1, le=10000)):
+    # Read-through cache: cached windows are returned as stored, without re-serializing
+    generation = None
+    try:
+        generation, cached_body = await read_price_window(get_async_redis(), asset_id, limit)
+        if cached_body:
+            return Response(content=cached_body, media_type="application/json")
+    except redis.RedisError as e:
+        print(f"Redis error: {e}")
+
     try:
-        db_conn = get_db_connection()
-        with db_conn.cursor() as cur:
-            cur.execute("SELECT asset_id, timestamp, open, high, low, close FROM trading_framework.market_data WHERE asset_id = %s ORDER BY timestamp DESC LIMIT %s", (asset_id, limit))
-            records = cur.fetchall()
-            if not records:
-                raise HTTPException(status_code=404, detail=f"Price data not found for asset_id {asset_id}.")
-            return [{"asset_id": r[0], "timestamp": r[1], "open": r[2], "high": r[3], "low": r[4], "close": r[5]} for r in records]
-    except psycopg2.Error as e:
+        body = await _price_window_loads.do((asset_id, limit, generation),
+                                            lambda: _load_price_window(asset_id, limit, generation))
+    except DB_ERRORS as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
-    finally:
-        if db_conn:
-            db_conn.close()
+    if body is None:
+        raise HTTPException(status_code=404, detail=f"Price data not found for asset_id {asset_id}.")
+    return Response(content=body, media_type="application/json")
 
 @app.get("/latest/sentiment", response_model=SentimentResponse)
-def get_latest_sentiment(asset_id: int = 1, source: str = 'simulated_twitter'):
+async def get_latest_sentiment(asset_id: int = 1, source: str = 'simulated_twitter'):
     redis_key = f"social_sentiment:{asset_id}:{source}:latest"
     try:
-        redis_conn = get_redis_connection()
-        cached_data = redis_conn.get(redis_key)
+        cached_data = await get_async_redis().get(redis_key)
         if cached_data:
             data = json.loads(cached_data)
             data['timestamp'] = datetime.fromisoformat(data['timestamp'])
@@ -101,17 +127,175 @@ def get_latest_sentiment(asset_id: int = 1, source: str = 'simulated_twitter'):
     except redis.RedisError as e:
         print(f"Redis error: {e}")
 
-    db_conn = None
     try:
-        db_conn = get_db_connection()
-        with db_conn.cursor() as cur:
-            cur.execute("SELECT asset_id, timestamp, source, sentiment_score, volume, mentions FROM trading_framework.social_sentiment WHERE asset_id = %s AND source = %s ORDER BY timestamp DESC LIMIT 1", (asset_id, source))
-            record = cur.fetchone()
-            if not record:
-                raise HTTPException(status_code=404, detail=f"Sentiment data not found for asset_id {asset_id} and source {source}.")
-            return {"asset_id": record[0], "timestamp": record[1], "source": record[2], "sentiment_score": record[3], "volume": record[4], "mentions": record[5]}
-    except psycopg2.Error as e:
+        pool = await get_async_pg_pool()
+        record = await pool.fetchrow("SELECT asset_id, timestamp, source, sentiment_score::float8, volume, mentions FROM trading_framework.social_sentiment WHERE asset_id = $1 AND source = $2 ORDER BY timestamp DESC LIMIT 1", asset_id, source)
+    except DB_ERRORS as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+    if not record:
+        raise HTTPException(status_code=404, detail=f"Sentiment data not found for asset_id {asset_id} and source {source}.")
+    return {"asset_id": record[0], "timestamp": record[1], "source": record[2], "sentiment_score": record[3], "volume": record[4], "mentions": record[5]}
+
+# Latest bar per asset and latest reading per (asset, source) for the requested pairs,
+# plus the latest Fear & Greed value if requested, in one round trip
+SNAPSHOT_FALLBACK_QUERY = """
+SELECT
+    CASE WHEN $3 THEN (
+        SELECT json_build_object('timestamp', timestamp, 'value', value, 'value_classification', value_classification)
+        FROM trading_framework.fear_greed_index ORDER BY timestamp DESC LIMIT 1) END,
+    (SELECT coalesce(json_agg(b), '[]') FROM unnest($1::int[]) AS a(asset_id)
+        CROSS JOIN LATERAL (
+            SELECT m.asset_id, m.timestamp, m.open::float8 AS open, m.high::float8 AS high,
+                   m.low::float8 AS low, m.close::float8 AS close
+            FROM trading_framework.market_data m
+            WHERE m.asset_id = a.asset_id ORDER BY m.timestamp DESC LIMIT 1) b),
+    (SELECT coalesce(json_agg(r), '[]') FROM unnest($4::int[], $2::text[]) AS p(asset_id, source)
+        CROSS JOIN LATERAL (
+            SELECT s.asset_id, s.timestamp, s.source, s.sentiment_score::float8 AS sentiment_score, s.volume, s.mentions
+            FROM trading_framework.social_sentiment s
+            WHERE s.asset_id = p.asset_id AND s.source = p.source ORDER BY s.timestamp DESC LIMIT 1) r)
+"""
+
+async def _snapshot_fallback(fear_greed: bool, bar_assets: List[int],
+                             sentiment_pairs: List[Tuple[int, str]]) -> Tuple[Optional[dict], List[dict], List[dict]]:
+    """Loads every snapshot entry that missed the cache with a single query."""
+    pool = await get_async_pg_pool()
+    record = await pool.fetchrow(SNAPSHOT_FALLBACK_QUERY, bar_assets, [source for _, source in sentiment_pairs],
+                                 fear_greed, [asset_id for asset_id, _ in sentiment_pairs])
+    return (json.loads(record[0]) if record[0] else None), json.loads(record[1]), json.loads(record[2])
+
+@app.get("/latest/snapshot", response_model=SnapshotResponse)
+async def get_latest_snapshot(asset_ids: List[int] = Query(..., max_length=1000),
+                              sources: List[str] = Query(['simulated_twitter']),
+                              include_fear_greed: bool = True):
+    """
+    Returns the latest Fear & Greed value, and the latest bar and sentiment per
+    source for each asset. Every entry is read from Redis with one MGET; entries
+    that miss are loaded from PostgreSQL with one query and written back to Redis.
+    Assets or sources without data are left out.
+    """
+    asset_ids = list(dict.fromkeys(asset_ids))
+    sentiment_pairs = [(asset_id, source) for asset_id in asset_ids for source in dict.fromkeys(sources)]
+    fear_greed_key = "fear_greed_index:latest"
+    bar_keys = [f"market_data:{asset_id}:latest" for asset_id in asset_ids]
+    sentiment_keys = [f"social_sentiment:{asset_id}:{source}:latest" for asset_id, source in sentiment_pairs]
+    keys = ([fear_greed_key] if include_fear_greed else []) + bar_keys + sentiment_keys
+
+    redis_conn = get_async_redis()
+    try:
+        cached = await redis_conn.mget(keys)
+    except redis.RedisError as e:
+        print(f"Redis error: {e}") # Serve everything from the database
+        cached = [None] * len(keys)
+
+    fear_greed = None
+    if include_fear_greed:
+        cached_fear_greed, cached = cached[0], cached[1:]
+        if cached_fear_greed:
+            fear_greed = json.loads(cached_fear_greed)
+            fear_greed['timestamp'] = datetime.fromtimestamp(int(fear_greed['timestamp']))
+    cached_bars, cached_sentiment = cached[:len(bar_keys)], cached[len(bar_keys):]
+
+    prices = [json.loads(value) for value in cached_bars if value]
+    sentiment = [json.loads(value) for value in cached_sentiment if value]
+    missing_bars = [asset_id for asset_id, value in zip(asset_ids, cached_bars) if not value]
+    missing_sentiment = [pair for pair, value in zip(sentiment_pairs, cached_sentiment) if not value]
+
+    if missing_bars or missing_sentiment or (include_fear_greed and fear_greed is None):
+        try:
+            db_fear_greed, db_prices, db_sentiment = await _snapshot_fallback(
+                include_fear_greed and fear_greed is None, missing_bars, missing_sentiment)
+        except DB_ERRORS as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {e}")
+        fear_greed = fear_greed or db_fear_greed
+        prices.extend(db_prices)
+        sentiment.extend(db_sentiment)
+
+        # Write the loaded entries back, unless a connector has cached a newer one meanwhile
+        try:
+            async with redis_conn.pipeline(transaction=False) as pipe:
+                for bar in db_prices:
+                    pipe.set(f"market_data:{bar['asset_id']}:latest", json.dumps(bar), ex=3600, nx=True)
+                for reading in db_sentiment:
+                    pipe.set(f"social_sentiment:{reading['asset_id']}:{reading['source']}:latest",
+                             json.dumps(reading), ex=3600, nx=True)
+                await pipe.execute()
+        except redis.RedisError as e:
+            print(f"Redis error: {e}")
+
+    return {"fear_greed": fear_greed, "prices": prices, "sentiment": sentiment}
+
+# Rows fetched per keyset query while streaming a range; bounds the memory of one response
+RANGE_CHUNK_SIZE = 50_000
+
+RANGE_PAGE_QUERY = """
+SELECT count(*), max(timestamp) FROM (
+    SELECT timestamp FROM trading_framework.market_data
+    WHERE asset_id = $1 AND timestamp > $2 AND timestamp < $3
+    ORDER BY timestamp LIMIT $4) page
+"""
+
+RANGE_CHUNK_QUERY = """
+SELECT asset_id, timestamp, open::float8, high::float8, low::float8, close::float8, volume::float8
+FROM trading_framework.market_data
+WHERE asset_id = $1 AND timestamp > $2 AND timestamp <= $3
+ORDER BY timestamp LIMIT $4
+"""
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+async def _stream_range(asset_id: int, records: list, until: datetime, encoder) -> AsyncIterator[bytes]:
+    """
+    Yields the encoded rows up to `until`, starting from the first chunk already fetched,
+    one keyset query of RANGE_CHUNK_SIZE rows at a time.
+    """
+    pool = await get_async_pg_pool()
+    while True:
+        data = encoder.encode(records_to_batch(records))
+        if data:
+            yield data
+        if len(records) < RANGE_CHUNK_SIZE:
+            break
+        records = await pool.fetch(RANGE_CHUNK_QUERY, asset_id, records[-1][1], until, RANGE_CHUNK_SIZE)
+    yield encoder.finish()
+
+@app.get("/prices/range")
+async def get_price_range(asset_id: int, start: datetime, end: Optional[datetime] = None,
+                          after: Optional[datetime] = None, limit: Optional[int] = Query(None, ge=1),
+                          format: Literal["json", "arrow", "parquet"] = "json"):
+    """
+    Streams the bars of an asset with start <= timestamp < end, oldest first.
+
+    The body is streamed in chunks, so any range can be requested at once.
+    With `limit`, one page is returned and the X-Next-Cursor header carries the
+    timestamp to pass as `after` for the next page; it is absent on the last
+    page. `format` selects a JSON array, an Arrow IPC stream
+    (`pyarrow.ipc.open_stream(body).read_pandas()`) or a Parquet file.
+    Naive timestamps are taken as UTC.
+    """
+    start, end, after = _as_utc(start), _as_utc(end or datetime.max), _as_utc(after)
+    # The queries take an exclusive lower bound; timestamps have microsecond precision
+    lower = start - timedelta(microseconds=1)
+    if after is not None:
+        lower = max(lower, after)
+    until = end - timedelta(microseconds=1)
+
+    headers = {}
+    try:
+        pool = await get_async_pg_pool()
+        if limit is not None:
+            count, last = await pool.fetchrow(RANGE_PAGE_QUERY, asset_id, lower, end, limit)
+            if count == limit:
+                headers["X-Next-Cursor"] = last.isoformat()
+            until = last or lower
+        # Fetch the first chunk up front, so database errors get an error status
+        records = await pool.fetch(RANGE_CHUNK_QUERY, asset_id, lower, until, RANGE_CHUNK_SIZE)
+    except DB_ERRORS as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
-    finally:
-        if db_conn:
-            db_conn.close()
+
+    encoder = ENCODERS[format]()
+    return StreamingResponse(_stream_range(asset_id, records, until, encoder),
+                             media_type=encoder.media_type, headers=headers)
@@ -3,57 +3,47 @@ import json
 import psycopg2
 import redis
 import os
+import sys
 from datetime import datetime
+sys.path.append('.')
 
-def get_db_connection():
-    """Establishes connection to the PostgreSQL database."""
-    return psycopg2.connect(
-        host="localhost",
-        database="trading_framework",
-        user="user",
-        password="password"
-    )
+from src.connections import db_connection, get_redis_connection
+from src.event_bus import FearGreedUpdated, publish
+from chunks.chunk1_data_ingestion.connectors.http_client import get_json
+from chunks.chunk1_data_ingestion.processors.bulk_writer import bulk_insert
 
-def get_redis_connection():
-    """Establishes connection to the Redis server."""
-    return redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
-
-def fetch_fear_greed_index():
+def fetch_fear_greed_index(limit=1):
     """
     Fetches the latest Fear & Greed Index data from alternative.me,
     stores it in PostgreSQL, and caches it in Redis.
+
+    A `limit` above 1 backfills that many days of history (0 fetches all of it).
     """
-    api_url = "https://api.alternative.me/fng/?limit=1"
+    api_url = "https://api.alternative.me/fng/"
     redis_key = "fear_greed_index:latest"
     
-    db_conn = None
     try:
-        # Fetch data from API
-        response = requests.get(api_url)
-        response.raise_for_status()
-        data = response.json()['data'][0]
-        
-        # Connect to databases
-        db_conn = get_db_connection()
-        redis_conn = get_redis_connection()
+        # Fetch data from API, within the provider's rate limit and with retries
+        history = get_json("alternative_me", api_url, params={"limit": limit})['data']
+        data = history[0] # Newest first
         
         # Prepare data for insertion
-        timestamp = datetime.fromtimestamp(int(data['timestamp']))
-        value = int(data['value'])
-        value_classification = data['value_classification']
+        records_to_insert = [
+            (datetime.fromtimestamp(int(d['timestamp'])), int(d['value']), d['value_classification']) for d in history
+        ]
         
-        # Store in PostgreSQL
-        with db_conn.cursor() as cur:
-            cur.execute(
-                """INSERT INTO trading_framework.fear_greed_index (timestamp, value, value_classification)
-                   VALUES (%s, %s, %s)
-                   ON CONFLICT (timestamp) DO NOTHING;""",
-                (timestamp, value, value_classification)
-            )
-            db_conn.commit()
-            print(f"Successfully stored value {value} from {timestamp.isoformat()} in PostgreSQL.")
+        # Store in PostgreSQL via COPY, on a connection borrowed from the shared pool
+        with db_connection() as db_conn:
+            inserted = bulk_insert(db_conn, "fear_greed_index", records_to_insert)
+            print(f"Successfully stored {inserted} new of {len(records_to_insert)} values (latest {data['value']}) in PostgreSQL.")
+
+        # Let downstream stages react to the new value
+        if inserted:
+            latest = records_to_insert[0]
+            publish(FearGreedUpdated(timestamp=latest[0], value=latest[1], value_classification=latest[2]))
 
         # Cache in Redis
+        redis_conn = get_redis_connection()
         redis_conn.set(redis_key, json.dumps(data), ex=3600) # Cache for 1 hour
         print(f"Successfully cached data in Redis under key '{redis_key}'.")
         
@@ -65,9 +55,6 @@ def fetch_fear_greed_index():
     except (psycopg2.Error, redis.RedisError) as e:
         print(f"Database or cache error: {e}")
         return None
-    finally:
-        if db_conn:
-            db_conn.close()
 
 if __name__ == "__main__":
     fetch_fear_greed_index()
\ No newline at end of file
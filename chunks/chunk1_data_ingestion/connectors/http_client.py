@@ -0,0 +1,56 @@
+import sys
+import threading
+
+import requests
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+sys.path.append('.')
+
+from chunks.chunk1_data_ingestion.scheduler.rate_limiter import get_rate_limiter, load_ingestion_config
+
+_local = threading.local()
+
+def _session() -> requests.Session:
+    """Returns this thread's HTTP session, which keeps connections to each provider alive between calls."""
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+def _is_retryable(error: BaseException) -> bool:
+    """Retries connection errors, timeouts, rate limiting (429) and server errors (5xx)."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return False
+
+def get_json(provider: str, url: str, params=None):
+    """
+    GETs a JSON document from a provider's API.
+
+    Every attempt, including retries, first takes a token from the provider's
+    rate limiter. Transient failures are retried with jittered exponential
+    backoff; the last error is re-raised once the attempts are exhausted.
+
+    Args:
+        provider (str): The provider name in configs/chunks/chunk1.yaml, e.g. 'coingecko'.
+        url (str): The request URL.
+        params (dict, optional): Query parameters.
+
+    Returns:
+        The decoded JSON response.
+    """
+    retry = load_ingestion_config().get("retry", {})
+    limiter = get_rate_limiter(provider)
+
+    for attempt in Retrying(
+        retry=retry_if_exception(_is_retryable),
+        stop=stop_after_attempt(retry.get("max_attempts", 5)),
+        wait=wait_random_exponential(multiplier=1, max=retry.get("max_backoff_seconds", 60)),
+        reraise=True,
+    ):
+        with attempt:
+            if limiter is not None:
+                limiter.acquire()
+            response = _session().get(url, params=params, timeout=retry.get("request_timeout_seconds", 10))
+            response.raise_for_status()
+            return response.json()
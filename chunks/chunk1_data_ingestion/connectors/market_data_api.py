@@ -1,74 +1,98 @@
 import requests
 import json
+import math
 import psycopg2
 import redis
 import os
-from datetime import datetime
+import sys
+import time
+from datetime import datetime, timezone
+sys.path.append('.')
 
-def get_db_connection():
-    """Establishes connection to the PostgreSQL database."""
-    return psycopg2.connect(
-        host="localhost",
-        database="trading_framework",
-        user="user",
-        password="password"
-    )
+from src.connections import db_connection, get_redis_connection
+from src.event_bus import BarsIngested, publish
+from chunks.chunk1_data_ingestion.connectors.http_client import get_json
+from chunks.chunk1_data_ingestion.processors.bulk_writer import bulk_insert
+from chunks.chunk1_data_ingestion.processors.cache_manager import invalidate_price_windows
+from chunks.chunk1_data_ingestion.processors.watermarks import advance_watermark, get_watermark
 
-def get_redis_connection():
-    """Establishes connection to the Redis server."""
-    return redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+# Windows accepted by CoinGecko's OHLC endpoint, in days
+COINGECKO_OHLC_DAYS = (1, 7, 14, 30, 90, 180, 365)
 
-def fetch_market_ohlcv(coin_id="bitcoin", vs_currency="usd", days="1"):
+def _days_since(watermark_ms):
+    """Returns the smallest OHLC window, as CoinGecko's `days` parameter, that reaches back to the watermark."""
+    days_needed = math.ceil((time.time() * 1000 - watermark_ms) / 86_400_000)
+    for days in COINGECKO_OHLC_DAYS:
+        if days >= days_needed:
+            return str(days)
+    return "max"
+
+def fetch_market_ohlcv(coin_id="bitcoin", vs_currency="usd", days="1", asset_id=1):
     """
     Fetches market OHLCV data from CoinGecko, stores it in PostgreSQL,
     and caches the latest entry in Redis.
+
+    Fetching is incremental: the asset's watermark (the newest stored timestamp)
+    picks the smallest window that covers the gap, and only candles after it
+    are written. `days` is the window used when nothing is stored yet.
+
+    Returns the new candles, or an empty list if there were none.
     """
-    api_url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/ohlc?vs_currency={vs_currency}&days={days}"
+    api_url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/ohlc"
     redis_key = f"market_ohlcv:{coin_id}:{vs_currency}:latest"
     
-    db_conn = None
     try:
-        # Fetch data from API
-        response = requests.get(api_url)
-        response.raise_for_status()
-        data = response.json()
-        
+        # Borrow a pooled connection only for the database work, not while waiting on the API
+        with db_connection() as db_conn:
+            watermark = get_watermark(db_conn, "market_data", asset_id)
+        if watermark is not None:
+            days = _days_since(watermark)
+
+        # Fetch data from API, within CoinGecko's rate limit and with retries
+        data = get_json("coingecko", api_url, params={"vs_currency": vs_currency, "days": days})
+
         if not data:
             print("No data returned from API.")
             return None
 
-        # Connect to databases
-        db_conn = get_db_connection()
-        redis_conn = get_redis_connection()
-        
-        # The kickstart context has an 'assets' table. We should have a way to link this data to an asset.
-        # For now, we'll assume a static asset_id for simplicity, e.g., 1 for bitcoin.
-        # A real implementation would look up the asset_id from the 'assets' table.
-        asset_id = 1 # Static asset_id for bitcoin
+        # CoinGecko OHLC data format: [timestamp, open, high, low, close]; keep candles after the watermark
+        new_data = [d for d in data if watermark is None or d[0] > watermark]
+        if not new_data:
+            print(f"No OHLCV data newer than the watermark for asset {asset_id}.")
+            return []
 
-        # Store in PostgreSQL
-        with db_conn.cursor() as cur:
-            # Using executemany for bulk insertion
-            insert_query = """INSERT INTO trading_framework.market_data (asset_id, timestamp, open, high, low, close, volume)
-                              VALUES (%s, %s, %s, %s, %s, %s, %s) -- Volume is not provided by this endpoint, so we use 0
-                              ON CONFLICT (asset_id, timestamp) DO NOTHING;"""
-            
-            # CoinGecko OHLC data format: [timestamp, open, high, low, close]
-            # We add asset_id and a placeholder for volume
-            records_to_insert = [
-                (asset_id, datetime.fromtimestamp(d[0] / 1000), d[1], d[2], d[3], d[4], 0) for d in data
-            ]
-            
-            cur.executemany(insert_query, records_to_insert)
-            db_conn.commit()
-            print(f"Attempted to store {len(records_to_insert)} OHLCV records in PostgreSQL.")
+        # We add asset_id and a placeholder for volume (not provided by this endpoint)
+        records_to_insert = [
+            (asset_id, datetime.fromtimestamp(d[0] / 1000, tz=timezone.utc), d[1], d[2], d[3], d[4], 0)
+            for d in new_data
+        ]
+
+        # Store in PostgreSQL via COPY, on a connection borrowed from the shared pool
+        with db_connection() as db_conn:
+            inserted = bulk_insert(db_conn, "market_data", records_to_insert)
+        print(f"Stored {inserted} new OHLCV records for asset {asset_id} in PostgreSQL "
+              f"({len(data) - len(new_data)} at or before the watermark skipped).")
+
+        advance_watermark("market_data", asset_id, max(d[0] for d in new_data))
+
+        # Invalidate the API's cached price windows and let downstream stages react to the new bars
+        redis_conn = get_redis_connection()
+        if inserted:
+            invalidate_price_windows(redis_conn, asset_id)
+            publish(BarsIngested(timestamp=records_to_insert[-1][1], first_timestamp=records_to_insert[0][1],
+                                 asset_id=asset_id, count=inserted), redis_conn)
 
-        # Cache the latest entry in Redis
-        latest_record = data[-1]
+        # Cache the latest entry in Redis, raw and per asset in the API's response format
+        latest_record = new_data[-1]
         redis_conn.set(redis_key, json.dumps(latest_record), ex=3600) # Cache for 1 hour
+        latest_bar = records_to_insert[-1]
+        redis_conn.set(f"market_data:{asset_id}:latest", json.dumps({
+            "asset_id": asset_id, "timestamp": latest_bar[1].isoformat(),
+            "open": latest_bar[2], "high": latest_bar[3], "low": latest_bar[4], "close": latest_bar[5],
+        }), ex=3600)
         print(f"Successfully cached latest OHLCV data in Redis under key '{redis_key}'.")
         
-        return data
+        return new_data
         
     except requests.exceptions.RequestException as e:
         print(f"Error fetching data from API: {e}")
@@ -76,24 +100,17 @@ def fetch_market_ohlcv(coin_id="bitcoin", vs_currency="usd", days="1"):
     except (psycopg2.Error, redis.RedisError) as e:
         print(f"Database or cache error: {e}")
         return None
-    finally:
-        if db_conn:
-            db_conn.close()
 
 if __name__ == "__main__":
     # Before running, we should ensure the asset exists in the 'assets' table.
     # For this test, we'll manually insert it.
     try:
-        conn = get_db_connection()
-        with conn.cursor() as cur:
+        with db_connection() as conn, conn.cursor() as cur:
             cur.execute("""INSERT INTO trading_framework.assets (asset_id, symbol, name, base_currency, quote_currency)
                            VALUES (1, 'btc', 'Bitcoin', 'btc', 'usd')
                            ON CONFLICT (asset_id) DO NOTHING;""")
             conn.commit()
     except psycopg2.Error as e:
         print(f"Could not pre-insert asset: {e}")
-    finally:
-        if conn:
-            conn.close()
             
     fetch_market_ohlcv()
\ No newline at end of file
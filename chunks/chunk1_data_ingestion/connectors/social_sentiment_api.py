@@ -2,21 +2,14 @@ import json
 import psycopg2
 import redis
 import os
+import sys
 from datetime import datetime
-import random
-
-def get_db_connection():
-    """Establishes connection to the PostgreSQL database."""
-    return psycopg2.connect(
-        host="localhost",
-        database="trading_framework",
-        user="user",
-        password="password"
-    )
+sys.path.append('.')
 
-def get_redis_connection():
-    """Establishes connection to the Redis server."""
-    return redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+from src.connections import db_connection, get_redis_connection
+from src.event_bus import SentimentIngested, publish
+from chunks.chunk1_data_ingestion.processors.bulk_writer import bulk_insert
+import random
 
 def fetch_simulated_social_sentiment(asset_id=1, source="simulated_twitter"):
     """
@@ -25,7 +18,6 @@ def fetch_simulated_social_sentiment(asset_id=1, source="simulated_twitter"):
     """
     redis_key = f"social_sentiment:{asset_id}:{source}:latest"
     
-    db_conn = None
     try:
         # Generate simulated data
         simulated_data = {
@@ -37,28 +29,23 @@ def fetch_simulated_social_sentiment(asset_id=1, source="simulated_twitter"):
             "mentions": random.randint(50, 5000)
         }
         
-        # Connect to databases
-        db_conn = get_db_connection()
-        redis_conn = get_redis_connection()
-        
-        # Store in PostgreSQL
-        with db_conn.cursor() as cur:
-            cur.execute(
-                """INSERT INTO trading_framework.social_sentiment (timestamp, asset_id, source, sentiment_score, volume, mentions)
-                   VALUES (%s, %s, %s, %s, %s, %s)
-                   ON CONFLICT (timestamp, asset_id, source) DO NOTHING;""",
-                (
-                    simulated_data["timestamp"],
-                    simulated_data["asset_id"],
-                    simulated_data["source"],
-                    simulated_data["sentiment_score"],
-                    simulated_data["volume"],
-                    simulated_data["mentions"]
-                )
-            )
-            db_conn.commit()
+        # Store in PostgreSQL, on a connection borrowed from the shared pool
+        with db_connection() as db_conn:
+            bulk_insert(db_conn, "social_sentiment", [(
+                simulated_data["timestamp"],
+                simulated_data["asset_id"],
+                simulated_data["source"],
+                simulated_data["sentiment_score"],
+                simulated_data["volume"],
+                simulated_data["mentions"]
+            )])
             print(f"Successfully stored simulated sentiment from {simulated_data['timestamp'].isoformat()} in PostgreSQL.")
 
+        # Let downstream stages react to the new reading
+        redis_conn = get_redis_connection()
+        publish(SentimentIngested(timestamp=simulated_data["timestamp"], asset_id=asset_id, source=source,
+                                  sentiment_score=simulated_data["sentiment_score"]), redis_conn)
+
         # Cache in Redis (serializing datetime for JSON)
         cached_data = simulated_data.copy()
         cached_data['timestamp'] = simulated_data['timestamp'].isoformat()
@@ -70,9 +57,6 @@ def fetch_simulated_social_sentiment(asset_id=1, source="simulated_twitter"):
     except (psycopg2.Error, redis.RedisError) as e:
         print(f"Database or cache error: {e}")
         return None
-    finally:
-        if db_conn:
-            db_conn.close()
 
 if __name__ == "__main__":
     fetch_simulated_social_sentiment()
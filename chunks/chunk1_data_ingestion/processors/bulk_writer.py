@@ -0,0 +1,84 @@
+import csv
+import io
+import time
+from typing import Iterable, Sequence
+
+from psycopg2 import sql
+
+SCHEMA = "trading_framework"
+
+# Columns written by the connectors and the unique key each table deduplicates on
+TABLE_COLUMNS = {
+    "market_data": (("asset_id", "timestamp", "open", "high", "low", "close", "volume"), ("asset_id", "timestamp")),
+    "social_sentiment": (("timestamp", "asset_id", "source", "sentiment_score", "volume", "mentions"),
+                         ("timestamp", "asset_id", "source")),
+    "fear_greed_index": (("timestamp", "value", "value_classification"), ("timestamp",)),
+}
+
+def _batches(rows: Iterable[Sequence], batch_size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _copy_buffer(rows: Sequence[Sequence]) -> io.StringIO:
+    """Serializes rows as CSV for COPY; None becomes an unquoted empty field, which COPY reads as NULL."""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    buffer.seek(0)
+    return buffer
+
+def bulk_insert(db_conn, table: str, rows: Iterable[Sequence], batch_size: int = 50000) -> int:
+    """
+    Writes rows into one of the ingestion tables with COPY.
+
+    Each batch is streamed with COPY into a temporary staging table and merged
+    into the target with INSERT ... ON CONFLICT DO NOTHING, in one transaction
+    per batch, so rows that already exist are skipped. Throughput is reported
+    for every batch.
+
+    Args:
+        db_conn: An open psycopg2 connection, e.g. from src.connections.db_connection().
+        table (str): The target table ('market_data', 'social_sentiment' or 'fear_greed_index').
+        rows (Iterable[Sequence]): Rows in the column order of TABLE_COLUMNS[table].
+        batch_size (int): Rows per COPY batch.
+
+    Returns:
+        int: The number of new rows written.
+    """
+    columns, conflict_columns = TABLE_COLUMNS[table]
+    column_list = sql.SQL(", ").join(map(sql.Identifier, columns))
+    staging = sql.Identifier(f"staging_{table}")
+
+    create_staging = sql.SQL(
+        "CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {columns} FROM {target} WITH NO DATA"
+    ).format(staging=staging, columns=column_list, target=sql.Identifier(SCHEMA, table))
+    copy = sql.SQL("COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)").format(
+        staging=staging, columns=column_list)
+    merge = sql.SQL(
+        "INSERT INTO {target} ({columns}) SELECT {columns} FROM {staging} ON CONFLICT ({conflict}) DO NOTHING"
+    ).format(target=sql.Identifier(SCHEMA, table), columns=column_list, staging=staging,
+             conflict=sql.SQL(", ").join(map(sql.Identifier, conflict_columns)))
+
+    total_inserted = 0
+    try:
+        for number, batch in enumerate(_batches(rows, batch_size), start=1):
+            started = time.perf_counter()
+            with db_conn.cursor() as cur:
+                cur.execute(create_staging)
+                cur.copy_expert(copy.as_string(db_conn), _copy_buffer(batch))
+                cur.execute(merge)
+                inserted = cur.rowcount
+            db_conn.commit()
+            elapsed = time.perf_counter() - started
+            total_inserted += inserted
+            print(f"Batch {number} into {table}: {len(batch)} rows staged, {inserted} new, "
+                  f"{len(batch) / elapsed if elapsed > 0 else float('inf'):,.0f} rows/sec.")
+    except Exception:
+        db_conn.rollback()
+        raise
+    return total_inserted
@@ -0,0 +1,75 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# Cached price windows live under a per-asset generation. Writers invalidate every
+# window of an asset at once by bumping the generation; a window is stored with the
+# generation it was read for and is only served while that is still current.
+PRICE_WINDOW_TTL_SECONDS = 300
+
+def _generation_key(asset_id: int) -> str:
+    return f"price_window:{asset_id}:generation"
+
+def _window_key(asset_id: int, limit: int) -> str:
+    return f"price_window:{asset_id}:{limit}"
+
+async def read_price_window(redis_conn, asset_id: int, limit: int) -> Tuple[str, Optional[str]]:
+    """
+    Looks up a cached price window, reading the generation and the window in
+    one round trip.
+
+    Args:
+        redis_conn (redis.asyncio.Redis): The async Redis client.
+        asset_id (int): The asset.
+        limit (int): The number of most recent bars in the window.
+
+    Returns:
+        Tuple[str, Optional[str]]: The asset's current cache generation and the cached
+            JSON body, or None on a miss. Store a miss under the returned generation.
+    """
+    generation, cached = await redis_conn.mget(_generation_key(asset_id), _window_key(asset_id, limit))
+    generation = generation or '0'
+    if cached is None:
+        return generation, None
+    cached_generation, _, body = cached.partition(':')
+    return generation, body if cached_generation == generation else None
+
+async def store_price_window(redis_conn, asset_id: int, generation: str, limit: int, body: str):
+    """
+    Caches a price window under the generation it was read for. If a writer
+    invalidated the asset in the meantime, the window is never served.
+    """
+    await redis_conn.set(_window_key(asset_id, limit), f"{generation}:{body}", ex=PRICE_WINDOW_TTL_SECONDS)
+
+def invalidate_price_windows(redis_conn, asset_id: int):
+    """Invalidates every cached price window of an asset; called by writers after storing new bars."""
+    redis_conn.incr(_generation_key(asset_id))
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one.
+
+    The first caller for a key starts the loader as a task of its own; callers
+    that arrive while it is running await the same result instead of issuing
+    their own query. A cancelled caller stops waiting without cancelling the
+    load, so the other callers still get its result.
+    """
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    def _finish(self, key: Hashable, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception() # Mark a failure as retrieved when every caller was cancelled
+
+    async def do(self, key: Hashable, loader: Callable[[], Awaitable]):
+        """
+        Returns the result of `loader()`, shared with concurrent calls for `key`.
+        An exception raised by the loader is raised to every waiting caller.
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
@@ -0,0 +1,120 @@
+import json
+from typing import Sequence
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Columns of a price range response
+PRICE_COLUMNS = ("asset_id", "timestamp", "open", "high", "low", "close", "volume")
+
+PRICE_SCHEMA = pa.schema([
+    ("asset_id", pa.int32()),
+    ("timestamp", pa.timestamp("us", tz="UTC")),
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.float64()),
+])
+
+def records_to_batch(records: Sequence[Sequence]) -> pa.RecordBatch:
+    """Converts rows in PRICE_COLUMNS order into an Arrow record batch."""
+    columns = list(zip(*records)) if records else [[] for _ in PRICE_COLUMNS]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, PRICE_SCHEMA)],
+        schema=PRICE_SCHEMA)
+
+class _ChunkSink:
+    """A write-only file object that hands out what has been written since the last drain."""
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+class JsonEncoder:
+    """Encodes batches as one JSON array of row objects, written incrementally."""
+    media_type = "application/json"
+
+    def __init__(self):
+        self._first = True
+
+    def encode(self, batch: pa.RecordBatch) -> bytes:
+        rows = batch.to_pylist()
+        if not rows:
+            return b""
+        body = ",".join(json.dumps({**row, "timestamp": row["timestamp"].isoformat()}) for row in rows)
+        prefix = "[" if self._first else ","
+        self._first = False
+        return (prefix + body).encode()
+
+    def finish(self) -> bytes:
+        return b"[]" if self._first else b"]"
+
+class ArrowStreamEncoder:
+    """
+    Encodes batches in the Arrow IPC streaming format. Read it with
+    `pyarrow.ipc.open_stream(body).read_pandas()`.
+    """
+    media_type = "application/vnd.apache.arrow.stream"
+
+    def __init__(self):
+        self._sink = _ChunkSink()
+        self._writer = pa.ipc.new_stream(pa.PythonFile(self._sink, mode="w"), PRICE_SCHEMA)
+
+    def encode(self, batch: pa.RecordBatch) -> bytes:
+        if batch.num_rows:
+            self._writer.write_batch(batch)
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+class ParquetEncoder:
+    """
+    Encodes batches as a Parquet file with one row group per batch. Read it
+    with `pandas.read_parquet(io.BytesIO(body))`.
+    """
+    media_type = "application/vnd.apache.parquet"
+
+    def __init__(self):
+        self._sink = _ChunkSink()
+        self._writer = pq.ParquetWriter(pa.PythonFile(self._sink, mode="w"), PRICE_SCHEMA, compression="zstd")
+
+    def encode(self, batch: pa.RecordBatch) -> bytes:
+        if batch.num_rows:
+            self._writer.write_batch(batch)
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+ENCODERS = {
+    "json": JsonEncoder,
+    "arrow": ArrowStreamEncoder,
+    "parquet": ParquetEncoder,
+}
@@ -0,0 +1,72 @@
+import sys
+from typing import Optional
+
+import redis
+from psycopg2 import sql
+sys.path.append('.')
+
+from src.connections import get_redis_connection
+
+# Tables with an ingestion watermark and the column that identifies the asset
+WATERMARK_TABLES = {
+    "market_data": "asset_id",
+}
+
+# Only ever moves the watermark forward, so concurrent writers cannot roll it back
+_ADVANCE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current or tonumber(current) < tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[1], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+def _watermark_key(table: str, asset_id: int) -> str:
+    return f"ingestion_watermark:{table}:{asset_id}"
+
+def get_watermark(db_conn, table: str, asset_id: int) -> Optional[int]:
+    """
+    Returns the timestamp of the newest stored row for an asset, in epoch
+    milliseconds, or None if nothing has been stored yet.
+
+    The watermark is read from Redis; on a miss or a Redis error it is taken
+    from the table itself and written back to Redis.
+    """
+    key = _watermark_key(table, asset_id)
+    try:
+        cached = get_redis_connection().get(key)
+        if cached is not None:
+            return int(cached)
+    except redis.RedisError as e:
+        print(f"Redis error reading watermark {key}, falling back to PostgreSQL: {e}")
+
+    with db_conn.cursor() as cur:
+        cur.execute(
+            sql.SQL("SELECT (EXTRACT(EPOCH FROM MAX(timestamp)) * 1000)::BIGINT FROM {table} WHERE {column} = %s").format(
+                table=sql.Identifier("trading_framework", table),
+                column=sql.Identifier(WATERMARK_TABLES[table])),
+            (asset_id,)
+        )
+        watermark = cur.fetchone()[0]
+    db_conn.rollback() # Read-only; end the transaction before the connection is reused
+
+    if watermark is not None:
+        advance_watermark(table, asset_id, watermark)
+    return watermark
+
+def advance_watermark(table: str, asset_id: int, timestamp_ms: int) -> bool:
+    """
+    Moves an asset's watermark forward to `timestamp_ms` (epoch milliseconds).
+    An older timestamp leaves it unchanged.
+
+    Returns:
+        bool: True if the watermark moved. Redis errors are reported and return
+            False; the table remains the source of truth.
+    """
+    key = _watermark_key(table, asset_id)
+    try:
+        return bool(get_redis_connection().eval(_ADVANCE_SCRIPT, 1, key, int(timestamp_ms)))
+    except redis.RedisError as e:
+        print(f"Redis error advancing watermark {key}: {e}")
+        return False
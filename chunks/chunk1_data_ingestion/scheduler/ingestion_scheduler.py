@@ -0,0 +1,170 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import psycopg2
+sys.path.append('.')
+
+from src.connections import db_connection
+from chunks.chunk1_data_ingestion.connectors.fear_greed_api import fetch_fear_greed_index
+from chunks.chunk1_data_ingestion.connectors.market_data_api import fetch_market_ohlcv
+from chunks.chunk1_data_ingestion.connectors.social_sentiment_api import fetch_simulated_social_sentiment
+from chunks.chunk1_data_ingestion.scheduler.rate_limiter import load_ingestion_config
+
+class Asset(NamedTuple):
+    asset_id: int
+    symbol: str
+    name: str
+    quote_currency: str
+
+class IngestionTask(NamedTuple):
+    job: str
+    provider: str
+    asset_id: Optional[int] # None for market-wide jobs
+    interval: float
+    function: Callable[[], object]
+
+def load_active_assets() -> List[Asset]:
+    """Loads the active assets from the assets table."""
+    with db_connection() as db_conn, db_conn.cursor() as cur:
+        cur.execute("""SELECT asset_id, symbol, name, quote_currency FROM trading_framework.assets
+                       WHERE is_active ORDER BY asset_id;""")
+        return [Asset(*row) for row in cur.fetchall()]
+
+class IngestionScheduler:
+    """
+    Runs the ingestion connectors concurrently over every active asset.
+
+    Each (job, asset) pair is a task that is due again `interval_seconds` after
+    its previous run started. Due tasks run on a shared thread pool, at most
+    `max_concurrency` per provider at a time, and every HTTP request waits on
+    the provider's token bucket, so ingest freshness is bounded by the provider
+    rate limits rather than by the latency of one request after another.
+    """
+    def __init__(self, config: Optional[dict] = None):
+        """
+        Initializes the IngestionScheduler.
+
+        Args:
+            config (dict, optional): Settings as in configs/chunks/chunk1.yaml. Defaults to that file.
+        """
+        config = config or load_ingestion_config()
+        scheduler_config = config.get('scheduler', {})
+        self.max_workers = scheduler_config.get('max_workers', 10)
+        self.poll_seconds = scheduler_config.get('poll_seconds', 1)
+        self.asset_refresh_seconds = scheduler_config.get('asset_refresh_seconds', 300)
+        self.jobs = config.get('jobs', {})
+        self.coin_ids = config.get('coin_ids', {})
+        self.concurrency = {name: provider.get('max_concurrency', 1)
+                            for name, provider in config.get('providers', {}).items()}
+
+        self.tasks: Dict[Tuple[str, Optional[int]], IngestionTask] = {}
+        self._next_due: Dict[Tuple[str, Optional[int]], float] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._assets_loaded_at = -float('inf')
+
+    def _coin_id(self, asset: Asset) -> str:
+        return self.coin_ids.get(asset.symbol.lower(), asset.name.lower().replace(' ', '-'))
+
+    def _build_tasks(self, assets: List[Asset]) -> Dict[Tuple[str, Optional[int]], IngestionTask]:
+        tasks = {}
+        def add(job, asset_id, function):
+            if job in self.jobs:
+                tasks[(job, asset_id)] = IngestionTask(job, self.jobs[job]['provider'], asset_id,
+                                                       self.jobs[job]['interval_seconds'], function)
+        add('fear_greed', None, fetch_fear_greed_index)
+        for asset in assets:
+            add('market_ohlcv', asset.asset_id,
+                lambda a=asset: fetch_market_ohlcv(self._coin_id(a), a.quote_currency.lower(), asset_id=a.asset_id))
+            add('social_sentiment', asset.asset_id,
+                lambda a=asset: fetch_simulated_social_sentiment(asset_id=a.asset_id))
+        return tasks
+
+    def refresh_assets(self):
+        """Reloads the active assets; tasks for new assets are due immediately, removed assets stop."""
+        try:
+            assets = load_active_assets()
+        except psycopg2.Error as e:
+            print(f"Could not load assets, keeping the current task list: {e}")
+            return
+        tasks = self._build_tasks(assets)
+        with self._lock:
+            self.tasks = tasks
+            self._next_due = {key: self._next_due.get(key, 0.0) for key in tasks}
+        self._assets_loaded_at = time.monotonic()
+        print(f"Scheduling {len(tasks)} ingestion tasks over {len(assets)} active assets.")
+
+    def _run_task(self, key, task: IngestionTask):
+        started = time.monotonic()
+        try:
+            task.function()
+        except Exception as e: # A failing task must not stop the others
+            print(f"Ingestion task {task.job} for asset {task.asset_id} failed: {e}")
+        finally:
+            with self._lock:
+                self._running.discard(key)
+                self._in_flight[task.provider] -= 1
+                if key in self._next_due:
+                    self._next_due[key] = started + task.interval
+
+    def _submit_due(self, executor: ThreadPoolExecutor, only: Optional[set] = None) -> set:
+        """
+        Submits every due task whose provider has a free slot, most overdue first.
+
+        Returns:
+            set: The keys of the submitted tasks.
+        """
+        now = time.monotonic()
+        submitted = set()
+        with self._lock:
+            for key in sorted(self._next_due, key=self._next_due.get):
+                if self._next_due[key] > now:
+                    break
+                task = self.tasks[key]
+                if key in self._running or (only is not None and key not in only) or \
+                        self._in_flight.get(task.provider, 0) >= self.concurrency.get(task.provider, 1):
+                    continue
+                self._running.add(key)
+                self._in_flight[task.provider] = self._in_flight.get(task.provider, 0) + 1
+                executor.submit(self._run_task, key, task)
+                submitted.add(key)
+        return submitted
+
+    def run_once(self):
+        """Runs every task once, within the provider limits, and returns when all have finished."""
+        self.refresh_assets()
+        with self._lock:
+            self._next_due = dict.fromkeys(self.tasks, 0.0)
+        remaining = set(self.tasks)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest") as executor:
+            while remaining:
+                remaining -= self._submit_due(executor, only=remaining)
+                if remaining:
+                    time.sleep(self.poll_seconds)
+
+    def run(self):
+        """Runs the scheduler until stop() is called or the process is interrupted."""
+        self._stop.clear()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest")
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() - self._assets_loaded_at >= self.asset_refresh_seconds:
+                    self.refresh_assets()
+                self._submit_due(executor)
+                self._stop.wait(self.poll_seconds)
+        except KeyboardInterrupt:
+            print("Stopping ingestion scheduler.")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stop(self):
+        """Asks a running scheduler to stop after the tasks in flight finish."""
+        self._stop.set()
+
+if __name__ == "__main__":
+    IngestionScheduler().run()
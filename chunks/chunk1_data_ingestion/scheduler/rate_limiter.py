@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Optional
+
+import yaml
+
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+CHUNK1_CONFIG_PATH = os.path.join(_current_dir, '..', '..', '..', 'configs', 'chunks', 'chunk1.yaml')
+
+@lru_cache(maxsize=1)
+def load_ingestion_config() -> dict:
+    """Loads the scheduler, provider and retry settings from configs/chunks/chunk1.yaml."""
+    with open(CHUNK1_CONFIG_PATH, 'r') as f:
+        return yaml.safe_load(f) or {}
+
+class TokenBucket:
+    """
+    A thread-safe token bucket that paces requests to a provider.
+
+    Tokens refill continuously at `rate` per second up to `capacity`. A caller
+    that finds the bucket empty reserves the next token and sleeps until it is
+    due, so waiting callers are served in arrival order without polling.
+    """
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initializes the TokenBucket.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Maximum number of tokens, i.e. the largest burst.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Takes `tokens` from the bucket, blocking until they are available.
+
+        Returns:
+            float: The number of seconds spent waiting.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+_limiters: Dict[str, Optional[TokenBucket]] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider: str) -> Optional[TokenBucket]:
+    """
+    Returns the process-wide token bucket for a provider, or None if the
+    provider has no `requests_per_minute` limit configured.
+    """
+    with _limiters_lock:
+        if provider not in _limiters:
+            limits = load_ingestion_config().get('providers', {}).get(provider, {})
+            per_minute = limits.get('requests_per_minute')
+            _limiters[provider] = TokenBucket(per_minute / 60.0, limits.get('burst', 1)) if per_minute else None
+        return _limiters[provider]
@@ -0,0 +1,87 @@
+import sys
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+sys.path.append('.')
+
+from chunks.chunk2_sentiment_engine.config import load_sentiment_config
+from chunks.chunk2_sentiment_engine.aggregators.confidence_weighted import (
+    SOURCES, combine_sources, copy_upsert, round_scores, staleness_confidence)
+
+# The newest readings of every asset in [%s, %s], one query per source
+LATEST_QUERIES: Dict[str, str] = {
+    # Market-wide: the newest reading applies to every asset
+    "fear_greed": "SELECT NULL::integer, timestamp, value::float8 FROM trading_framework.fear_greed_index "
+                  "WHERE timestamp >= %s AND timestamp <= %s ORDER BY timestamp DESC LIMIT 1",
+    "social": "SELECT DISTINCT ON (asset_id, source) asset_id, timestamp, sentiment_score::float8 "
+              "FROM trading_framework.social_sentiment WHERE timestamp >= %s AND timestamp <= %s "
+              "ORDER BY asset_id, source, timestamp DESC",
+    "on_chain": "SELECT DISTINCT ON (asset_id) asset_id, timestamp, nupl::float8 "
+                "FROM trading_framework.on_chain_metrics WHERE timestamp >= %s AND timestamp <= %s "
+                "ORDER BY asset_id, timestamp DESC",
+    "options": "SELECT DISTINCT ON (asset_id) asset_id, timestamp, put_call_ratio::float8 "
+               "FROM trading_framework.options_data WHERE timestamp >= %s AND timestamp <= %s "
+               "ORDER BY asset_id, timestamp DESC",
+}
+
+MARKET_WIDE_SOURCES = {"fear_greed"}
+
+ASSET_SENTIMENT_COLUMNS = ("asset_id", "timestamp", "fear_greed_score", "fear_greed_weight", "on_chain_score",
+                           "on_chain_weight", "social_score", "social_weight", "options_score", "options_weight",
+                           "composite_score", "confidence_score")
+
+def load_active_asset_ids(db_conn) -> List[int]:
+    """Returns the ids of the active assets."""
+    with db_conn.cursor() as cur:
+        cur.execute("SELECT asset_id FROM trading_framework.assets WHERE is_active ORDER BY asset_id")
+        return [row[0] for row in cur.fetchall()]
+
+def compute_asset_sentiment(db_conn, asset_ids: Sequence[int], timestamp: datetime) -> pd.DataFrame:
+    """
+    Computes the composite sentiment of every asset as of `timestamp` in one pass.
+
+    Each source is read with a single query for all assets, and the per-asset
+    scores and staleness confidences are combined as arrays over the asset
+    axis with confidence_weighted.combine_sources(), so the cost grows with
+    the number of readings rather than with one round trip per asset. The
+    readings of an asset's social sources are averaged.
+
+    Args:
+        db_conn: An open psycopg2 connection.
+        asset_ids (Sequence[int]): The assets to compute.
+        timestamp (datetime): The time the sentiment is computed for (timezone-aware).
+
+    Returns:
+        pd.DataFrame: One row per asset with at least one fresh source, in ASSET_SENTIMENT_COLUMNS order.
+    """
+    settings = load_sentiment_config()["aggregation"]["sources"]
+    now = pd.Timestamp(timestamp)
+    assets = pd.Index(asset_ids, name="asset_id")
+    scores, confidences = {}, {}
+    for name, query in LATEST_QUERIES.items():
+        max_age = pd.Timedelta(hours=settings[name]["max_age_hours"])
+        with db_conn.cursor() as cur:
+            cur.execute(query, ((now - max_age).to_pydatetime(), now.to_pydatetime()))
+            readings = pd.DataFrame(cur.fetchall(), columns=["asset_id", "reading_time", "value"])
+        readings["score"] = SOURCES[name].to_score(readings["value"].astype("float64"))
+        readings["confidence"] = staleness_confidence(now - pd.to_datetime(readings["reading_time"], utc=True), max_age)
+
+        if name in MARKET_WIDE_SOURCES:
+            score, confidence = (readings["score"].iloc[0], readings["confidence"].iloc[0]) if len(readings) else (np.nan, 0.0)
+            scores[name] = np.full(len(assets), score)
+            confidences[name] = np.full(len(assets), confidence)
+        else:
+            per_asset = readings.groupby("asset_id")[["score", "confidence"]].mean().reindex(assets)
+            scores[name] = per_asset["score"].to_numpy()
+            confidences[name] = per_asset["confidence"].fillna(0.0).to_numpy()
+
+    combined, fresh = combine_sources(scores, confidences)
+    frame = pd.DataFrame(combined, index=assets).reset_index()
+    frame["timestamp"] = now
+    return round_scores(frame.loc[fresh, list(ASSET_SENTIMENT_COLUMNS)].reset_index(drop=True))
+
+def upsert_asset_sentiment(db_conn, frame: pd.DataFrame) -> int:
+    """Bulk-loads per-asset sentiment rows, replacing rows of the same asset and timestamp."""
+    return copy_upsert(db_conn, "asset_sentiment", frame, ASSET_SENTIMENT_COLUMNS, ("asset_id", "timestamp"))
@@ -0,0 +1,218 @@
+import argparse
+import csv
+import io
+import sys
+from typing import Callable, Dict, NamedTuple, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from psycopg2 import sql
+sys.path.append('.')
+
+from src.connections import db_connection
+from chunks.chunk2_sentiment_engine.config import load_sentiment_config
+
+class SentimentSource(NamedTuple):
+    """A sentiment input: the query returning its (series, timestamp, value) readings and how a value maps to a score in [-1, 1]."""
+    query: str
+    to_score: Callable[[pd.Series], pd.Series]
+
+# Each query returns the readings in [%s, %s) in time order, labelled with the series they belong to
+# (an asset, or an asset and platform); the newest reading of every series is averaged into one market-wide value
+SOURCES: Dict[str, SentimentSource] = {
+    "fear_greed": SentimentSource(
+        "SELECT 'market', timestamp, value FROM trading_framework.fear_greed_index "
+        "WHERE timestamp >= %s AND timestamp < %s ORDER BY timestamp",
+        lambda value: value / 50.0 - 1.0),
+    "social": SentimentSource(
+        "SELECT concat_ws('/', asset_id, source), timestamp, sentiment_score::float8 FROM trading_framework.social_sentiment "
+        "WHERE timestamp >= %s AND timestamp < %s ORDER BY timestamp",
+        lambda score: score),
+    # NUPL above 0.75 is euphoria and below 0 capitulation; 0.25 is neutral
+    "on_chain": SentimentSource(
+        "SELECT asset_id::text, timestamp, nupl::float8 FROM trading_framework.on_chain_metrics "
+        "WHERE timestamp >= %s AND timestamp < %s ORDER BY timestamp",
+        lambda nupl: ((nupl - 0.25) / 0.5).clip(-1.0, 1.0)),
+    # A put/call ratio above 1 is hedging (fear), below 1 speculation (greed)
+    "options": SentimentSource(
+        "SELECT asset_id::text, timestamp, put_call_ratio::float8 FROM trading_framework.options_data "
+        "WHERE timestamp >= %s AND timestamp < %s ORDER BY timestamp",
+        lambda ratio: (1.0 - ratio).clip(-1.0, 1.0)),
+}
+
+SENTIMENT_COLUMNS = ("timestamp", "fear_greed_value", "fear_greed_weight", "on_chain_score", "on_chain_weight",
+                     "social_score", "social_weight", "options_score", "options_weight",
+                     "composite_score", "confidence_score")
+
+def _utc(timestamp) -> pd.Timestamp:
+    timestamp = pd.Timestamp(timestamp)
+    return timestamp.tz_localize("UTC") if timestamp.tzinfo is None else timestamp.tz_convert("UTC")
+
+def _load_readings(db_conn, source: SentimentSource, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    with db_conn.cursor() as cur:
+        cur.execute(source.query, (start.to_pydatetime(), end.to_pydatetime()))
+        rows = cur.fetchall()
+    frame = pd.DataFrame(rows, columns=["series", "reading_time", "value"])
+    frame["reading_time"] = pd.to_datetime(frame["reading_time"], utc=True).astype("datetime64[ns, UTC]")
+    frame["value"] = frame["value"].astype("float64")
+    return frame
+
+def staleness_confidence(age: pd.Series, max_age: pd.Timedelta) -> np.ndarray:
+    """Confidence in readings of the given ages: 1 when fresh, falling linearly to 0 at `max_age`; 0 where missing."""
+    return (1.0 - age / max_age).clip(lower=0.0).fillna(0.0).to_numpy()
+
+def combine_sources(scores: Dict[str, np.ndarray], confidences: Dict[str, np.ndarray]) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Combines per-source scores into the composite, element-wise over arrays of any shape.
+
+    The composite is the average of the source scores weighted by weight x
+    confidence, and the confidence score is the weighted average of the source
+    confidences, so stale or missing sources lower it.
+
+    Args:
+        scores (Dict[str, np.ndarray]): Score of each source in SOURCES; NaN where missing.
+        confidences (Dict[str, np.ndarray]): Confidence of each source's score.
+
+    Returns:
+        Tuple[Dict[str, np.ndarray], np.ndarray]: The `<source>_score`, `<source>_weight`
+            (share of the composite), `composite_score` and `confidence_score` columns, and
+            a mask of the elements with at least one fresh source.
+    """
+    settings = load_sentiment_config()["aggregation"]["sources"]
+    total_weight = sum(settings[name]["weight"] for name in SOURCES)
+    effective_weights = {name: settings[name]["weight"] * confidences[name] for name in SOURCES}
+    weight_sum = sum(effective_weights.values())
+    weighted_scores = sum(effective_weights[name] * np.nan_to_num(scores[name]) for name in SOURCES)
+
+    columns = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for name in SOURCES:
+            columns[f"{name}_score"] = np.where(confidences[name] > 0, scores[name], np.nan)
+            columns[f"{name}_weight"] = effective_weights[name] / weight_sum
+        columns["composite_score"] = np.clip(weighted_scores / weight_sum, -1.0, 1.0)
+    columns["confidence_score"] = weight_sum / total_weight
+    return columns, weight_sum > 0
+
+def round_scores(frame: pd.DataFrame, decimals: int = 4) -> pd.DataFrame:
+    """Rounds the float columns to the precision of the NUMERIC(5, 4) score columns, leaving the others as they are."""
+    return frame.round(dict.fromkeys(frame.select_dtypes("float").columns, decimals))
+
+def build_sentiment_series(db_conn, start, end, freq: str = "1h") -> pd.DataFrame:
+    """
+    Computes the composite and confidence series for every step of a time range.
+
+    Each source is read once for the whole range and as-of joined onto the time
+    grid per series (an asset, or an asset and platform), so every step sees
+    the newest reading of each series at or before it. A reading's confidence
+    decays linearly with its age to zero at the source's `max_age_hours`; the
+    scores and confidences of the series with a reading are averaged, as
+    asset_sentiment does for one asset, and the sources are merged by
+    combine_sources().
+
+    Args:
+        db_conn: An open psycopg2 connection.
+        start: First step of the range, as anything pd.Timestamp accepts; naive is UTC.
+        end: End of the range (exclusive).
+        freq (str): Step of the grid, e.g. '1h'.
+
+    Returns:
+        pd.DataFrame: One row per step with at least one fresh source, in SENTIMENT_COLUMNS
+            order; the `*_weight` columns hold each source's share of the composite.
+    """
+    start, end = _utc(start), _utc(end)
+    settings = load_sentiment_config()["aggregation"]["sources"]
+    grid = pd.DataFrame({"timestamp": pd.date_range(start, end, freq=freq, inclusive="left")})
+    grid["timestamp"] = grid["timestamp"].astype("datetime64[ns, UTC]")
+
+    confidences, scores = {}, {}
+    for name, source in SOURCES.items():
+        max_age = pd.Timedelta(hours=settings[name]["max_age_hours"])
+        readings = _load_readings(db_conn, source, start - max_age, end)
+        steps = grid.merge(readings[["series"]].drop_duplicates(), how="cross").sort_values("timestamp", kind="stable")
+        joined = pd.merge_asof(steps, readings, left_on="timestamp", right_on="reading_time", by="series",
+                               direction="backward", tolerance=max_age).dropna(subset=["reading_time"])
+        joined["score"] = source.to_score(joined["value"])
+        joined["confidence"] = staleness_confidence(joined["timestamp"] - joined["reading_time"], max_age)
+        per_step = joined.groupby("timestamp")[["value", "score", "confidence"]].mean().reindex(grid["timestamp"])
+        confidences[name] = per_step["confidence"].fillna(0.0).to_numpy()
+        scores[name] = per_step["score"].to_numpy()
+        if name == "fear_greed":
+            grid["fear_greed_value"] = (per_step["value"].where(confidences[name] > 0).round()
+                                        .astype("Int64").to_numpy())
+
+    combined, fresh = combine_sources(scores, confidences)
+    for column, values in combined.items():
+        grid[column] = values
+    return round_scores(grid.loc[fresh, list(SENTIMENT_COLUMNS)].reset_index(drop=True))
+
+def copy_upsert(db_conn, table: str, frame: pd.DataFrame, columns: Sequence[str], conflict_columns: Sequence[str]) -> int:
+    """
+    Writes rows with COPY into a staging table and merges them into
+    trading_framework.<table> in one transaction, updating the rows whose
+    `conflict_columns` already exist in place.
+
+    Returns:
+        int: The number of rows inserted or updated.
+    """
+    column_list = sql.SQL(", ").join(map(sql.Identifier, columns))
+    updates = sql.SQL(", ").join(sql.SQL("{column} = EXCLUDED.{column}").format(column=sql.Identifier(column))
+                                 for column in columns if column not in conflict_columns)
+    staging = sql.Identifier(f"staging_{table}")
+    buffer = io.StringIO()
+    frame.to_csv(buffer, columns=list(columns), header=False, index=False,
+                 quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+    buffer.seek(0)
+    try:
+        with db_conn.cursor() as cur:
+            cur.execute(sql.SQL("CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                                "SELECT {columns} FROM {target} WITH NO DATA"
+                                ).format(staging=staging, columns=column_list,
+                                         target=sql.Identifier("trading_framework", table)))
+            cur.copy_expert(sql.SQL("COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)"
+                                    ).format(staging=staging, columns=column_list).as_string(db_conn), buffer)
+            cur.execute(sql.SQL("INSERT INTO {target} ({columns}) SELECT {columns} FROM {staging} "
+                                "ON CONFLICT ({conflict}) DO UPDATE SET {updates}"
+                                ).format(target=sql.Identifier("trading_framework", table), columns=column_list,
+                                         staging=staging, updates=updates,
+                                         conflict=sql.SQL(", ").join(map(sql.Identifier, conflict_columns))))
+            written = cur.rowcount
+        db_conn.commit()
+    except Exception:
+        db_conn.rollback()
+        raise
+    return written
+
+def upsert_market_sentiment(db_conn, frame: pd.DataFrame) -> int:
+    """
+    Bulk-loads sentiment rows into market_sentiment, replacing rows with the
+    same timestamp in place so the regimes that reference them stay attached.
+
+    Returns:
+        int: The number of rows inserted or updated.
+    """
+    return copy_upsert(db_conn, "market_sentiment", frame, SENTIMENT_COLUMNS, ("timestamp",))
+
+def backfill_market_sentiment(start, end, freq: str = "1h") -> int:
+    """
+    Rebuilds market_sentiment for a time range from the source tables.
+
+    No SentimentAggregated events are published, so a backfill does not set
+    off the live regime engine.
+
+    Returns:
+        int: The number of market_sentiment rows written.
+    """
+    with db_connection() as db_conn:
+        frame = build_sentiment_series(db_conn, start, end, freq)
+        db_conn.rollback()
+        written = upsert_market_sentiment(db_conn, frame) if len(frame) else 0
+    print(f"Rebuilt {written} market_sentiment rows from {_utc(start)} to {_utc(end)} at {freq}.")
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild market_sentiment for a time range.")
+    parser.add_argument("--start", required=True, help="First timestamp, e.g. 2024-01-01 (UTC).")
+    parser.add_argument("--end", required=True, help="End timestamp (exclusive).")
+    parser.add_argument("--freq", default="1h", help="Step of the series, e.g. 1h or 15min.")
+    args = parser.parse_args()
+    backfill_market_sentiment(args.start, args.end, args.freq)
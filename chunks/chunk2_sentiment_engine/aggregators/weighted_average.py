@@ -1,5 +1,12 @@
 import psycopg2
-from datetime import datetime, timedelta
+import sys
+from datetime import datetime, timezone
+
+import pandas as pd
+sys.path.append('.')
+
+from src.event_bus import EventConsumer, FearGreedUpdated, SentimentAggregated, SentimentIngested, publish
+from chunks.chunk2_sentiment_engine.aggregators.confidence_weighted import build_sentiment_series, upsert_market_sentiment
 
 def get_db_connection():
     """Establishes connection to the PostgreSQL database."""
@@ -12,78 +19,58 @@ def get_db_connection():
 
 def aggregate_sentiment():
     """ 
-    Pulls the latest fear/greed and social sentiment data, calculates a 
-    weighted average, and stores it in the market_sentiment table.
+    Combines the latest readings of every sentiment source into a composite
+    score and stores it in the market_sentiment table.
+
+    The row is computed by confidence_weighted.build_sentiment_series() for a
+    single step at the current time, so live rows and backfilled ones follow
+    the same weights, staleness decay and per-asset averaging.
+
+    Returns the id of the new market_sentiment row, or None.
     """
     db_conn = None
     try:
         db_conn = get_db_connection()
-        with db_conn.cursor() as cur:
-            # Get latest Fear & Greed value (normalized to -1 to 1 range)
-            cur.execute("SELECT value, timestamp FROM trading_framework.fear_greed_index ORDER BY timestamp DESC LIMIT 1")
-            fg_record = cur.fetchone()
-            if not fg_record:
-                print("No Fear & Greed data found.")
-                return
-            
-            fg_value, fg_timestamp = fg_record
-            # Normalize F&G from [0, 100] to [-1, 1]
-            # (value / 50) - 1
-            fg_score = (fg_value / 50.0) - 1.0
-
-            # Get latest social sentiment score
-            cur.execute("SELECT sentiment_score, timestamp FROM trading_framework.social_sentiment ORDER BY timestamp DESC LIMIT 1")
-            social_record = cur.fetchone()
-            if not social_record:
-                print("No social sentiment data found.")
-                return
-
-            social_score = float(social_record[0])
-            social_timestamp = social_record[1]
+        now = pd.Timestamp(datetime.now(timezone.utc))
+        frame = build_sentiment_series(db_conn, now, now + pd.Timedelta(microseconds=1))
+        db_conn.rollback()
+        if frame.empty:
+            print("No fresh sentiment data found.")
+            return None
 
-            # --- Simple Aggregation Logic ---
-            # Define weights
-            fg_weight = 0.6
-            social_weight = 0.4
-
-            # Calculate composite score
-            composite_score = (fg_score * fg_weight) + (social_score * social_weight)
-
-            # Calculate confidence score (simple version based on data freshness)
-            now = datetime.now(fg_timestamp.tzinfo) # Use timezone from DB
-            fg_age = (now - fg_timestamp).total_seconds()
-            social_age = (now - social_timestamp).total_seconds()
-            
-            # Confidence decays as data gets older (e.g., max confidence if < 1 hour old)
-            fg_confidence = max(0, 1 - (fg_age / (3600 * 4)))
-            social_confidence = max(0, 1 - (social_age / 3600))
-            confidence_score = (fg_confidence * fg_weight) + (social_confidence * social_weight)
+        upsert_market_sentiment(db_conn, frame)
+        with db_conn.cursor() as cur:
+            cur.execute("SELECT id FROM trading_framework.market_sentiment WHERE timestamp = %s", (now.to_pydatetime(),))
+            sentiment_id = cur.fetchone()[0]
+        db_conn.commit()
 
-            # Insert aggregated data into the market_sentiment table
-            insert_query = """INSERT INTO trading_framework.market_sentiment 
-                               (timestamp, fear_greed_value, fear_greed_weight, social_score, social_weight, composite_score, confidence_score)
-                               VALUES (%s, %s, %s, %s, %s, %s, %s);"""
-            
-            cur.execute(insert_query, (
-                now,
-                fg_value,
-                fg_weight,
-                social_score,
-                social_weight,
-                composite_score,
-                confidence_score
-            ))
-            db_conn.commit()
+        row = frame.iloc[0]
+        composite_score, confidence_score = float(row["composite_score"]), float(row["confidence_score"])
+        print("Successfully calculated and stored aggregated sentiment.")
+        print(f"  Composite Score: {composite_score:.4f}")
+        print(f"  Confidence Score: {confidence_score:.4f}")
 
-            print("Successfully calculated and stored aggregated sentiment.")
-            print(f"  Composite Score: {composite_score:.4f}")
-            print(f"  Confidence Score: {confidence_score:.4f}")
+        publish(SentimentAggregated(timestamp=now.to_pydatetime(), sentiment_id=sentiment_id,
+                                    composite_score=composite_score, confidence_score=confidence_score))
+        return sentiment_id
 
     except psycopg2.Error as e:
         print(f"Database error: {e}")
+        return None
     finally:
         if db_conn:
             db_conn.close()
 
+def consume_events():
+    """
+    Re-aggregates sentiment as soon as a new Fear & Greed value or social
+    sentiment reading is published, once per batch of events.
+    """
+    EventConsumer("sentiment_aggregator", [FearGreedUpdated, SentimentIngested]).run(
+        lambda events: aggregate_sentiment())
+
 if __name__ == "__main__":
-    aggregate_sentiment()
+    if "--follow" in sys.argv:
+        consume_events()
+    else:
+        aggregate_sentiment()
@@ -1,11 +1,84 @@
-from fastapi import APIRouter, Depends
+import hashlib
+import threading
+from typing import Callable, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
 from src.database import get_db
+from src.event_bus import RegimeUpdated, subscribe
 from src.models.regime import MarketRegimeSchema, MarketRegime
 
 router = APIRouter()
 
+class RegimeCache:
+    """
+    Holds the current regime's JSON body and ETag in process memory.
+
+    A background thread listens for RegimeUpdated broadcasts and drops the
+    cached body when a new regime is stored, so requests between changes are
+    served without a query. Loads that overlap an invalidation are not cached,
+    and nothing is cached while the subscription is down.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry: Optional[Tuple[bytes, str]] = None
+        self._generation = 0
+        self._listening = False
+        self._listener: Optional[threading.Thread] = None
+
+    def _invalidate(self, *_):
+        with self._lock:
+            self._entry = None
+            self._generation += 1
+
+    def _on_status(self, connected: bool):
+        # Broadcasts may have been missed while disconnected, so start over either way
+        with self._lock:
+            self._listening = connected
+        self._invalidate()
+
+    def _listen(self):
+        subscribe([RegimeUpdated], self._invalidate, on_status=self._on_status)
+
+    def start(self):
+        """Starts the invalidation listener once per process."""
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name="regime-cache", daemon=True)
+                self._listener.start()
+
+    def get(self, loader: Callable[[], bytes]) -> Tuple[bytes, str]:
+        """Returns the cached body and ETag, calling `loader` for the body on a miss."""
+        self.start()
+        with self._lock:
+            if self._entry is not None:
+                return self._entry
+            generation, listening = self._generation, self._listening
+        body = loader()
+        entry = (body, f'"{hashlib.sha1(body).hexdigest()[:16]}"')
+        with self._lock:
+            if listening and generation == self._generation:
+                self._entry = entry
+        return entry
+
+regime_cache = RegimeCache()
+
 @router.get("/regime/current", response_model=MarketRegimeSchema)
-def get_current_regime(db: Session = Depends(get_db)):
-    """Returns the most recent market regime."""
-    return db.query(MarketRegime).order_by(MarketRegime.created_at.desc()).first()
+def get_current_regime(request: Request, db: Session = Depends(get_db)):
+    """
+    Returns the most recent market regime.
+
+    The response carries an ETag; a request whose If-None-Match matches it gets
+    an empty 304 instead. Both are served from memory until the regime changes.
+    """
+    def load() -> bytes:
+        regime = db.query(MarketRegime).order_by(MarketRegime.created_at.desc()).first()
+        if regime is None:
+            return b"null"
+        return MarketRegimeSchema.model_validate(regime, from_attributes=True).model_dump_json().encode()
+
+    body, etag = regime_cache.get(load)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
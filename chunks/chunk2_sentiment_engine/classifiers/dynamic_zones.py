@@ -1,6 +1,10 @@
 from typing import Dict, Tuple
+import numpy as np
 from src.models.regime import SentimentZone
 
+# Zones in ascending order; classify_scores() returns indices into this tuple
+ZONES: Tuple[SentimentZone, ...] = tuple(SentimentZone)
+
 def get_sentiment_zone(score: float, thresholds: Dict[SentimentZone, Tuple[float, float]]) -> SentimentZone:
     """
     Classifies a sentiment score into a sentiment zone based on dynamic thresholds.
@@ -20,14 +24,49 @@ def get_sentiment_zone(score: float, thresholds: Dict[SentimentZone, Tuple[float
     for zone, (lower_bound, upper_bound) in thresholds.items():
         if lower_bound <= score < upper_bound:
             return zone
-    
+
     # Handle edge case for the upper bound of the highest zone
-    last_zone = list(thresholds.keys())[-1]
+    last_zone = next(reversed(thresholds))
     if score == thresholds[last_zone][1]:
         return last_zone
 
     raise ValueError(f"Score {score} is outside the defined threshold ranges.")
 
+def zone_edges(thresholds: Dict[SentimentZone, Tuple[float, float]]) -> np.ndarray:
+    """Returns the inner boundaries between the zones of `thresholds`, which must cover ZONES in order."""
+    if tuple(thresholds) != ZONES:
+        raise ValueError("Thresholds must define every SentimentZone in ascending order.")
+    return np.array([upper_bound for _, upper_bound in list(thresholds.values())[:-1]])
+
+def classify_scores(scores, thresholds=None, edges=None) -> np.ndarray:
+    """
+    Classifies an array of scores at once.
+
+    With static thresholds the zone is found by binary search over the zone
+    boundaries; with per-score boundaries, e.g. from
+    volatility_adjusted.rolling_quantile_edges(), by comparing each score with
+    its own boundaries. Both agree with get_sentiment_zone() on the same bounds.
+
+    Args:
+        scores: Scores of any shape, e.g. (time,) or (time, assets).
+        thresholds (Dict[SentimentZone, Tuple[float, float]], optional): Static zone bounds.
+            Defaults to get_default_thresholds() when `edges` is not given.
+        edges (np.ndarray, optional): Per-score inner boundaries of shape scores.shape + (len(ZONES) - 1,).
+
+    Returns:
+        np.ndarray: Indices into ZONES with the shape of `scores`; -1 where the score is NaN.
+    """
+    scores = np.asarray(scores, dtype=float)
+    if edges is None:
+        thresholds = thresholds or get_default_thresholds()
+        lower, upper = thresholds[ZONES[0]][0], thresholds[ZONES[-1]][1]
+        if np.any((scores < lower) | (scores > upper)):
+            raise ValueError(f"Scores must lie within [{lower}, {upper}].")
+        codes = np.searchsorted(zone_edges(thresholds), scores, side='right')
+    else:
+        codes = (scores[..., np.newaxis] >= edges).sum(axis=-1)
+    return np.where(np.isnan(scores), -1, codes)
+
 def get_default_thresholds() -> Dict[SentimentZone, Tuple[float, float]]:
     """
     Returns the default, static thresholds for sentiment zones.
@@ -0,0 +1,52 @@
+from typing import Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from chunks.chunk2_sentiment_engine.classifiers.dynamic_zones import (
+    ZONES, classify_scores, get_default_thresholds, zone_edges)
+from chunks.chunk2_sentiment_engine.config import load_sentiment_config
+
+def rolling_quantile_edges(scores: Union[pd.Series, pd.DataFrame], window: Optional[int] = None,
+                           quantiles: Optional[Sequence[float]] = None,
+                           min_periods: Optional[int] = None) -> np.ndarray:
+    """
+    Computes zone boundaries that track the recent distribution of the scores.
+
+    At every step the boundaries are the given quantiles of the trailing
+    `window` scores (the current one included, none after it), so the same
+    share of history falls in each zone whatever the volatility. Steps with
+    less than `min_periods` of history use the static default boundaries.
+
+    Args:
+        scores (pd.Series | pd.DataFrame): Scores in time order; a DataFrame holds one column per asset.
+        window (int, optional): Trailing window in steps. Defaults to the chunk2 config.
+        quantiles (Sequence[float], optional): One ascending quantile per zone boundary
+            (len(ZONES) - 1 of them). Defaults to the chunk2 config.
+        min_periods (int, optional): Minimum history for rolling boundaries. Defaults to `window`.
+
+    Returns:
+        np.ndarray: Boundaries of shape scores.shape + (len(quantiles),), for classify_scores(edges=...).
+    """
+    settings = load_sentiment_config()["volatility_adjusted"]
+    window = window or settings["window"]
+    quantiles = quantiles or settings["quantiles"]
+    if len(quantiles) != len(ZONES) - 1:
+        raise ValueError(f"Expected {len(ZONES) - 1} quantiles, got {len(quantiles)}.")
+
+    rolling = scores.rolling(window, min_periods=min_periods or window)
+    edges = np.stack([rolling.quantile(q).to_numpy() for q in quantiles], axis=-1)
+    static = zone_edges(get_default_thresholds())
+    return np.where(np.isnan(edges), static, edges)
+
+def classify_volatility_adjusted(scores: Union[pd.Series, pd.DataFrame], window: Optional[int] = None,
+                                 quantiles: Optional[Sequence[float]] = None,
+                                 min_periods: Optional[int] = None) -> np.ndarray:
+    """
+    Classifies a whole score history against its rolling-quantile boundaries.
+
+    Returns:
+        np.ndarray: Indices into dynamic_zones.ZONES with the shape of `scores`; -1 where a score is NaN.
+    """
+    edges = rolling_quantile_edges(scores, window, quantiles, min_periods)
+    return classify_scores(scores.to_numpy(), edges=edges)
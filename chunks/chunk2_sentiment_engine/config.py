@@ -0,0 +1,13 @@
+import os
+from functools import lru_cache
+
+import yaml
+
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+CHUNK2_CONFIG_PATH = os.path.join(_current_dir, '..', '..', 'configs', 'chunks', 'chunk2.yaml')
+
+@lru_cache(maxsize=1)
+def load_sentiment_config() -> dict:
+    """Loads the sentiment engine settings from configs/chunks/chunk2.yaml."""
+    with open(CHUNK2_CONFIG_PATH, 'r') as f:
+        return yaml.safe_load(f) or {}
@@ -0,0 +1,116 @@
+import sys
+from datetime import datetime, timezone
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+sys.path.append('.')
+
+from src.connections import db_connection
+from src.event_bus import EventConsumer, FearGreedUpdated, SentimentIngested
+from chunks.chunk2_sentiment_engine.config import load_sentiment_config
+from chunks.chunk2_sentiment_engine.aggregators.asset_sentiment import (
+    compute_asset_sentiment, load_active_asset_ids, upsert_asset_sentiment)
+from chunks.chunk2_sentiment_engine.aggregators.confidence_weighted import copy_upsert
+from chunks.chunk2_sentiment_engine.classifiers.dynamic_zones import ZONES, get_default_thresholds
+from chunks.chunk2_sentiment_engine.transitions.hysteresis import ZoneArrays, update_zone_arrays
+from chunks.chunk2_sentiment_engine.transitions.smoothing_engine import ewma_step
+
+REGIME_COLUMNS = ("asset_id", "zone", "smoothed_score", "transition_strength", "is_transitioning", "previous_zone",
+                  "next_zone", "pending_updates", "transition_start", "transition_end", "updated_at")
+
+_ZONE_NAMES = np.array([zone.value for zone in ZONES] + [None], dtype=object) # Index -1 maps to None
+
+def _zone_codes(values: pd.Series) -> np.ndarray:
+    return values.map({zone.value: code for code, zone in enumerate(ZONES)}).fillna(-1).to_numpy(dtype=int)
+
+def _times(values: pd.Series) -> np.ndarray:
+    return pd.to_datetime(values, utc=True).dt.tz_localize(None).to_numpy(dtype="datetime64[ns]")
+
+def load_asset_regimes(db_conn, asset_ids: Sequence[int]) -> pd.DataFrame:
+    """Returns the stored regime state of the given assets, indexed by asset_id, in one query."""
+    with db_conn.cursor() as cur:
+        cur.execute(f"SELECT {', '.join(REGIME_COLUMNS)} FROM trading_framework.asset_regime "
+                    "WHERE asset_id = ANY(%s)", (list(asset_ids),))
+        frame = pd.DataFrame(cur.fetchall(), columns=list(REGIME_COLUMNS))
+    return frame.set_index("asset_id")
+
+def update_asset_regimes(previous: pd.DataFrame, sentiment: pd.DataFrame, timestamp: datetime) -> pd.DataFrame:
+    """
+    Advances the regime of every asset with new sentiment in one vectorized step.
+
+    The per-asset smoothing and hysteresis follow the streaming market regime
+    engine (EwmaSmoother and HysteresisClassifier with the chunk2 regime
+    settings), applied as arrays over the asset axis.
+
+    Args:
+        previous (pd.DataFrame): Stored state from load_asset_regimes(); assets missing from it start fresh.
+        sentiment (pd.DataFrame): Rows from compute_asset_sentiment().
+        timestamp (datetime): The time of the sentiment (timezone-aware).
+
+    Returns:
+        pd.DataFrame: The new state of each asset in `sentiment`, in REGIME_COLUMNS order.
+    """
+    settings = load_sentiment_config()["regime"]
+    state = previous.reindex(sentiment["asset_id"])
+    now = np.datetime64(pd.Timestamp(timestamp).tz_convert("UTC").tz_localize(None), "ns")
+
+    elapsed = (now - _times(state["updated_at"])) / np.timedelta64(1, "s")
+    smoothed = ewma_step(state["smoothed_score"].astype("float64").to_numpy(), np.nan_to_num(elapsed),
+                         sentiment["composite_score"].astype("float64").to_numpy(),
+                         settings["smoothing_half_life_minutes"] * 60)
+    zones = update_zone_arrays(
+        ZoneArrays(_zone_codes(state["zone"]), _zone_codes(state["previous_zone"]), _zone_codes(state["next_zone"]),
+                   state["pending_updates"].fillna(0).to_numpy(dtype=int),
+                   _times(state["transition_start"]), _times(state["transition_end"])),
+        np.clip(smoothed, -1.0, 1.0), now, get_default_thresholds(), settings["hysteresis_band"],
+        settings["confirm_updates"])
+
+    transitioning = zones.next_zone >= 0
+    return pd.DataFrame({
+        "asset_id": sentiment["asset_id"].to_numpy(),
+        "zone": _ZONE_NAMES[zones.zone],
+        "smoothed_score": smoothed,
+        "transition_strength": np.where(transitioning, zones.pending_updates / max(settings["confirm_updates"], 1), 0.0),
+        "is_transitioning": transitioning,
+        "previous_zone": _ZONE_NAMES[zones.previous_zone],
+        "next_zone": _ZONE_NAMES[zones.next_zone],
+        "pending_updates": zones.pending_updates,
+        "transition_start": pd.to_datetime(zones.transition_start).tz_localize("UTC"),
+        "transition_end": pd.to_datetime(zones.transition_end).tz_localize("UTC"),
+        "updated_at": pd.Timestamp(timestamp),
+    }, columns=list(REGIME_COLUMNS))
+
+def run_asset_cycle(timestamp: Optional[datetime] = None) -> Tuple[int, int]:
+    """
+    Computes the sentiment and regime of every active asset and bulk-upserts
+    both: a fixed number of queries and two COPY loads per cycle, whatever
+    the number of assets.
+
+    Returns:
+        Tuple[int, int]: The number of asset_sentiment and asset_regime rows written.
+    """
+    timestamp = timestamp or datetime.now(timezone.utc)
+    with db_connection() as db_conn:
+        asset_ids = load_active_asset_ids(db_conn)
+        sentiment = compute_asset_sentiment(db_conn, asset_ids, timestamp)
+        if sentiment.empty:
+            db_conn.rollback()
+            print("No fresh sentiment for any asset.")
+            return 0, 0
+        regimes = update_asset_regimes(load_asset_regimes(db_conn, sentiment["asset_id"]), sentiment, timestamp)
+        db_conn.rollback()
+        written = (upsert_asset_sentiment(db_conn, sentiment),
+                   copy_upsert(db_conn, "asset_regime", regimes, REGIME_COLUMNS, ("asset_id",)))
+    print(f"Updated sentiment and regime of {len(sentiment)} of {len(asset_ids)} assets.")
+    return written
+
+def consume_events():
+    """Runs a cycle for each batch of new Fear & Greed or social sentiment events."""
+    EventConsumer("asset_regime_engine", [FearGreedUpdated, SentimentIngested]).run(lambda events: run_asset_cycle())
+
+if __name__ == "__main__":
+    if "--follow" in sys.argv:
+        consume_events()
+    else:
+        run_asset_cycle()
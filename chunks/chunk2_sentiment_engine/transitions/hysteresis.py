@@ -0,0 +1,158 @@
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from src.models.regime import SentimentZone
+from chunks.chunk2_sentiment_engine.classifiers.dynamic_zones import ZONES, classify_scores, get_sentiment_zone
+
+class RegimeState(NamedTuple):
+    """The classifier's view of the regime after an update."""
+    zone: SentimentZone
+    transition_strength: float
+    is_transitioning: bool
+    previous_zone: Optional[SentimentZone]
+    next_zone: Optional[SentimentZone]
+    transition_start: Optional[datetime]
+    transition_end: Optional[datetime]
+
+    def key(self) -> Tuple:
+        """The part of the state whose change is worth recording."""
+        return self.zone, self.is_transitioning, self.next_zone
+
+class HysteresisClassifier:
+    """
+    Classifies a stream of scores into zones without flapping at the boundaries.
+
+    The current zone is kept while the score stays within `band` of its bounds.
+    Once the score moves further out, a transition towards the zone it now
+    falls in begins; the new zone is adopted after `confirm_updates`
+    consecutive updates outside the band, and the transition is abandoned as
+    soon as the score returns. Each update is O(1).
+    """
+    def __init__(self, thresholds: Dict[SentimentZone, Tuple[float, float]], band: float, confirm_updates: int):
+        """
+        Initializes the HysteresisClassifier.
+
+        Args:
+            thresholds (Dict[SentimentZone, Tuple[float, float]]): Zone bounds, as from get_default_thresholds().
+            band (float): How far past its bounds the score may go before the zone is left.
+            confirm_updates (int): Consecutive updates outside the band needed to change zone.
+        """
+        self.thresholds = thresholds
+        self.band = band
+        self.confirm_updates = max(confirm_updates, 1)
+        self.zone: Optional[SentimentZone] = None
+        self.previous_zone: Optional[SentimentZone] = None
+        self.next_zone: Optional[SentimentZone] = None
+        self.pending_updates = 0
+        self.transition_start: Optional[datetime] = None
+        self.transition_end: Optional[datetime] = None
+
+    def _within_band(self, score: float) -> bool:
+        lower, upper = self.thresholds[self.zone]
+        return lower - self.band <= score <= upper + self.band
+
+    def update(self, score: float, timestamp: datetime) -> RegimeState:
+        """Classifies the next score and returns the resulting state."""
+        if self.zone is None:
+            self.zone = get_sentiment_zone(score, self.thresholds)
+        elif self._within_band(score):
+            if self.next_zone is not None: # The transition was abandoned
+                self.next_zone, self.pending_updates, self.transition_start = None, 0, None
+        else:
+            if self.next_zone is None:
+                self.transition_start = timestamp
+            self.next_zone = get_sentiment_zone(score, self.thresholds)
+            self.pending_updates += 1
+            if self.pending_updates >= self.confirm_updates:
+                self.previous_zone, self.zone = self.zone, self.next_zone
+                self.next_zone, self.pending_updates = None, 0
+                self.transition_end = timestamp
+        return self.state()
+
+    def state(self) -> RegimeState:
+        transitioning = self.next_zone is not None
+        return RegimeState(
+            zone=self.zone,
+            transition_strength=self.pending_updates / self.confirm_updates if transitioning else 0.0,
+            is_transitioning=transitioning,
+            previous_zone=self.previous_zone,
+            next_zone=self.next_zone,
+            transition_start=self.transition_start,
+            transition_end=self.transition_end,
+        )
+
+    def to_dict(self) -> dict:
+        def zone(value):
+            return value.value if value else None
+
+        def time(value):
+            return value.isoformat() if value else None
+
+        return {"zone": zone(self.zone), "previous_zone": zone(self.previous_zone), "next_zone": zone(self.next_zone),
+                "pending_updates": self.pending_updates, "transition_start": time(self.transition_start),
+                "transition_end": time(self.transition_end)}
+
+    @classmethod
+    def from_dict(cls, thresholds: Dict[SentimentZone, Tuple[float, float]], band: float, confirm_updates: int,
+                  state: dict) -> "HysteresisClassifier":
+        classifier = cls(thresholds, band, confirm_updates)
+        for name in ("zone", "previous_zone", "next_zone"):
+            setattr(classifier, name, SentimentZone(state[name]) if state.get(name) else None)
+        for name in ("transition_start", "transition_end"):
+            setattr(classifier, name, datetime.fromisoformat(state[name]) if state.get(name) else None)
+        classifier.pending_updates = state.get("pending_updates", 0)
+        return classifier
+
+class ZoneArrays(NamedTuple):
+    """
+    HysteresisClassifier state for many series, one element per series. Zones
+    are indices into dynamic_zones.ZONES, with -1 for none, and times are
+    datetime64 values, with NaT for none.
+    """
+    zone: np.ndarray
+    previous_zone: np.ndarray
+    next_zone: np.ndarray
+    pending_updates: np.ndarray
+    transition_start: np.ndarray
+    transition_end: np.ndarray
+
+def update_zone_arrays(state: ZoneArrays, scores: np.ndarray, timestamp: np.datetime64,
+                       thresholds: Dict[SentimentZone, Tuple[float, float]], band: float,
+                       confirm_updates: int) -> ZoneArrays:
+    """
+    Applies one HysteresisClassifier update to every series at once, with the
+    same rules: series without a zone take the zone of their score, a zone is
+    kept while the score stays within `band` of its bounds, and a new zone is
+    adopted after `confirm_updates` consecutive updates outside the band.
+
+    Returns:
+        ZoneArrays: The new state.
+    """
+    confirm_updates = max(confirm_updates, 1)
+    zone, previous_zone, next_zone, pending = (state.zone.copy(), state.previous_zone.copy(),
+                                               state.next_zone.copy(), state.pending_updates.copy())
+    start, end = state.transition_start.copy(), state.transition_end.copy()
+    classified = classify_scores(scores, thresholds)
+
+    lower = np.array([thresholds[z][0] for z in ZONES]) - band
+    upper = np.array([thresholds[z][1] for z in ZONES]) + band
+    new = zone < 0
+    within = ~new & (scores >= lower[zone]) & (scores <= upper[zone])
+    outside = ~new & ~within
+
+    abandoned = within & (next_zone >= 0)
+    next_zone[abandoned], pending[abandoned], start[abandoned] = -1, 0, np.datetime64("NaT")
+
+    start[outside & (next_zone < 0)] = timestamp
+    next_zone[outside] = classified[outside]
+    pending[outside] += 1
+
+    confirmed = outside & (pending >= confirm_updates)
+    previous_zone[confirmed], zone[confirmed] = zone[confirmed], next_zone[confirmed]
+    next_zone[confirmed], pending[confirmed] = -1, 0
+    end[confirmed] = timestamp
+
+    zone[new] = classified[new]
+    return ZoneArrays(zone, previous_zone, next_zone, pending, start, end)
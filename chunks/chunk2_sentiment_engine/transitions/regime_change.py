@@ -1,38 +1,146 @@
+import json
+import sys
+from datetime import datetime
+from typing import Optional
+
+import redis
 from sqlalchemy.orm import Session
+from src.connections import get_redis_connection
 from src.database import get_db
+from src.event_bus import EventConsumer, RegimeUpdated, SentimentAggregated, publish
 from src.models.sentiment import MarketSentiment
-from src.models.regime import MarketRegime, SentimentZone
-from chunks.chunk2_sentiment_engine.classifiers.dynamic_zones import get_sentiment_zone, get_default_thresholds
+from src.models.regime import MarketRegime
+from chunks.chunk2_sentiment_engine.config import load_sentiment_config
+from chunks.chunk2_sentiment_engine.classifiers.dynamic_zones import get_default_thresholds
+from chunks.chunk2_sentiment_engine.transitions.hysteresis import HysteresisClassifier, RegimeState
+from chunks.chunk2_sentiment_engine.transitions.smoothing_engine import EwmaSmoother
+
+# Redis key holding the engine's checkpoint
+ENGINE_STATE_KEY = "regime_engine:state"
+
+def _aware(timestamp: datetime) -> datetime:
+    """Treats naive timestamps as local time, so they compare with the database's timezone-aware ones."""
+    return timestamp if timestamp.tzinfo else timestamp.astimezone()
+
+class RegimeEngine:
+    """
+    Turns the stream of composite sentiment scores into regimes.
+
+    The smoothing and hysteresis state is kept in memory and checkpointed to
+    Redis after every update, so an update costs O(1) and no database read,
+    and a restarted engine resumes where it stopped. A market_regime row is
+    written only when the zone or the transition state changes.
+    """
+    def __init__(self, smoother: EwmaSmoother, classifier: HysteresisClassifier,
+                 last_state: Optional[RegimeState] = None):
+        self.smoother = smoother
+        self.classifier = classifier
+        self.last_state = last_state
+
+    @classmethod
+    def load(cls, redis_conn: Optional[redis.Redis] = None) -> "RegimeEngine":
+        """Restores the engine from its Redis checkpoint, or starts a fresh one if there is none."""
+        settings = load_sentiment_config()["regime"]
+        engine = cls(EwmaSmoother(settings["smoothing_half_life_minutes"] * 60),
+                     HysteresisClassifier(get_default_thresholds(), settings["hysteresis_band"],
+                                          settings["confirm_updates"]))
+        checkpoint = (redis_conn or get_redis_connection()).get(ENGINE_STATE_KEY)
+        if checkpoint:
+            engine.restore(json.loads(checkpoint))
+        return engine
+
+    def to_dict(self) -> dict:
+        return {"smoother": self.smoother.to_dict(), "classifier": self.classifier.to_dict()}
+
+    def restore(self, state: dict):
+        """Resets the engine to a state from to_dict()."""
+        self.smoother = EwmaSmoother.from_dict(self.smoother.half_life_seconds, state["smoother"])
+        classifier = self.classifier
+        self.classifier = HysteresisClassifier.from_dict(classifier.thresholds, classifier.band,
+                                                         classifier.confirm_updates, state["classifier"])
+        self.last_state = self.classifier.state() if self.classifier.zone else None
+
+    def checkpoint(self, redis_conn: Optional[redis.Redis] = None):
+        """Saves the engine's state to Redis."""
+        (redis_conn or get_redis_connection()).set(ENGINE_STATE_KEY, json.dumps(self.to_dict()))
+
+    def update(self, composite_score: float, timestamp: datetime) -> Optional[RegimeState]:
+        """
+        Folds a new composite score into the regime.
+
+        Returns:
+            Optional[RegimeState]: The new state if it changed and should be recorded, else None.
+                Scores no newer than the last one applied, e.g. redelivered events, are ignored.
+        """
+        timestamp = _aware(timestamp)
+        if self.smoother.timestamp is not None and timestamp <= self.smoother.timestamp:
+            return None
+        smoothed = self.smoother.update(composite_score, timestamp)
+        state = self.classifier.update(smoothed, timestamp)
+        if self.last_state is not None and state.key() == self.last_state.key():
+            return None
+        self.last_state = state
+        return state
+
+def store_regime(db: Session, sentiment_id: int, timestamp: datetime, state: RegimeState) -> MarketRegime:
+    """Writes a regime state to market_regime and announces it."""
+    new_regime = MarketRegime(sentiment_id=sentiment_id, **state._asdict())
+    db.add(new_regime)
+    db.commit()
+    print(f"Stored new regime: {state.zone.value}"
+          + (f", transitioning to {state.next_zone.value}" if state.is_transitioning else ""))
+    publish(RegimeUpdated(timestamp=timestamp, regime_id=new_regime.id, sentiment_id=sentiment_id,
+                          zone=state.zone.value))
+    return new_regime
+
+def apply_sentiment(engine: RegimeEngine, sentiment_id: int, composite_score: float, timestamp: datetime,
+                    db: Optional[Session] = None) -> Optional[RegimeState]:
+    """
+    Updates the engine with one sentiment reading, stores the regime if it
+    changed and checkpoints the engine. A database session is only opened
+    when there is something to store.
+
+    Returns:
+        Optional[RegimeState]: The stored state, or None if the regime did not change.
+    """
+    before = engine.to_dict()
+    state = engine.update(composite_score, timestamp)
+    if state is not None:
+        session = db or next(get_db())
+        try:
+            store_regime(session, sentiment_id, timestamp, state)
+        except Exception:
+            # Forget the update, so the redelivered event changes the regime again
+            engine.restore(before)
+            raise
+        finally:
+            if db is None:
+                session.close()
+    try:
+        engine.checkpoint()
+    except redis.RedisError as e:
+        print(f"Could not checkpoint the regime engine: {e}")
+    return state
 
 def get_latest_market_sentiment(db: Session) -> MarketSentiment:
     """Fetches the most recent market sentiment record from the database."""
     return db.query(MarketSentiment).order_by(MarketSentiment.timestamp.desc()).first()
 
-def determine_and_store_regime(db: Session):
+def determine_and_store_regime(db: Session, sentiment_id: Optional[int] = None):
     """
-    Determines the current market regime based on the latest sentiment data
-    and stores it in the database.
+    Feeds the latest market sentiment, or the market_sentiment row `sentiment_id`,
+    through the regime engine and stores the regime if it changed.
     """
-    latest_sentiment = get_latest_market_sentiment(db)
+    if sentiment_id is not None:
+        latest_sentiment = db.get(MarketSentiment, sentiment_id)
+    else:
+        latest_sentiment = get_latest_market_sentiment(db)
     if not latest_sentiment:
         print("No market sentiment data found. Cannot determine regime.")
-        return
+        return None
 
-    thresholds = get_default_thresholds()
-    current_zone = get_sentiment_zone(latest_sentiment.composite_score, thresholds)
-
-    # For now, we'll do a simple direct insertion.
-    # Hysteresis and transition logic will be added later.
-    new_regime = MarketRegime(
-        sentiment_id=latest_sentiment.id,
-        zone=current_zone,
-        transition_strength=1.0,  # Placeholder
-        is_transitioning=False  # Placeholder
-    )
-
-    db.add(new_regime)
-    db.commit()
-    print(f"Successfully stored new regime: {current_zone.value}")
+    return apply_sentiment(RegimeEngine.load(), latest_sentiment.id, latest_sentiment.composite_score,
+                           latest_sentiment.timestamp, db)
 
 def main():
     """Main function to run the regime change process."""
@@ -43,5 +151,22 @@ def main():
     finally:
         db.close()
 
+def consume_events():
+    """
+    Updates the regime on every aggregated sentiment as it is published. The
+    scores are taken from the events, so the database is only touched to
+    store a changed regime.
+    """
+    engine = RegimeEngine.load()
+
+    def handle(events):
+        for event in sorted(events, key=lambda event: event.timestamp):
+            apply_sentiment(engine, event.sentiment_id, event.composite_score, event.timestamp)
+
+    EventConsumer("regime_engine", [SentimentAggregated]).run(handle)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--follow" in sys.argv:
+        consume_events()
+    else:
+        main()
@@ -0,0 +1,62 @@
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+class EwmaSmoother:
+    """
+    An exponentially weighted moving average over irregularly spaced updates.
+
+    The weight of the previous average halves every `half_life_seconds` of
+    elapsed time, so a burst of updates moves the average no further than the
+    same change arriving once. Each update is O(1).
+    """
+    def __init__(self, half_life_seconds: float, value: Optional[float] = None,
+                 timestamp: Optional[datetime] = None):
+        """
+        Initializes the EwmaSmoother.
+
+        Args:
+            half_life_seconds (float): Time for an old value's weight to halve.
+            value (float, optional): The current average, e.g. from a checkpoint.
+            timestamp (datetime, optional): The time of the last update included in `value`.
+        """
+        self.half_life_seconds = half_life_seconds
+        self.value = value
+        self.timestamp = timestamp
+
+    def update(self, score: float, timestamp: datetime) -> float:
+        """Folds a new observation into the average and returns the new average."""
+        if self.value is None:
+            self.value = score
+        else:
+            elapsed = max((timestamp - self.timestamp).total_seconds(), 0.0)
+            alpha = 1.0 - 0.5 ** (elapsed / self.half_life_seconds)
+            self.value += alpha * (score - self.value)
+        self.timestamp = timestamp
+        return self.value
+
+    def to_dict(self) -> dict:
+        return {"value": self.value, "timestamp": self.timestamp.isoformat() if self.timestamp else None}
+
+    @classmethod
+    def from_dict(cls, half_life_seconds: float, state: dict) -> "EwmaSmoother":
+        timestamp = state.get("timestamp")
+        return cls(half_life_seconds, state.get("value"), datetime.fromisoformat(timestamp) if timestamp else None)
+
+def ewma_step(values: np.ndarray, elapsed_seconds: np.ndarray, scores: np.ndarray,
+              half_life_seconds: float) -> np.ndarray:
+    """
+    Applies one EwmaSmoother update to many series at once.
+
+    Args:
+        values (np.ndarray): Current averages; NaN for series without one, which start at their score.
+        elapsed_seconds (np.ndarray): Time since each series' last update.
+        scores (np.ndarray): The new observations.
+        half_life_seconds (float): Time for an old value's weight to halve.
+
+    Returns:
+        np.ndarray: The new averages.
+    """
+    alpha = 1.0 - 0.5 ** (np.maximum(elapsed_seconds, 0.0) / half_life_seconds)
+    return np.where(np.isnan(values), scores, values + alpha * (scores - values))
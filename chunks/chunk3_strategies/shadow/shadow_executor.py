@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 from src.database import get_db
+from src.event_bus import SignalStored, publish
 from chunks.chunk3_strategies.strategies.trend_following import TrendFollowingStrategy
 from chunks.chunk3_strategies.strategies.mean_reversion import MeanReversionStrategy
 from chunks.chunk3_strategies.strategies.defensive import DefensiveStrategy
@@ -22,6 +23,9 @@ def run_shadow_execution():
             for signal in signals:
                 db.add(signal)
             db.commit()
+            # Let the conflict resolver react to the new signals
+            for signal in signals:
+                publish(SignalStored(timestamp=signal.timestamp, asset_id=signal.asset_id, signal_id=signal.signal_id))
         print("Shadow execution completed successfully.")
     finally:
         db.close()
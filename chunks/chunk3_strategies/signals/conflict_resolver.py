@@ -1,7 +1,9 @@
+import sys
 from typing import List
 from src.models.signals import TradeSignal, SignalDirection
 from src.models.master_signal import MasterSignal
 from src.database import SessionLocal
+from src.event_bus import EventConsumer, SignalStored
 from sqlalchemy import desc
 from datetime import datetime
 
@@ -55,3 +57,19 @@ def resolve_conflicts(asset_id: int) -> MasterSignal:
             return None
     finally:
         db.close()
+
+
+def consume_events():
+    """
+    Resolves conflicts for an asset as soon as a new signal for it is stored,
+    once per asset in each batch of SignalStored events.
+    """
+    def handle(events):
+        for asset_id in sorted({event.asset_id for event in events}):
+            resolve_conflicts(asset_id)
+
+    EventConsumer("conflict_resolver", [SignalStored]).run(handle)
+
+if __name__ == "__main__":
+    if "--follow" in sys.argv:
+        consume_events()
@@ -1,18 +1,24 @@
 import sys
 from datetime import datetime
+from typing import Optional
 sys.path.append('.')
 
 from src.database import SessionLocal
 from src.models.orders import Order, OrderSchema, TradeSide
 from src.models.signals import TradeSignal, SignalDirection
 
-def place_order(signal: TradeSignal, size: float) -> OrderSchema:
+def place_order(signal: TradeSignal, size: float, filled_price: Optional[float] = None,
+                timestamp: Optional[datetime] = None, session_factory=SessionLocal) -> OrderSchema:
     """
     Places an order based on a trade signal and logs it to the database.
+
+    The fill price, timestamp and session factory default to the live setup;
+    the backtester passes its simulated fill, clock time and in-memory database.
     """
-    db = SessionLocal()
+    db = session_factory()
     try:
         side = TradeSide.BUY if signal.direction == SignalDirection.LONG else TradeSide.SELL
+        now = timestamp or datetime.now()
 
         new_order = Order(
             signal_id=signal.signal_id,
@@ -22,8 +28,11 @@ def place_order(signal: TradeSignal, size: float) -> OrderSchema:
             side=side,
             quantity=size,
             status="filled", # Assume immediate fill for now
-            created_at=datetime.now(),
-            executed_at=datetime.now()
+            filled_quantity=size if filled_price is not None else 0,
+            filled_price=filled_price,
+            created_at=now,
+            updated_at=now,
+            executed_at=now
         )
         db.add(new_order)
         db.commit()
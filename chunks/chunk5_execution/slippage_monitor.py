@@ -1,28 +1,33 @@
 
 import sys
+from datetime import datetime
+from typing import Optional
 sys.path.append('.')
 
 from src.database import SessionLocal
 from src.models.orders import Order
 from src.models.slippage import Slippage
 
-def calculate_and_store_slippage(order: Order):
+def calculate_and_store_slippage(order: Order, expected_price: Optional[float] = None,
+                                 timestamp: Optional[datetime] = None, session_factory=SessionLocal):
     """
     Calculates the slippage for an order and stores it in the database.
     """
-    db = SessionLocal()
+    db = session_factory()
     try:
-        # For now, we'll assume a fixed expected price.
-        # In a real-world scenario, this would be fetched from a price feed.
-        expected_price = 100.0
+        if expected_price is None:
+            # For now, we'll assume a fixed expected price.
+            # In a real-world scenario, this would be fetched from a price feed.
+            expected_price = 100.0
 
         slippage = order.filled_price - expected_price
 
         new_slippage = Slippage(
-            order_id=order.order_id,
+            order_id=str(order.order_id),
             expected_price=expected_price,
             actual_price=order.filled_price,
-            slippage=slippage
+            slippage=slippage,
+            created_at=timestamp or datetime.now()
         )
         db.add(new_slippage)
         db.commit()
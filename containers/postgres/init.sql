@@ -6,7 +6,8 @@ CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 -- Create the main schema
 CREATE SCHEMA IF NOT EXISTS trading_framework;
 
--- Set search path to our schema
+-- Set search path to our schema for this script; the functions below set their own,
+-- as the sessions that call them do not
 SET search_path TO trading_framework, public;
 
 -- Create enum types
@@ -29,8 +30,11 @@ CREATE TABLE assets (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- market_data, fear_greed_index and social_sentiment are range-partitioned by month
+-- on timestamp (see "Time partitioning" below), so their primary and unique keys
+-- include timestamp
 CREATE TABLE market_data (
-    data_id SERIAL PRIMARY KEY,
+    data_id BIGSERIAL,
     asset_id INTEGER REFERENCES assets(asset_id),
     timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
     open NUMERIC(20, 8) NOT NULL,
@@ -40,18 +44,53 @@ CREATE TABLE market_data (
     volume NUMERIC(30, 8) NOT NULL,
     quote_volume NUMERIC(30, 8),
     trades_count INTEGER,
+    ingested_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(), -- Drives the incremental rollups; see stamp_ingested_at()
+    PRIMARY KEY (data_id, timestamp),
     UNIQUE(asset_id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Hourly and daily OHLCV rollups of market_data, maintained by refresh_ohlcv_rollups()
+CREATE TABLE market_data_1h (
+    asset_id INTEGER REFERENCES assets(asset_id),
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    open NUMERIC(20, 8) NOT NULL,
+    high NUMERIC(20, 8) NOT NULL,
+    low NUMERIC(20, 8) NOT NULL,
+    close NUMERIC(20, 8) NOT NULL,
+    volume NUMERIC(30, 8) NOT NULL,
+    bar_count INTEGER NOT NULL,
+    PRIMARY KEY (asset_id, bucket)
+);
+
+CREATE TABLE market_data_1d (
+    asset_id INTEGER REFERENCES assets(asset_id),
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    open NUMERIC(20, 8) NOT NULL,
+    high NUMERIC(20, 8) NOT NULL,
+    low NUMERIC(20, 8) NOT NULL,
+    close NUMERIC(20, 8) NOT NULL,
+    volume NUMERIC(30, 8) NOT NULL,
+    bar_count INTEGER NOT NULL,
+    PRIMARY KEY (asset_id, bucket)
 );
 
+CREATE TABLE rollup_state (
+    name VARCHAR(50) PRIMARY KEY,
+    last_ingested_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT '-infinity'
+);
+
+INSERT INTO rollup_state (name) VALUES ('market_data');
+
 -- Sentiment Data Tables
 CREATE TABLE fear_greed_index (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
     value INTEGER NOT NULL CHECK (value BETWEEN 0 AND 100),
     value_classification VARCHAR(50),
     timestamp_until TIMESTAMP WITH TIME ZONE,
+    PRIMARY KEY (id, timestamp),
     UNIQUE(timestamp)
-);
+) PARTITION BY RANGE (timestamp);
 
 CREATE TABLE on_chain_metrics (
     id SERIAL PRIMARY KEY,
@@ -65,15 +104,16 @@ CREATE TABLE on_chain_metrics (
 );
 
 CREATE TABLE social_sentiment (
-    id SERIAL PRIMARY KEY,
+    id BIGSERIAL,
     timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
     asset_id INTEGER REFERENCES assets(asset_id),
     source VARCHAR(50) NOT NULL,
     sentiment_score NUMERIC(5, 4) CHECK (sentiment_score BETWEEN -1 AND 1),
     volume INTEGER,
     mentions INTEGER,
+    PRIMARY KEY (id, timestamp),
     UNIQUE(timestamp, asset_id, source)
-);
+) PARTITION BY RANGE (timestamp);
 
 CREATE TABLE options_data (
     id SERIAL PRIMARY KEY,
@@ -100,6 +140,7 @@ CREATE TABLE market_sentiment (
     options_weight NUMERIC(5, 4),
     composite_score NUMERIC(5, 4),
     confidence_score NUMERIC(5, 4) CHECK (confidence_score BETWEEN 0 AND 1),
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
     UNIQUE(timestamp)
 );
 
@@ -116,6 +157,41 @@ CREATE TABLE market_regime (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Per-asset composite sentiment, one row per asset and aggregation cycle, partitioned by
+-- month like social_sentiment; Fear & Greed is market-wide and contributes the same score to every asset
+CREATE TABLE asset_sentiment (
+    id BIGSERIAL,
+    asset_id INTEGER NOT NULL REFERENCES assets(asset_id),
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+    fear_greed_score NUMERIC(5, 4),
+    fear_greed_weight NUMERIC(5, 4),
+    on_chain_score NUMERIC(5, 4),
+    on_chain_weight NUMERIC(5, 4),
+    social_score NUMERIC(5, 4),
+    social_weight NUMERIC(5, 4),
+    options_score NUMERIC(5, 4),
+    options_weight NUMERIC(5, 4),
+    composite_score NUMERIC(5, 4) NOT NULL,
+    confidence_score NUMERIC(5, 4) NOT NULL CHECK (confidence_score BETWEEN 0 AND 1),
+    PRIMARY KEY (id, timestamp),
+    UNIQUE(asset_id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Current regime of each asset with the smoothing and hysteresis state it was derived from
+CREATE TABLE asset_regime (
+    asset_id INTEGER PRIMARY KEY REFERENCES assets(asset_id),
+    zone sentiment_zone NOT NULL,
+    smoothed_score DOUBLE PRECISION NOT NULL,
+    transition_strength NUMERIC(5, 4) NOT NULL,
+    is_transitioning BOOLEAN NOT NULL DEFAULT FALSE,
+    previous_zone sentiment_zone,
+    next_zone sentiment_zone,
+    pending_updates INTEGER NOT NULL DEFAULT 0,
+    transition_start TIMESTAMP WITH TIME ZONE,
+    transition_end TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
 -- Strategy and Signal Tables
 CREATE TABLE strategies (
     strategy_id SERIAL PRIMARY KEY,
@@ -141,7 +217,8 @@ CREATE TABLE strategy_signals (
     take_profit NUMERIC(20, 8),
     ttl TIMESTAMP WITH TIME ZONE,
     is_executed BOOLEAN DEFAULT FALSE,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
 );
 
 -- Risk Management Tables
@@ -263,15 +340,69 @@ CREATE TABLE alerts (
 );
 
 -- Create indexes for performance
-CREATE INDEX idx_market_data_asset_time ON market_data(asset_id, timestamp DESC);
+-- Point and per-asset range lookups on market_data use its (asset_id, timestamp) unique index;
+-- BRIN indexes serve time range scans of the append-ordered partitions at a fraction of the size
+CREATE INDEX idx_market_data_time_brin ON market_data USING BRIN (timestamp) WITH (pages_per_range = 32);
+CREATE INDEX idx_market_data_ingested_brin ON market_data USING BRIN (ingested_at) WITH (pages_per_range = 32);
+CREATE INDEX idx_social_sentiment_time_brin ON social_sentiment USING BRIN (timestamp) WITH (pages_per_range = 32);
+CREATE INDEX idx_social_sentiment_asset_source_time ON social_sentiment(asset_id, source, timestamp DESC);
+CREATE INDEX idx_on_chain_metrics_asset_time ON on_chain_metrics(asset_id, timestamp DESC);
+CREATE INDEX idx_options_data_asset_time ON options_data(asset_id, timestamp DESC);
+CREATE INDEX idx_fear_greed_time_brin ON fear_greed_index USING BRIN (timestamp);
 CREATE INDEX idx_market_sentiment_time ON market_sentiment(timestamp DESC);
 CREATE INDEX idx_market_regime_time ON market_regime(created_at DESC);
+CREATE INDEX idx_asset_sentiment_time_brin ON asset_sentiment USING BRIN (timestamp) WITH (pages_per_range = 32);
 CREATE INDEX idx_strategy_signals_time ON strategy_signals(timestamp DESC);
+-- Changed-row lookups of the data lake sync (src/data_ingestion/data_lake.py)
+CREATE INDEX idx_market_sentiment_updated ON market_sentiment(updated_at);
+CREATE INDEX idx_strategy_signals_updated ON strategy_signals(updated_at);
 CREATE INDEX idx_orders_status_time ON orders(status, created_at DESC);
 CREATE INDEX idx_trades_asset_time ON trades(asset_id, executed_at DESC);
 CREATE INDEX idx_system_health_time ON system_health(timestamp DESC);
 CREATE INDEX idx_alerts_severity_time ON alerts(severity, timestamp DESC);
 
+-- Stamp updated_at on every insert and update, including the DO UPDATE branch of
+-- upserts, with the time the row is written rather than the start of its transaction,
+-- so the data lake sync can tell which rows have settled (see src/data_ingestion/data_lake.py)
+CREATE OR REPLACE FUNCTION touch_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SET search_path = trading_framework, public;
+
+CREATE TRIGGER market_sentiment_touch_updated_at BEFORE INSERT OR UPDATE ON market_sentiment
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+CREATE TRIGGER strategy_signals_touch_updated_at BEFORE INSERT OR UPDATE ON strategy_signals
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+-- Likewise for market_regime rows, which are never updated
+CREATE OR REPLACE FUNCTION stamp_created_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.created_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SET search_path = trading_framework, public;
+
+CREATE TRIGGER market_regime_stamp_created_at BEFORE INSERT ON market_regime
+    FOR EACH ROW EXECUTE FUNCTION stamp_created_at();
+
+-- Stamp ingested_at with the time the bar is written rather than the start of its
+-- transaction, so a long bulk load does not commit bars stamped behind the rollup
+-- watermark (see refresh_ohlcv_rollups)
+CREATE OR REPLACE FUNCTION stamp_ingested_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.ingested_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SET search_path = trading_framework, public;
+
+CREATE TRIGGER market_data_stamp_ingested_at BEFORE INSERT ON market_data
+    FOR EACH ROW EXECUTE FUNCTION stamp_ingested_at();
+
 -- Create views for common queries
 CREATE VIEW latest_market_data AS
 SELECT DISTINCT ON (asset_id) 
@@ -296,3 +427,163 @@ SELECT * FROM positions WHERE quantity != 0;
 
 CREATE VIEW pending_orders AS
 SELECT * FROM orders WHERE status = 'pending' OR status = 'open';
+
+-- Time partitioning
+-- Monthly partitions are named <table>_pYYYYMM and cover UTC calendar months. Rows
+-- outside every monthly partition land in <table>_default; creating the partition
+-- for their month later moves them out of it.
+CREATE OR REPLACE FUNCTION create_monthly_partitions(parent TEXT, from_month DATE, to_month DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    month DATE := date_trunc('month', from_month)::DATE;
+    lower_bound TIMESTAMP WITH TIME ZONE;
+    upper_bound TIMESTAMP WITH TIME ZONE;
+    partition_name TEXT;
+    default_name TEXT := parent || '_default';
+    has_rows BOOLEAN;
+    created INTEGER := 0;
+BEGIN
+    WHILE month <= to_month LOOP
+        partition_name := parent || '_p' || to_char(month, 'YYYYMM');
+        lower_bound := month::TIMESTAMP AT TIME ZONE 'UTC';
+        upper_bound := (month + INTERVAL '1 month')::TIMESTAMP AT TIME ZONE 'UTC';
+        IF to_regclass(format('trading_framework.%I', partition_name)) IS NULL THEN
+            EXECUTE format('SELECT EXISTS (SELECT 1 FROM trading_framework.%I WHERE timestamp >= %L AND timestamp < %L)',
+                           default_name, lower_bound, upper_bound) INTO STRICT has_rows;
+            IF has_rows THEN
+                -- Move the month's rows out of the default partition, then attach
+                EXECUTE format('CREATE TABLE trading_framework.%I (LIKE trading_framework.%I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                               partition_name, parent);
+                EXECUTE format('WITH moved AS (DELETE FROM trading_framework.%I WHERE timestamp >= %L AND timestamp < %L RETURNING *) '
+                               'INSERT INTO trading_framework.%I SELECT * FROM moved',
+                               default_name, lower_bound, upper_bound, partition_name);
+                EXECUTE format('ALTER TABLE trading_framework.%I ATTACH PARTITION trading_framework.%I FOR VALUES FROM (%L) TO (%L)',
+                               parent, partition_name, lower_bound, upper_bound);
+            ELSE
+                EXECUTE format('CREATE TABLE trading_framework.%I PARTITION OF trading_framework.%I FOR VALUES FROM (%L) TO (%L)',
+                               partition_name, parent, lower_bound, upper_bound);
+            END IF;
+            created := created + 1;
+        END IF;
+        month := (month + INTERVAL '1 month')::DATE;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql SET search_path = trading_framework, public;
+
+-- Creates the partitions for the coming months; run regularly (see scripts/run_db_maintenance.py)
+CREATE OR REPLACE FUNCTION maintain_partitions(months_ahead INTEGER DEFAULT 3)
+RETURNS INTEGER AS $$
+DECLARE
+    this_month DATE := date_trunc('month', NOW() AT TIME ZONE 'UTC')::DATE;
+    last_month DATE := (date_trunc('month', NOW() AT TIME ZONE 'UTC') + make_interval(months => months_ahead))::DATE;
+BEGIN
+    RETURN create_monthly_partitions('market_data', this_month, last_month)
+         + create_monthly_partitions('social_sentiment', this_month, last_month)
+         + create_monthly_partitions('fear_greed_index', this_month, last_month)
+         + create_monthly_partitions('asset_sentiment', this_month, last_month);
+END;
+$$ LANGUAGE plpgsql SET search_path = trading_framework, public;
+
+CREATE TABLE market_data_default PARTITION OF market_data DEFAULT;
+CREATE TABLE social_sentiment_default PARTITION OF social_sentiment DEFAULT;
+CREATE TABLE fear_greed_index_default PARTITION OF fear_greed_index DEFAULT;
+CREATE TABLE asset_sentiment_default PARTITION OF asset_sentiment DEFAULT;
+
+-- Bars and sentiment as far back as their retention in configs/database.yaml, for backfills,
+-- and the whole Fear & Greed history (from February 2018)
+SELECT create_monthly_partitions('market_data', (NOW() - INTERVAL '6 months')::DATE, NOW()::DATE);
+SELECT create_monthly_partitions('social_sentiment', (NOW() - INTERVAL '12 months')::DATE, NOW()::DATE);
+SELECT create_monthly_partitions('asset_sentiment', (NOW() - INTERVAL '12 months')::DATE, NOW()::DATE);
+SELECT create_monthly_partitions('fear_greed_index', DATE '2018-02-01', NOW()::DATE);
+SELECT maintain_partitions(3);
+
+-- OHLCV rollups
+-- Recomputes every hourly and daily bucket that received bars since the last run,
+-- so bars that arrive late are rolled up too. Bars are insert-only (a re-sent bar is
+-- dropped on conflict), so a bucket never needs redoing for a changed bar. Bars
+-- ingested within the last minute are left for the next run, as their transactions
+-- may not have committed. ingested_at is stamped as each bar is written, so this
+-- assumes no ingest transaction commits more than a minute after writing a bar:
+-- bulk_insert() merges each batch in its last statement before committing, and a
+-- batch whose merge runs longer than that must be made smaller.
+CREATE OR REPLACE FUNCTION refresh_ohlcv_rollups()
+RETURNS INTEGER AS $$
+DECLARE
+    since TIMESTAMP WITH TIME ZONE;
+    upto TIMESTAMP WITH TIME ZONE := NOW() - INTERVAL '1 minute';
+    hours INTEGER;
+BEGIN
+    SELECT last_ingested_at INTO STRICT since FROM rollup_state WHERE name = 'market_data' FOR UPDATE;
+
+    CREATE TEMP TABLE touched_hours ON COMMIT DROP AS
+    SELECT DISTINCT asset_id, date_trunc('hour', timestamp, 'UTC') AS bucket
+    FROM market_data
+    WHERE ingested_at > since AND ingested_at <= upto;
+    GET DIAGNOSTICS hours = ROW_COUNT;
+
+    INSERT INTO market_data_1h (asset_id, bucket, open, high, low, close, volume, bar_count)
+    SELECT m.asset_id, t.bucket,
+           (array_agg(m.open ORDER BY m.timestamp))[1], max(m.high), min(m.low),
+           (array_agg(m.close ORDER BY m.timestamp DESC))[1], sum(m.volume), count(*)
+    FROM touched_hours t
+    JOIN market_data m ON m.asset_id = t.asset_id
+                      AND m.timestamp >= t.bucket AND m.timestamp < t.bucket + INTERVAL '1 hour'
+    GROUP BY m.asset_id, t.bucket
+    ON CONFLICT (asset_id, bucket) DO UPDATE SET
+        open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, close = EXCLUDED.close,
+        volume = EXCLUDED.volume, bar_count = EXCLUDED.bar_count;
+
+    -- Daily buckets are rebuilt from the hourly rollup rather than the raw bars
+    INSERT INTO market_data_1d (asset_id, bucket, open, high, low, close, volume, bar_count)
+    SELECT h.asset_id, d.bucket,
+           (array_agg(h.open ORDER BY h.bucket))[1], max(h.high), min(h.low),
+           (array_agg(h.close ORDER BY h.bucket DESC))[1], sum(h.volume), sum(h.bar_count)
+    FROM (SELECT DISTINCT asset_id, date_trunc('day', bucket, 'UTC') AS bucket FROM touched_hours) d
+    JOIN market_data_1h h ON h.asset_id = d.asset_id
+                         AND h.bucket >= d.bucket AND h.bucket < d.bucket + INTERVAL '1 day'
+    GROUP BY h.asset_id, d.bucket
+    ON CONFLICT (asset_id, bucket) DO UPDATE SET
+        open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, close = EXCLUDED.close,
+        volume = EXCLUDED.volume, bar_count = EXCLUDED.bar_count;
+
+    UPDATE rollup_state SET last_ingested_at = GREATEST(since, upto) WHERE name = 'market_data';
+    RETURN hours;
+END;
+$$ LANGUAGE plpgsql SET search_path = trading_framework, public;
+
+-- Retention
+-- Drops the monthly partitions of `parent` that ended more than `horizon` ago and
+-- returns their names. market_data partitions are only dropped once every bar in
+-- them has been rolled up, so the hourly and daily history outlives the raw bars.
+CREATE OR REPLACE FUNCTION drop_expired_partitions(parent TEXT, horizon INTERVAL)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    partition_name TEXT;
+    partition_end TIMESTAMP WITH TIME ZONE;
+    rolled_up_until TIMESTAMP WITH TIME ZONE;
+    newest_ingested TIMESTAMP WITH TIME ZONE;
+BEGIN
+    SELECT last_ingested_at INTO rolled_up_until FROM rollup_state WHERE name = 'market_data';
+    FOR partition_name IN
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        JOIN pg_class parent_table ON parent_table.oid = pg_inherits.inhparent
+        JOIN pg_namespace ns ON ns.oid = parent_table.relnamespace
+        WHERE ns.nspname = 'trading_framework' AND parent_table.relname = parent
+          AND child.relname ~ ('^' || parent || '_p[0-9]{6}$')
+        ORDER BY child.relname
+    LOOP
+        partition_end := (to_date(right(partition_name, 6), 'YYYYMM') + INTERVAL '1 month')::TIMESTAMP AT TIME ZONE 'UTC';
+        EXIT WHEN partition_end > NOW() - horizon;
+        IF parent = 'market_data' THEN
+            EXECUTE format('SELECT max(ingested_at) FROM trading_framework.%I', partition_name) INTO newest_ingested;
+            CONTINUE WHEN newest_ingested > rolled_up_until;
+        END IF;
+        EXECUTE format('ALTER TABLE trading_framework.%I DETACH PARTITION trading_framework.%I', parent, partition_name);
+        EXECUTE format('DROP TABLE trading_framework.%I', partition_name);
+        RETURN NEXT partition_name;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql SET search_path = trading_framework, public;
@@ -3,7 +3,9 @@ import pandas as pd
 import sys
 sys.path.append('.')
 
+import redis
 from src.database import SessionLocal
+from src.event_bus import RegimeUpdated, latest_event
 from src.models.signals import TradeSignal
 from src.models.orders import Order
 
@@ -21,12 +23,23 @@ def get_latest_orders():
     finally:
         db.close()
 
+def get_current_regime():
+    """Reads the newest regime from the event stream instead of querying the database."""
+    try:
+        return latest_event(RegimeUpdated)
+    except redis.RedisError:
+        return None
+
 def main():
     st.title("Fear & Greed Adaptive Trading Framework")
 
     # --- Current Regime ---
     st.header("Current Regime")
-    st.write("Euphoric") # Placeholder
+    regime = get_current_regime()
+    if regime:
+        st.write(f"{regime.zone.replace('_', ' ').title()} (as of {regime.timestamp:%Y-%m-%d %H:%M})")
+    else:
+        st.write("No regime published yet.")
 
     # --- Latest Signals ---
     st.header("Latest Signals")
@@ -0,0 +1,25 @@
+import argparse
+import sys
+sys.path.append('.')
+
+from src.data_ingestion.data_lake import LAKE_TABLES, compact_data_lake, sync_data_lake
+
+def run():
+    """
+    Mirrors the rows added or changed since the last run into the Parquet data lake at
+    settings.DATA_LAKE_DIR, optionally compacting the partitions afterwards.
+    Schedule it, e.g. hourly from cron; reruns after a failure are safe.
+    """
+    parser = argparse.ArgumentParser(description="Sync research tables into the Parquet data lake.")
+    parser.add_argument('--tables', nargs='+', choices=sorted(LAKE_TABLES), help="Tables to sync (default: all).")
+    parser.add_argument('--compact', action='store_true', help="Merge each partition into a single file after syncing.")
+    args = parser.parse_args()
+
+    for table, count in sync_data_lake(args.tables).items():
+        print(f"Exported {count} {table} rows.")
+    if args.compact:
+        for table, count in compact_data_lake(args.tables).items():
+            print(f"Compacted {count} {table} partitions.")
+
+if __name__ == "__main__":
+    run()
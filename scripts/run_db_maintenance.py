@@ -0,0 +1,30 @@
+import sys
+sys.path.append('.')
+
+from src.connections import DATABASE_CONFIG_PATH, _load_config, db_connection
+
+def run():
+    """
+    Runs the database maintenance jobs defined in containers/postgres/init.sql:
+    creates the coming monthly partitions, brings the hourly and daily OHLCV
+    rollups up to date, and drops raw partitions past their retention horizon.
+    Schedule it, e.g. hourly from cron; every step is idempotent.
+    """
+    maintenance = _load_config(DATABASE_CONFIG_PATH).get('maintenance', {})
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT trading_framework.maintain_partitions(%s)", (maintenance.get('months_ahead', 3),))
+        print(f"Created {cur.fetchone()[0]} partitions.")
+        conn.commit()
+
+        cur.execute("SELECT trading_framework.refresh_ohlcv_rollups()")
+        print(f"Refreshed rollups for {cur.fetchone()[0]} asset-hours.")
+        conn.commit()
+
+        for table, horizon in maintenance.get('retention', {}).items():
+            cur.execute("SELECT * FROM trading_framework.drop_expired_partitions(%s, %s::interval)", (table, horizon))
+            dropped = [row[0] for row in cur.fetchall()]
+            conn.commit()
+            print(f"Dropped {len(dropped)} {table} partitions older than {horizon}: {', '.join(dropped) or 'none'}.")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,137 @@
+"""
+Vectorized backtest engine for threshold strategies.
+
+Signals, positions, costs and the equity curve are computed as whole-array
+NumPy operations instead of a per-bar loop, so a multi-decade daily backtest
+runs in a few milliseconds on in-memory data.
+"""
+import numpy as np
+
+from .metrics import (
+    PerformanceSummary, annualized_return, max_drawdown, sharpe_ratio, sortino_ratio,
+)
+
+def threshold_positions(index_values: np.ndarray, buy_threshold: float, sell_threshold: float) -> np.ndarray:
+    """
+    Evaluates a FearGreedStrategy-style threshold rule over a whole index series.
+
+    Matches FearGreedStrategy.generate_signal: values below `buy_threshold` are
+    BUY (1), values above `sell_threshold` are SELL (-1) and everything else,
+    including missing values, is HOLD (0).
+
+    The thresholds may be arrays that broadcast against `index_values`, e.g. an
+    (n, 1) index column against (1, k) thresholds to evaluate k rules at once.
+
+    Args:
+        index_values (np.ndarray): The Fear & Greed Index values.
+        buy_threshold (float): The index value below which the position is long.
+        sell_threshold (float): The index value above which the position is short.
+
+    Returns:
+        np.ndarray: Target positions (1, -1 or 0) for each bar.
+    """
+    index_values = np.asarray(index_values, dtype=float)
+    # BUY is checked first, as in generate_signal, so it wins where the zones overlap
+    return np.where(index_values < buy_threshold, 1, np.where(index_values > sell_threshold, -1, 0)).astype(np.int8)
+
+def shift_positions(positions: np.ndarray, lag: int = 1) -> np.ndarray:
+    """
+    Delays target positions by `lag` bars so a signal is only traded after the
+    bar that produced it, avoiding lookahead bias. The first `lag` bars are flat.
+    A 2-D array is shifted along its first axis.
+    """
+    positions = np.asarray(positions, dtype=float)
+    if lag <= 0:
+        return positions.copy()
+    held = np.zeros_like(positions)
+    held[lag:] = positions[:-lag]
+    return held
+
+class BacktestResult:
+    """
+    Per-bar output of a vectorized backtest.
+    """
+    def __init__(self, positions: np.ndarray, asset_returns: np.ndarray, strategy_returns: np.ndarray,
+                 costs: np.ndarray, periods_per_year: int = 252):
+        self.positions = positions
+        self.asset_returns = asset_returns
+        self.strategy_returns = strategy_returns
+        self.costs = costs
+        self.periods_per_year = periods_per_year
+        self.equity = np.cumprod(1.0 + strategy_returns, axis=0)
+        self.benchmark_equity = np.cumprod(1.0 + asset_returns)
+
+    @property
+    def trades(self) -> int:
+        """The number of bars on which the held position changed (per column for a 2-D backtest)."""
+        changes = np.diff(self.positions, axis=0, prepend=np.zeros((1,) + self.positions.shape[1:]))
+        trades = np.count_nonzero(changes, axis=0)
+        return int(trades) if np.ndim(trades) == 0 else trades
+
+    def summary(self) -> PerformanceSummary:
+        """
+        Returns the headline performance metrics of a single-column backtest.
+        """
+        if self.positions.ndim != 1:
+            raise ValueError("summary() needs a single position series; use the metrics functions for a grid.")
+        return PerformanceSummary(
+            total_return=float(self.equity[-1] - 1.0) if self.equity.size else 0.0,
+            annualized_return=annualized_return(self.equity, self.periods_per_year),
+            sharpe_ratio=sharpe_ratio(self.strategy_returns, self.periods_per_year),
+            sortino_ratio=sortino_ratio(self.strategy_returns, self.periods_per_year),
+            max_drawdown=max_drawdown(self.equity),
+            trades=self.trades,
+        )
+
+def run_backtest(close: np.ndarray, target_positions: np.ndarray, transaction_cost: float = 0.0,
+                 lag: int = 1, periods_per_year: int = 252) -> BacktestResult:
+    """
+    Runs a vectorized backtest of target positions against a close price series.
+
+    Args:
+        close (np.ndarray): Closing prices, one per bar.
+        target_positions (np.ndarray): Desired exposure per bar (e.g., 1 long, -1 short, 0 flat),
+            or an (n, k) array to backtest k position series against the same prices.
+        transaction_cost (float): Cost per unit of position change, as a fraction of
+            equity (e.g., 0.0005 for 5 bps). A flip from short to long costs twice this.
+        lag (int): Number of bars between a target position and holding it.
+        periods_per_year (int): Annualization factor for the metrics.
+
+    Returns:
+        BacktestResult: Positions held, returns, costs and equity curves per bar.
+    """
+    close = np.asarray(close, dtype=float)
+    target_positions = np.asarray(target_positions, dtype=float)
+    if close.ndim != 1 or target_positions.shape[0] != close.shape[0]:
+        raise ValueError(f"Position array {target_positions.shape} does not match price array {close.shape}.")
+
+    # Simple return earned over each bar; the first bar has nothing to earn
+    asset_returns = np.zeros_like(close)
+    asset_returns[1:] = close[1:] / close[:-1] - 1.0
+
+    if np.isnan(target_positions).any():
+        target_positions = np.nan_to_num(target_positions)
+    held = shift_positions(target_positions, lag)
+    costs = transaction_cost * np.abs(np.diff(held, axis=0, prepend=np.zeros((1,) + held.shape[1:])))
+    bar_returns = asset_returns if held.ndim == 1 else asset_returns[:, None]
+    strategy_returns = held * bar_returns - costs
+    return BacktestResult(held, asset_returns, strategy_returns, costs, periods_per_year)
+
+def backtest_strategy(strategy, close: np.ndarray, index_values: np.ndarray, transaction_cost: float = 0.0,
+                      lag: int = 1, periods_per_year: int = 252) -> BacktestResult:
+    """
+    Backtests a threshold strategy (e.g., FearGreedStrategy) on an index series.
+
+    Args:
+        strategy: Any object with `buy_threshold` and `sell_threshold` attributes.
+        close (np.ndarray): Closing prices, one per bar.
+        index_values (np.ndarray): The index value known at each bar.
+        transaction_cost (float): Cost per unit of position change, as a fraction of equity.
+        lag (int): Number of bars between a signal and holding its position.
+        periods_per_year (int): Annualization factor for the metrics.
+
+    Returns:
+        BacktestResult: Positions held, returns, costs and equity curves per bar.
+    """
+    positions = threshold_positions(index_values, strategy.buy_threshold, strategy.sell_threshold)
+    return run_backtest(close, positions, transaction_cost, lag, periods_per_year)
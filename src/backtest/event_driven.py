@@ -0,0 +1,196 @@
+"""
+Event-driven backtester that runs the live pipeline components off a simulated clock.
+
+Each bar is an event that moves the simulated clock and marks the portfolio.
+On the live loop's schedule (LOOP_INTERVAL_SECONDS) the same SentimentAnalyzer
+and strategy objects the main loop uses compute a signal, and any resulting
+trade goes through the execution chunk's order router and slippage monitor
+against an in-memory database. Unlike the vectorized engine this exercises
+the live code paths, so the two can be compared to catch divergence.
+"""
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from chunks.chunk5_execution.order_management.order_router import place_order
+from chunks.chunk5_execution.slippage_monitor import calculate_and_store_slippage
+from .in_memory import InMemoryMarketDataClient, SimulatedClock, create_in_memory_session_factory
+from .metrics import PerformanceSummary, annualized_return, max_drawdown, sharpe_ratio, sortino_ratio
+from ..config import settings
+from ..logger import get_logger
+from ..models.orders import OrderSchema
+from ..models.signals import SignalDirection, TradeSignal
+from ..sentiment_engine.sentiment_analyzer import SentimentAnalyzer
+from ..utils.time_helpers import seconds_until_next_tick
+
+logger = get_logger(__name__)
+
+@contextmanager
+def _quiet_logging(enabled: bool):
+    """Suppresses INFO-level logging for the duration, as per-decision logging dominates a long run."""
+    if not enabled:
+        yield
+        return
+    previous = logging.root.manager.disable
+    logging.disable(logging.INFO)
+    try:
+        yield
+    finally:
+        logging.disable(previous)
+
+class EventBacktestResult:
+    """
+    Output of an event-driven backtest.
+    """
+    def __init__(self, equity: pd.Series, positions: pd.Series, orders: List[OrderSchema],
+                 initial_cash: float, periods_per_year: int):
+        self.equity = equity
+        self.positions = positions
+        self.orders = orders
+        self.initial_cash = initial_cash
+        self.periods_per_year = periods_per_year
+
+    def summary(self) -> PerformanceSummary:
+        """
+        Returns the headline performance metrics of the run.
+        """
+        equity = self.equity.to_numpy() / self.initial_cash
+        returns = equity / np.r_[1.0, equity[:-1]] - 1.0
+        return PerformanceSummary(
+            total_return=float(equity[-1] - 1.0) if equity.size else 0.0,
+            annualized_return=annualized_return(equity, self.periods_per_year),
+            sharpe_ratio=sharpe_ratio(returns, self.periods_per_year),
+            sortino_ratio=sortino_ratio(returns, self.periods_per_year),
+            max_drawdown=max_drawdown(equity),
+            trades=len(self.orders),
+        )
+
+class EventDrivenBacktester:
+    """
+    Replays historical bars through the live sentiment, strategy and execution components.
+    """
+    def __init__(self, bars: Dict[str, pd.DataFrame], strategy, symbol: str = 'SPY', asset_id: int = 1,
+                 position_size: float = 1.0, initial_cash: float = 100_000.0, slippage_bps: float = 0.0,
+                 decision_interval: Optional[float] = None, start: Optional[str] = None,
+                 periods_per_year: int = 252, quiet: bool = True):
+        """
+        Initializes the EventDrivenBacktester.
+
+        Args:
+            bars (Dict[str, pd.DataFrame]): Bars per symbol with a DatetimeIndex and OHLCV columns.
+                Intraday bars are aggregated into the daily bars the sentiment engine asks for.
+            strategy: The strategy object, e.g. FearGreedStrategy.
+            symbol (str): The symbol to trade.
+            asset_id (int): The asset id written on signals and orders.
+            position_size (float): Units held on a BUY (long) or SELL (short) signal.
+            initial_cash (float): Starting cash.
+            slippage_bps (float): Adverse fill price offset from the bar close, in basis points.
+            decision_interval (float, optional): Seconds between signal evaluations, aligned to the
+                clock as in the live loop. Defaults to settings.LOOP_INTERVAL_SECONDS.
+            start (str, optional): First bar to trade on. Earlier bars only warm up the indicators.
+            periods_per_year (int): Bars per year, for annualizing the metrics (e.g., 252 * 390 for minute bars).
+            quiet (bool): Suppress INFO logging from the pipeline components during the run.
+        """
+        self.symbol = symbol
+        self.asset_id = asset_id
+        self.strategy = strategy
+        self.position_size = position_size
+        self.initial_cash = initial_cash
+        self.slippage_bps = slippage_bps
+        self.decision_interval = decision_interval or settings.LOOP_INTERVAL_SECONDS
+        self.periods_per_year = periods_per_year
+        self.quiet = quiet
+
+        self.clock = SimulatedClock()
+        self.market_data_client = InMemoryMarketDataClient(bars, self.clock)
+        self.sentiment_analyzer = None
+        self.session_factory = None
+
+        traded = bars[symbol].sort_index()
+        self._index = traded.index
+        self._timestamps = self._index.as_unit('ns').asi8 / 10**9
+        self._close = traded['close'].to_numpy(dtype=float)
+        self._start = 0 if start is None else int(self._index.searchsorted(
+            pd.Timestamp(start, tz=self._index.tz) if self._index.tz is not None else pd.Timestamp(start)))
+
+    def _execute(self, quantity: float, price: float, index_value: float) -> OrderSchema:
+        """Sends a trade through the order router and slippage monitor at the simulated time."""
+        now = datetime.fromtimestamp(self.clock.time(), tz=timezone.utc)
+        direction = SignalDirection.LONG if quantity > 0 else SignalDirection.SHORT
+        fill_price = price * (1 + np.sign(quantity) * self.slippage_bps / 10_000)
+        signal = TradeSignal(
+            strategy_id=0,
+            asset_id=self.asset_id,
+            timestamp=now,
+            signal_type="fear_greed",
+            strength=min(abs(index_value - 50) / 50, 1.0),
+            direction=direction,
+            price=price,
+        )
+        order = place_order(signal, abs(quantity), filled_price=fill_price, timestamp=now,
+                            session_factory=self.session_factory)
+        calculate_and_store_slippage(order, expected_price=price, timestamp=now,
+                                     session_factory=self.session_factory)
+        return order
+
+    def run(self) -> EventBacktestResult:
+        """
+        Runs the backtest over every bar of the traded symbol.
+
+        Returns:
+            EventBacktestResult: Equity and position per traded bar, and the orders placed.
+                The orders and slippage records stay queryable through `session_factory`.
+        """
+        # Fresh clock, indicator state and database, so the same backtester can be run again
+        self.clock = SimulatedClock()
+        self.market_data_client.clock = self.clock
+        self.sentiment_analyzer = SentimentAnalyzer(self.market_data_client, use_streaming_indicators=True,
+                                                    clock=self.clock)
+        self.session_factory = create_in_memory_session_factory()
+
+        count = len(self._close) - self._start
+        equity = np.empty(count)
+        positions = np.empty(count)
+        orders = []
+        cash = self.initial_cash
+        position = 0.0
+        next_decision = -np.inf
+
+        logger.info(f"Starting event-driven backtest of {self.symbol} over {count} bars.")
+        with _quiet_logging(self.quiet):
+            for i in range(self._start, len(self._close)):
+                now = self._timestamps[i]
+                price = self._close[i]
+                self.clock.advance_to(now)
+
+                if now >= next_decision:
+                    next_decision = now + seconds_until_next_tick(self.decision_interval, now)
+                    index_value = self.sentiment_analyzer.calculate_fear_greed_index(self.symbol)
+                    signal = self.strategy.generate_signal(index_value)
+                    # As in the live loop, HOLD leaves the current position unchanged
+                    if signal == "BUY":
+                        target = self.position_size
+                    elif signal == "SELL":
+                        target = -self.position_size
+                    else:
+                        target = position
+                    if target != position:
+                        order = self._execute(target - position, price, index_value)
+                        cash -= (target - position) * order.filled_price
+                        position = target
+                        orders.append(order)
+
+                equity[i - self._start] = cash + position * price
+                positions[i - self._start] = position
+
+        index = self._index[self._start:]
+        result = EventBacktestResult(pd.Series(equity, index=index, name='equity'),
+                                     pd.Series(positions, index=index, name='position'),
+                                     orders, self.initial_cash, self.periods_per_year)
+        if count:
+            logger.info(f"Event-driven backtest finished: {len(orders)} orders, final equity {equity[-1]:.2f}.")
+        return result
@@ -0,0 +1,189 @@
+"""
+In-memory data, clock and storage backends for the event-driven backtester.
+
+These stand in for the live market data client, the wall clock and the
+Postgres database so the live pipeline components can be driven over
+historical bars without any network or database access.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from ..database import Base
+from ..models.orders import Order
+from ..models.slippage import Slippage
+
+DAY_NS = 24 * 60 * 60 * 10**9
+
+class SimulatedClock:
+    """
+    A clock that only moves when the backtester sets it to the next event.
+    """
+    def __init__(self, start: float = 0.0):
+        self._now = start
+
+    def time(self) -> float:
+        """Returns the current simulated time in seconds since the epoch."""
+        return self._now
+
+    def advance_to(self, timestamp: float):
+        """Moves the simulated time forward to `timestamp`."""
+        if timestamp < self._now:
+            raise ValueError("The simulated clock cannot move backwards.")
+        self._now = timestamp
+
+    async def sleep(self, seconds: float):
+        """Advances the simulated time without waiting."""
+        self._now += seconds
+
+    def finished(self) -> bool:
+        """The simulated clock is driven externally and never runs out on its own."""
+        return False
+
+class _SymbolBars:
+    """Bars for one symbol as arrays, with the running daily aggregates needed to serve a forming day."""
+    def __init__(self, bars: pd.DataFrame):
+        bars = bars.sort_index()
+        index = bars.index if bars.index.tz is not None else bars.index.tz_localize('UTC')
+        self.tz = index.tz
+        self.timestamps = index.as_unit('ns').asi8
+        names = [name for name in ('open', 'high', 'low', 'close', 'volume') if name in bars.columns]
+        # Bars are served as slices of one 2-D array, which is far cheaper to wrap in a DataFrame per call
+        self.columns = pd.Index(names)
+        self.values = bars[names].to_numpy(dtype=float)
+        self.close = self.values[:, names.index('close')]
+        spacing = np.diff(self.timestamps)
+        self.intraday = spacing.size > 0 and np.median(spacing) < DAY_NS
+
+        if self.intraday:
+            # Running open/high/low/close/volume of each bar's day, as of that bar
+            days = index.normalize()
+            self.day_keys = days.as_unit('ns').asi8
+            grouped = bars[names].groupby(self.day_keys)
+            running = []
+            for name in names:
+                if name == 'open':
+                    running.append(grouped['open'].transform('first'))
+                elif name == 'high':
+                    running.append(grouped['high'].cummax())
+                elif name == 'low':
+                    running.append(grouped['low'].cummin())
+                elif name == 'volume':
+                    running.append(grouped['volume'].cumsum())
+                else:
+                    running.append(bars['close'])
+            self.running = np.column_stack([series.to_numpy(dtype=float) for series in running])
+
+            # Completed days, taken from the running aggregates at each day's last bar
+            last_of_day = np.flatnonzero(np.r_[self.day_keys[1:] != self.day_keys[:-1], True])
+            self.daily_timestamps = self.day_keys[last_of_day]
+            self.daily_last_bar = last_of_day
+
+    def _frame(self, values: np.ndarray, timestamps: np.ndarray) -> pd.DataFrame:
+        index = pd.DatetimeIndex(timestamps.view('M8[ns]')).tz_localize('UTC').tz_convert(self.tz)
+        return pd.DataFrame(values, index=index, columns=self.columns, copy=False)
+
+    def daily(self, start_ns: int, now_ns: int) -> Optional[pd.DataFrame]:
+        """Daily bars from `start_ns` up to `now_ns`, with the current day built from the bars so far."""
+        position = np.searchsorted(self.timestamps, now_ns, side='right') - 1
+        if position < 0:
+            return None
+        today = self.day_keys[position]
+        first = np.searchsorted(self.daily_timestamps, start_ns, side='left')
+        last = np.searchsorted(self.daily_timestamps, today, side='left')
+        rows = np.r_[self.daily_last_bar[first:last], position]
+        return self._frame(self.running[rows], np.r_[self.daily_timestamps[first:last], today])
+
+    def bars(self, start_ns: int, now_ns: int) -> Optional[pd.DataFrame]:
+        """Bars at their own frequency from `start_ns` up to `now_ns`."""
+        first = np.searchsorted(self.timestamps, start_ns, side='left')
+        last = np.searchsorted(self.timestamps, now_ns, side='right')
+        if last == 0:
+            return None
+        return self._frame(self.values[first:last].copy(), self.timestamps[first:last])
+
+class InMemoryMarketDataClient:
+    """
+    Serves historical bars held in memory, as of a simulated clock.
+
+    Implements the MarketDataClient methods the sentiment engine and the main
+    loop call. Bars after the clock's current time are never returned, so a
+    component driven by this client cannot see the future. When daily bars are
+    requested from intraday data, the current day is built from the intraday
+    bars seen so far, as a live daily bar would be.
+    """
+    bar_cache = None
+
+    def __init__(self, bars: Dict[str, pd.DataFrame], clock: SimulatedClock, spread_bps: float = 0.0):
+        """
+        Initializes the InMemoryMarketDataClient.
+
+        Args:
+            bars (Dict[str, pd.DataFrame]): Bars per symbol with a DatetimeIndex and at least a 'close' column.
+            clock (SimulatedClock): The clock that decides which bars are visible.
+            spread_bps (float): Bid/ask spread around the last close for quotes, in basis points.
+        """
+        self.clock = clock
+        self.spread_bps = spread_bps
+        self._symbols = {symbol: _SymbolBars(frame) for symbol, frame in bars.items()}
+
+    def _now_ns(self) -> int:
+        return int(self.clock.time() * 10**9)
+
+    def get_latest_quote(self, symbol: str):
+        """
+        Returns a quote around the last visible close, in the raw quote format
+        of the live client ('bp' and 'ap'), or None if there is no bar yet.
+        """
+        data = self._symbols.get(symbol)
+        if data is None:
+            return None
+        position = np.searchsorted(data.timestamps, self._now_ns(), side='right') - 1
+        if position < 0:
+            return None
+        close = data.close[position]
+        half_spread = close * self.spread_bps / 2 / 10_000
+        return {'bp': close - half_spread, 'ap': close + half_spread,
+                't': pd.Timestamp(data.timestamps[position], tz='UTC').isoformat()}
+
+    def get_historical_bars(self, symbol: str, timeframe, start_date: str, end_date: str):
+        """
+        Returns the bars visible at the simulated time from `start_date` on.
+
+        `end_date` is accepted for interface compatibility; the simulated clock
+        always bounds the result.
+        """
+        data = self._symbols.get(symbol)
+        if data is None:
+            return None
+        start = pd.Timestamp(start_date)
+        start = start.tz_localize(data.tz) if start.tzinfo is None else start
+        if str(timeframe) == '1Day' and data.intraday:
+            return data.daily(start.value, self._now_ns())
+        return data.bars(start.value, self._now_ns())
+
+    def get_historical_bars_multi(self, symbols: List[str], timeframe, start_date: str, end_date: str,
+                                  chunk_size: int = 200):
+        """
+        Returns the visible bars for several symbols in one long frame with a 'symbol' column.
+        """
+        frames = []
+        for symbol in symbols:
+            bars = self.get_historical_bars(symbol, timeframe, start_date, end_date)
+            if bars is not None and not bars.empty:
+                frames.append(bars.assign(symbol=symbol))
+        return pd.concat(frames) if frames else pd.DataFrame()
+
+def create_in_memory_session_factory():
+    """
+    Returns a SQLAlchemy session factory bound to a private in-memory SQLite
+    database with the orders and slippage tables, for the execution components
+    to write to during a backtest.
+    """
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[Order.__table__, Slippage.__table__])
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
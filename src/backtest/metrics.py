@@ -0,0 +1,83 @@
+"""
+Performance metrics for backtest return and equity series.
+
+All functions take NumPy arrays of per-period simple returns or equity values,
+oldest first. A 2-D array is treated as one series per column and yields one
+metric per column, so a whole parameter grid can be scored in a single call.
+NaN returns are ignored.
+"""
+from typing import Union
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+Metric = Union[float, np.ndarray]
+
+class PerformanceSummary(BaseModel):
+    total_return: float
+    annualized_return: float
+    sharpe_ratio: float
+    sortino_ratio: float
+    max_drawdown: float = Field(..., le=0)
+    trades: int = Field(..., ge=0)
+
+def _as_metric(values: np.ndarray) -> Metric:
+    return float(values) if np.ndim(values) == 0 else values
+
+def _mean_std(returns: np.ndarray):
+    """Mean and sample standard deviation per column, skipping the slower NaN-aware path when possible."""
+    if np.isnan(returns).any():
+        return np.nanmean(returns, axis=0), np.nanstd(returns, axis=0, ddof=1)
+    return returns.mean(axis=0), returns.std(axis=0, ddof=1)
+
+def sharpe_ratio(returns: np.ndarray, periods_per_year: int = 252) -> Metric:
+    """
+    Annualized Sharpe ratio of per-period returns, assuming a zero risk-free rate.
+    NaN where the returns have no variance.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean, std = _mean_std(returns)
+        ratio = np.where(std > 0, mean / std * np.sqrt(periods_per_year), np.nan)
+    return _as_metric(ratio)
+
+def sortino_ratio(returns: np.ndarray, periods_per_year: int = 252) -> Metric:
+    """
+    Annualized Sortino ratio of per-period returns, using the downside
+    deviation below zero. NaN where there are no losing periods.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        downside = np.minimum(returns, 0.0)
+        if np.isnan(returns).any():
+            mean = np.nanmean(returns, axis=0)
+            downside_deviation = np.sqrt(np.nanmean(downside ** 2, axis=0))
+        else:
+            mean = returns.mean(axis=0)
+            downside_deviation = np.sqrt(np.mean(downside * downside, axis=0))
+        ratio = np.where(downside_deviation > 0, mean / downside_deviation * np.sqrt(periods_per_year), np.nan)
+    return _as_metric(ratio)
+
+def drawdown(equity: np.ndarray) -> np.ndarray:
+    """
+    Drawdown of an equity curve from its running peak, as a fraction (<= 0).
+    """
+    return equity / np.maximum.accumulate(equity, axis=0) - 1.0
+
+def max_drawdown(equity: np.ndarray) -> Metric:
+    """
+    Largest peak-to-trough decline of an equity curve, as a fraction (<= 0).
+    """
+    if len(equity) == 0:
+        return _as_metric(np.zeros(equity.shape[1:]))
+    return _as_metric(np.minimum(drawdown(equity).min(axis=0), 0.0))
+
+def annualized_return(equity: np.ndarray, periods_per_year: int = 252) -> Metric:
+    """
+    Compound annual growth rate of an equity curve that starts at 1.0.
+    NaN where the curve is empty or ends at or below zero.
+    """
+    if len(equity) == 0:
+        return _as_metric(np.full(equity.shape[1:], np.nan))
+    final = equity[-1]
+    with np.errstate(invalid='ignore'):
+        growth = np.where(final > 0, np.abs(final) ** (periods_per_year / len(equity)) - 1.0, np.nan)
+    return _as_metric(growth)
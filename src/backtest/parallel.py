@@ -0,0 +1,79 @@
+"""
+Worker pool for backtests that share large read-only arrays.
+
+run_tasks() copies the arrays into shared memory once and maps them into
+every worker process, so tasks receive only their small parameters and read
+the prices and index series with shared_array() instead of unpickling a copy.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+# Arrays attached in this process by _attach_shared_arrays
+_shared_arrays: Dict[str, np.ndarray] = {}
+_shared_blocks: List[shared_memory.SharedMemory] = []
+
+def _share(name: str, array: np.ndarray) -> Tuple[shared_memory.SharedMemory, Tuple]:
+    """Copies an array into a new shared memory block and returns the block and its spec."""
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (name, block.name, array.shape, array.dtype.str)
+
+def _attach_shared_arrays(specs: List[Tuple]):
+    """Pool initializer: maps the shared arrays into this worker."""
+    for name, block_name, shape, dtype in specs:
+        block = shared_memory.SharedMemory(name=block_name)
+        _shared_blocks.append(block)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False # Every task sees the same memory, so a write would leak into the others
+        _shared_arrays[name] = array
+
+def shared_array(name: str) -> np.ndarray:
+    """
+    Returns one of the arrays passed to run_tasks(), from inside a task.
+
+    The array is a read-only view of shared memory that is only valid while
+    run_tasks() is running; copy anything that must outlive the task.
+    """
+    return _shared_arrays[name]
+
+def run_tasks(function: Callable, tasks: List[Tuple], arrays: Dict[str, np.ndarray], max_workers: int) -> list:
+    """
+    Runs `function(*task)` for every task, in worker processes that map `arrays`
+    from shared memory (or in this process when max_workers is 1), and returns
+    the results in task order.
+
+    Args:
+        function (Callable): A module-level function, so it can be pickled; it reads
+            the arrays with shared_array().
+        tasks (List[Tuple]): The arguments of each call.
+        arrays (Dict[str, np.ndarray]): The arrays to share, by name.
+        max_workers (int): Worker processes; 1 runs the tasks in this process.
+
+    Returns:
+        list: The result of each task.
+    """
+    blocks = []
+    try:
+        specs = []
+        for name, array in arrays.items():
+            block, spec = _share(name, np.ascontiguousarray(array))
+            blocks.append(block)
+            specs.append(spec)
+
+        if max_workers == 1:
+            _attach_shared_arrays(specs)
+            return [function(*task) for task in tasks]
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach_shared_arrays,
+                                 initargs=(specs,)) as executor:
+            futures = [executor.submit(function, *task) for task in tasks]
+            return [future.result() for future in futures]
+    finally:
+        _shared_arrays.clear()
+        while _shared_blocks:
+            _shared_blocks.pop().close()
+        for block in blocks:
+            block.close()
+            block.unlink()
@@ -0,0 +1,122 @@
+"""
+Parallel parameter sweep over Fear & Greed weights and strategy thresholds.
+
+The component scores are computed once (SentimentAnalyzer.compute_index_series)
+and every weight vector is a single matrix product over them. The prices and
+the recombined index series are placed in shared memory, and the threshold
+grid is split into tasks that worker processes evaluate column-wise with the
+vectorized engine, so no worker recomputes an indicator or copies the arrays.
+"""
+import itertools
+import os
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .engine import run_backtest, threshold_positions
+from .metrics import annualized_return, max_drawdown, sharpe_ratio, sortino_ratio
+from .parallel import run_tasks, shared_array
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+COMPONENT_COLUMNS = ('volatility_score', 'momentum_score', 'social_score')
+
+def simplex_weights(step: float = 0.1) -> np.ndarray:
+    """
+    Returns every (volatility, momentum, social) weight vector on a grid of
+    `step` whose weights are non-negative and sum to 1.
+    """
+    steps = int(round(1 / step))
+    weights = [(v / steps, m / steps, (steps - v - m) / steps)
+               for v in range(steps + 1) for m in range(steps + 1 - v)]
+    return np.array(weights)
+
+def threshold_pairs(buy_thresholds: Sequence[float], sell_thresholds: Sequence[float]) -> np.ndarray:
+    """
+    Returns every (buy, sell) threshold pair with buy below sell, as an (n, 2) array.
+    """
+    pairs = [(b, s) for b, s in itertools.product(buy_thresholds, sell_thresholds) if b < s]
+    return np.array(pairs, dtype=float).reshape(-1, 2)
+
+def score_threshold_grid(close: np.ndarray, index_values: np.ndarray, pairs: np.ndarray, transaction_cost: float = 0.0,
+                         lag: int = 1, periods_per_year: int = 252) -> Dict[str, np.ndarray]:
+    """
+    Backtests one index series against many (buy, sell) threshold pairs in one vectorized pass.
+
+    Returns:
+        Dict[str, np.ndarray]: Each metric, with one value per threshold pair.
+    """
+    positions = threshold_positions(index_values[:, None], pairs[None, :, 0], pairs[None, :, 1])
+    result = run_backtest(close, positions, transaction_cost, lag, periods_per_year)
+    return {
+        'total_return': result.equity[-1] - 1.0,
+        'annualized_return': annualized_return(result.equity, periods_per_year),
+        'sharpe_ratio': sharpe_ratio(result.strategy_returns, periods_per_year),
+        'sortino_ratio': sortino_ratio(result.strategy_returns, periods_per_year),
+        'max_drawdown': max_drawdown(result.equity),
+        'trades': result.trades,
+    }
+
+def _evaluate(weight_index: int, pairs: np.ndarray, transaction_cost: float, lag: int,
+              periods_per_year: int) -> Tuple[int, np.ndarray, Dict[str, np.ndarray]]:
+    """Backtests one weight vector against a block of threshold pairs."""
+    metrics = score_threshold_grid(shared_array('close'), shared_array('index')[:, weight_index], pairs,
+                                   transaction_cost, lag, periods_per_year)
+    return weight_index, pairs, metrics
+
+def run_parameter_sweep(components: pd.DataFrame, close: np.ndarray, weights: np.ndarray,
+                        buy_thresholds: Sequence[float], sell_thresholds: Sequence[float],
+                        transaction_cost: float = 0.0, lag: int = 1, periods_per_year: int = 252,
+                        max_workers: Optional[int] = None, pairs_per_task: int = 256) -> pd.DataFrame:
+    """
+    Backtests every combination of index weights and strategy thresholds.
+
+    Args:
+        components (pd.DataFrame): Component scores from SentimentAnalyzer.compute_index_series,
+            aligned so that each row is known when trading on that bar's signal.
+        close (np.ndarray): Closing prices aligned with `components`.
+        weights (np.ndarray): (k, 3) array of (volatility, momentum, social) weights.
+        buy_thresholds (Sequence[float]): Buy thresholds to try.
+        sell_thresholds (Sequence[float]): Sell thresholds to try; pairs with buy >= sell are skipped.
+        transaction_cost (float): Cost per unit of position change, as a fraction of equity.
+        lag (int): Number of bars between a signal and holding its position.
+        periods_per_year (int): Annualization factor for the metrics.
+        max_workers (int, optional): Worker processes. Defaults to the CPU count; 1 runs in-process.
+        pairs_per_task (int): Threshold pairs evaluated per task, which bounds worker memory.
+
+    Returns:
+        pd.DataFrame: One row per combination with its weights, thresholds and metrics,
+            sorted by Sharpe ratio (best first).
+    """
+    close = np.ascontiguousarray(close, dtype=float)
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    pairs = threshold_pairs(buy_thresholds, sell_thresholds)
+    if len(components) != len(close):
+        raise ValueError(f"Components ({len(components)} rows) and prices ({len(close)} bars) are not aligned.")
+
+    # Recombine the cached component series for every weight vector at once
+    index_matrix = components[list(COMPONENT_COLUMNS)].to_numpy(dtype=float) @ weights.T
+
+    tasks = [(w, pairs[start:start + pairs_per_task])
+             for w in range(len(weights)) for start in range(0, len(pairs), pairs_per_task)]
+    max_workers = max_workers or os.cpu_count() or 1
+    logger.info(f"Sweeping {len(weights)} weight vectors x {len(pairs)} threshold pairs "
+                f"({len(weights) * len(pairs)} backtests) over {max_workers} worker(s).")
+
+    results = run_tasks(_evaluate, [(w, p, transaction_cost, lag, periods_per_year) for w, p in tasks],
+                        {'close': close, 'index': index_matrix}, max_workers)
+
+    frames = []
+    for weight_index, task_pairs, metrics in results:
+        frame = pd.DataFrame(metrics)
+        frame.insert(0, 'volatility_weight', weights[weight_index, 0])
+        frame.insert(1, 'momentum_weight', weights[weight_index, 1])
+        frame.insert(2, 'social_weight', weights[weight_index, 2])
+        frame.insert(3, 'buy_threshold', task_pairs[:, 0])
+        frame.insert(4, 'sell_threshold', task_pairs[:, 1])
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True).sort_values('sharpe_ratio', ascending=False, ignore_index=True)
@@ -0,0 +1,186 @@
+"""
+Walk-forward optimization of Fear & Greed weights and strategy thresholds.
+
+The history is split into rolling (or anchored) in-sample windows, each
+followed by an out-of-sample window. Parameters are fitted on each in-sample
+window with the vectorized threshold grid and then traded, unchanged, on the
+out-of-sample window that follows; the out-of-sample returns are stitched into
+a single equity curve.
+
+The component scores are computed once for the whole history and every fold
+slices them, so overlapping windows never recompute an indicator. The scores
+at each bar only use bars up to it, so slicing them does not leak future data
+into a fold. Folds are independent and run in parallel worker processes that
+share the price and index arrays.
+"""
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .engine import run_backtest, threshold_positions
+from .metrics import PerformanceSummary, annualized_return, max_drawdown, sharpe_ratio, sortino_ratio
+from .parallel import run_tasks, shared_array
+from .sweep import COMPONENT_COLUMNS, score_threshold_grid, threshold_pairs
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+def walk_forward_windows(length: int, train_size: int, test_size: int,
+                         anchored: bool = False) -> List[Tuple[int, int, int, int]]:
+    """
+    Returns the (train_start, train_end, test_start, test_end) bar ranges of each fold.
+
+    Args:
+        length (int): Number of bars in the history.
+        train_size (int): Bars in each in-sample window (the minimum when anchored).
+        test_size (int): Bars in each out-of-sample window.
+        anchored (bool): If True, every in-sample window starts at the first bar.
+    """
+    windows = []
+    for test_start in range(train_size, length, test_size):
+        train_start = 0 if anchored else test_start - train_size
+        windows.append((train_start, test_start, test_start, min(test_start + test_size, length)))
+    return windows
+
+def _fit_fold(train_start: int, train_end: int, test_start: int, test_end: int, pairs: np.ndarray,
+              objective: str, transaction_cost: float, lag: int, periods_per_year: int,
+              pairs_per_block: int) -> Tuple[dict, np.ndarray]:
+    """Fits the parameters on one in-sample window and trades them on the following out-of-sample window."""
+    close = shared_array('close')
+    index_matrix = shared_array('index')
+
+    best_score, best_weight, best_pair = -np.inf, 0, pairs[0]
+    for weight_index in range(index_matrix.shape[1]):
+        index_values = index_matrix[train_start:train_end, weight_index]
+        for start in range(0, len(pairs), pairs_per_block):
+            block = pairs[start:start + pairs_per_block]
+            metrics = score_threshold_grid(close[train_start:train_end], index_values, block,
+                                           transaction_cost, lag, periods_per_year)
+            scores = np.nan_to_num(np.asarray(metrics[objective], dtype=float), nan=-np.inf)
+            best = int(np.argmax(scores))
+            if scores[best] > best_score:
+                best_score, best_weight, best_pair = scores[best], weight_index, block[best]
+
+    # Start `lag` bars early so the first out-of-sample bar holds the position signalled before it
+    start = max(test_start - lag, 0)
+    positions = threshold_positions(index_matrix[start:test_end, best_weight], best_pair[0], best_pair[1])
+    result = run_backtest(close[start:test_end], positions, transaction_cost, lag, periods_per_year)
+    oos_returns = result.strategy_returns[test_start - start:]
+    oos_trades = np.count_nonzero(np.diff(result.positions, prepend=0.0)[test_start - start:])
+
+    fold = {
+        'train_start': train_start,
+        'train_end': train_end,
+        'test_start': test_start,
+        'test_end': test_end,
+        'weight_index': best_weight,
+        'buy_threshold': best_pair[0],
+        'sell_threshold': best_pair[1],
+        f'in_sample_{objective}': best_score if np.isfinite(best_score) else np.nan,
+        'out_of_sample_sharpe_ratio': sharpe_ratio(oos_returns, periods_per_year),
+        'out_of_sample_return': float(np.prod(1.0 + oos_returns) - 1.0),
+        'out_of_sample_trades': int(oos_trades),
+    }
+    return fold, oos_returns
+
+class WalkForwardResult:
+    """
+    Fold parameters and the stitched out-of-sample returns of a walk-forward run.
+    """
+    def __init__(self, folds: pd.DataFrame, returns: pd.Series, periods_per_year: int = 252):
+        self.folds = folds
+        self.returns = returns
+        self.equity = (1.0 + returns).cumprod().rename('equity')
+        self.periods_per_year = periods_per_year
+
+    def summary(self) -> PerformanceSummary:
+        """
+        Returns the performance metrics of the stitched out-of-sample equity curve.
+        """
+        returns = self.returns.to_numpy()
+        equity = self.equity.to_numpy()
+        trades = int(self.folds['out_of_sample_trades'].sum()) if not self.folds.empty else 0
+        return PerformanceSummary(
+            total_return=float(equity[-1] - 1.0) if equity.size else 0.0,
+            annualized_return=annualized_return(equity, self.periods_per_year),
+            sharpe_ratio=sharpe_ratio(returns, self.periods_per_year),
+            sortino_ratio=sortino_ratio(returns, self.periods_per_year),
+            max_drawdown=max_drawdown(equity),
+            trades=trades,
+        )
+
+def run_walk_forward(components: pd.DataFrame, close: np.ndarray, weights: np.ndarray,
+                     buy_thresholds: Sequence[float], sell_thresholds: Sequence[float],
+                     train_size: int = 756, test_size: int = 126, anchored: bool = False,
+                     objective: str = 'sharpe_ratio', transaction_cost: float = 0.0, lag: int = 1,
+                     periods_per_year: int = 252, max_workers: Optional[int] = None,
+                     pairs_per_block: int = 256) -> WalkForwardResult:
+    """
+    Runs a walk-forward optimization of index weights and strategy thresholds.
+
+    Args:
+        components (pd.DataFrame): Component scores from SentimentAnalyzer.compute_index_series,
+            aligned so that each row is known when trading on that bar's signal.
+        close (np.ndarray): Closing prices aligned with `components`.
+        weights (np.ndarray): (k, 3) array of candidate (volatility, momentum, social) weights.
+        buy_thresholds (Sequence[float]): Candidate buy thresholds.
+        sell_thresholds (Sequence[float]): Candidate sell thresholds; pairs with buy >= sell are skipped.
+        train_size (int): Bars per in-sample window (e.g., 756 for three years of daily bars).
+        test_size (int): Bars per out-of-sample window.
+        anchored (bool): If True, in-sample windows grow from the first bar instead of rolling.
+        objective (str): In-sample metric to maximize ('sharpe_ratio', 'sortino_ratio',
+            'total_return', 'annualized_return' or 'max_drawdown').
+        transaction_cost (float): Cost per unit of position change, as a fraction of equity.
+        lag (int): Number of bars between a signal and holding its position.
+        periods_per_year (int): Annualization factor for the metrics.
+        max_workers (int, optional): Worker processes. Defaults to the CPU count; 1 runs in-process.
+        pairs_per_block (int): Threshold pairs scored per vectorized pass, which bounds worker memory.
+
+    Returns:
+        WalkForwardResult: The parameters chosen for each fold and the stitched out-of-sample returns.
+    """
+    close = np.asarray(close, dtype=float)
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    pairs = threshold_pairs(buy_thresholds, sell_thresholds)
+    if len(components) != len(close):
+        raise ValueError(f"Components ({len(components)} rows) and prices ({len(close)} bars) are not aligned.")
+    if len(pairs) == 0:
+        raise ValueError("No threshold pairs with the buy threshold below the sell threshold.")
+
+    windows = walk_forward_windows(len(close), train_size, test_size, anchored)
+    index_matrix = components[list(COMPONENT_COLUMNS)].to_numpy(dtype=float) @ weights.T
+    max_workers = min(max_workers or os.cpu_count() or 1, max(len(windows), 1))
+    logger.info(f"Walk-forward over {len(windows)} folds, {len(weights)} weight vectors x {len(pairs)} "
+                f"threshold pairs per fold, on {max_workers} worker(s).")
+
+    tasks = [(*window, pairs, objective, transaction_cost, lag, periods_per_year, pairs_per_block)
+             for window in windows]
+    results = run_tasks(_fit_fold, tasks, {'close': close, 'index': index_matrix}, max_workers)
+
+    rows = []
+    returns = []
+    for fold_number, (fold, oos_returns) in enumerate(results):
+        weight = weights[fold.pop('weight_index')]
+        rows.append({
+            'fold': fold_number,
+            'train_start': components.index[fold.pop('train_start')],
+            'train_end': components.index[fold.pop('train_end') - 1],
+            'test_start': components.index[fold.pop('test_start')],
+            'test_end': components.index[fold.pop('test_end') - 1],
+            'volatility_weight': weight[0],
+            'momentum_weight': weight[1],
+            'social_weight': weight[2],
+            **fold,
+        })
+        returns.append(oos_returns)
+
+    folds = pd.DataFrame(rows)
+    if returns:
+        stitched = np.concatenate(returns)
+        index = components.index[windows[0][2]:windows[-1][3]]
+    else:
+        stitched = np.array([])
+        index = components.index[:0]
+    return WalkForwardResult(folds, pd.Series(stitched, index=index, name='returns'), periods_per_year)
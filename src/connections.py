@@ -0,0 +1,322 @@
+"""
+Shared, pooled PostgreSQL and Redis connections.
+
+The ingestion connectors and the data API borrow connections from one bounded
+psycopg2 pool and one Redis connection pool per process, instead of opening a
+new connection (and paying the TCP and auth handshake) on every call. Pool
+sizes and timeouts come from configs/database.yaml and configs/redis.yaml.
+
+Async services (the chunk1 data API) use the asyncpg and redis.asyncio
+counterparts, which are bound to the event loop that first creates them.
+"""
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import asyncpg
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+import redis
+import redis.asyncio
+import yaml
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+DATABASE_CONFIG_PATH = os.path.join(_current_dir, '..', 'configs', 'database.yaml')
+REDIS_CONFIG_PATH = os.path.join(_current_dir, '..', 'configs', 'redis.yaml')
+
+def _load_config(path: str) -> dict:
+    with open(path, 'r') as f:
+        return (yaml.safe_load(f) or {}).get('default', {})
+
+class PostgresPool:
+    """
+    A bounded, thread-safe psycopg2 connection pool.
+
+    Callers that find every connection in use wait up to `acquire_timeout`
+    seconds for one to be returned instead of failing immediately. Connections
+    that have been idle longer than `health_check_interval` are tested before
+    being handed out, and broken connections are discarded.
+    """
+    def __init__(self, config: dict):
+        """
+        Initializes the PostgresPool.
+
+        Args:
+            config (dict): The `default` section of configs/database.yaml.
+        """
+        pool_config = config.get('pool', {})
+        self.max_connections = int(pool_config.get('max_connections', 10))
+        self.acquire_timeout = float(pool_config.get('acquire_timeout', 10))
+        self.health_check_interval = float(pool_config.get('health_check_interval', 30))
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._last_used: Dict[int, float] = {}
+        self._pool = psycopg2.pool.ThreadedConnectionPool(
+            int(pool_config.get('min_connections', 1)),
+            self.max_connections,
+            host=config.get('host', 'localhost'),
+            port=config.get('port', 5432),
+            user=config.get('user'),
+            password=config.get('password'),
+            dbname=config.get('dbname'),
+            connect_timeout=int(pool_config.get('connect_timeout', 5)),
+        )
+        logger.info(f"PostgreSQL pool created (max {self.max_connections} connections).")
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self.health_check_interval:
+            # Freshly opened or recently used
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """
+        Borrows a healthy connection from the pool.
+
+        Broken connections are discarded until a healthy one is found; after a
+        database restart every idle connection may be broken, and once they
+        are all discarded the pool opens a fresh one.
+
+        Raises:
+            psycopg2.pool.PoolError: If no connection is free within `acquire_timeout` seconds.
+        """
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise psycopg2.pool.PoolError(f"No database connection available within {self.acquire_timeout}s.")
+        try:
+            # At most max_connections idle connections to discard before a fresh one is opened
+            for _ in range(self.max_connections + 1):
+                conn = self._pool.getconn()
+                if self._is_healthy(conn):
+                    return conn
+                logger.warning("Discarding broken pooled database connection.")
+                self._last_used.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+            raise psycopg2.pool.PoolError("No healthy database connection could be opened.")
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, close: bool = False):
+        """Returns a borrowed connection to the pool, rolling back any open transaction."""
+        try:
+            if not close and not conn.closed and \
+                    conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            close = True
+        try:
+            close = close or conn.closed
+            if close:
+                self._last_used.pop(id(conn), None)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn, close=close)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        """Closes every connection in the pool."""
+        self._pool.closeall()
+        self._last_used.clear()
+
+_lock = threading.Lock()
+_pg_pool: Optional[PostgresPool] = None
+_redis_pool: Optional[redis.ConnectionPool] = None
+_owner_pid: Optional[int] = None
+_async_pg_pool: Optional[asyncpg.Pool] = None
+_async_redis: Optional[redis.asyncio.Redis] = None
+
+def _reset_after_fork():
+    """Drops pools inherited from a parent process; connections must not be shared across a fork."""
+    global _pg_pool, _redis_pool, _async_pg_pool, _async_redis, _owner_pid
+    if _owner_pid != os.getpid():
+        _pg_pool = None
+        _redis_pool = None
+        _async_pg_pool = None
+        _async_redis = None
+        _owner_pid = os.getpid()
+
+def get_pg_pool() -> PostgresPool:
+    """Returns the process-wide PostgreSQL pool, creating it on first use."""
+    global _pg_pool
+    with _lock:
+        _reset_after_fork()
+        if _pg_pool is None:
+            _pg_pool = PostgresPool(_load_config(DATABASE_CONFIG_PATH))
+        return _pg_pool
+
+def get_redis_pool() -> redis.ConnectionPool:
+    """Returns the process-wide Redis connection pool, creating it on first use."""
+    global _redis_pool
+    with _lock:
+        _reset_after_fork()
+        if _redis_pool is None:
+            config = _load_config(REDIS_CONFIG_PATH)
+            _redis_pool = redis.BlockingConnectionPool(
+                host=config.get('host', 'localhost'),
+                port=config.get('port', 6379),
+                db=config.get('db', 0),
+                password=config.get('password'),
+                max_connections=int(config.get('max_connections', 50)),
+                timeout=config.get('pool_timeout', 5),
+                socket_timeout=config.get('socket_timeout', 5),
+                socket_connect_timeout=config.get('socket_connect_timeout', 5),
+                health_check_interval=config.get('health_check_interval', 30),
+                decode_responses=True,
+            )
+            logger.info(f"Redis pool created (max {_redis_pool.max_connections} connections).")
+        return _redis_pool
+
+@contextmanager
+def db_connection():
+    """
+    Borrows a pooled PostgreSQL connection for the duration of a `with` block.
+
+    The connection goes back to the pool on exit; an uncommitted transaction is
+    rolled back, and a connection that failed at the connection level is closed
+    instead of being reused.
+    """
+    pool = get_pg_pool()
+    conn = pool.getconn()
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        pool.putconn(conn, close=broken)
+
+def get_redis_connection() -> redis.Redis:
+    """Returns a Redis client backed by the shared connection pool. Creating one is cheap."""
+    return redis.Redis(connection_pool=get_redis_pool())
+
+def health_check() -> Dict[str, bool]:
+    """
+    Checks that PostgreSQL and Redis are reachable through the shared pools.
+
+    Returns:
+        Dict[str, bool]: Reachability of 'postgres' and 'redis'.
+    """
+    status = {'postgres': False, 'redis': False}
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+                status['postgres'] = cur.fetchone() == (1,)
+    except psycopg2.Error as e:
+        logger.error(f"PostgreSQL health check failed: {e}")
+    try:
+        status['redis'] = bool(get_redis_connection().ping())
+    except redis.RedisError as e:
+        logger.error(f"Redis health check failed: {e}")
+    return status
+
+async def get_async_pg_pool() -> asyncpg.Pool:
+    """Returns the process-wide asyncpg pool, creating it on first use."""
+    global _async_pg_pool
+    with _lock:
+        _reset_after_fork()
+        pool = _async_pg_pool
+    if pool is None:
+        config = _load_config(DATABASE_CONFIG_PATH)
+        pool_config = config.get('pool', {})
+        pool = await asyncpg.create_pool(
+            host=config.get('host', 'localhost'),
+            port=config.get('port', 5432),
+            user=config.get('user'),
+            password=config.get('password'),
+            database=config.get('dbname'),
+            min_size=int(pool_config.get('min_connections', 1)),
+            max_size=int(pool_config.get('max_connections', 10)),
+            timeout=float(pool_config.get('connect_timeout', 5)),
+            max_inactive_connection_lifetime=300,
+        )
+        with _lock:
+            if _async_pg_pool is None:
+                _async_pg_pool = pool
+                logger.info(f"Async PostgreSQL pool created (max {pool.get_max_size()} connections).")
+            else:
+                # Another task created the pool while this one was connecting
+                await pool.close()
+                pool = _async_pg_pool
+    return pool
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """Returns the process-wide async Redis client, which shares one connection pool."""
+    global _async_redis
+    with _lock:
+        _reset_after_fork()
+        if _async_redis is None:
+            config = _load_config(REDIS_CONFIG_PATH)
+            _async_redis = redis.asyncio.Redis(connection_pool=redis.asyncio.BlockingConnectionPool(
+                host=config.get('host', 'localhost'),
+                port=config.get('port', 6379),
+                db=config.get('db', 0),
+                password=config.get('password'),
+                max_connections=int(config.get('max_connections', 50)),
+                timeout=config.get('pool_timeout', 5),
+                socket_timeout=config.get('socket_timeout', 5),
+                socket_connect_timeout=config.get('socket_connect_timeout', 5),
+                health_check_interval=config.get('health_check_interval', 30),
+                decode_responses=True,
+            ))
+            logger.info("Async Redis client created.")
+        return _async_redis
+
+async def async_health_check() -> Dict[str, bool]:
+    """
+    Checks that PostgreSQL and Redis are reachable through the shared async pools.
+
+    Returns:
+        Dict[str, bool]: Reachability of 'postgres' and 'redis'.
+    """
+    status = {'postgres': False, 'redis': False}
+    try:
+        pool = await get_async_pg_pool()
+        status['postgres'] = await pool.fetchval("SELECT 1") == 1
+    except (asyncpg.PostgresError, OSError, asyncio.TimeoutError) as e:
+        logger.error(f"PostgreSQL health check failed: {e}")
+    try:
+        status['redis'] = bool(await get_async_redis().ping())
+    except redis.RedisError as e:
+        logger.error(f"Redis health check failed: {e}")
+    return status
+
+async def close_async_pools():
+    """Closes the shared async pools, e.g. on application shutdown."""
+    global _async_pg_pool, _async_redis
+    with _lock:
+        pool, client = _async_pg_pool, _async_redis
+        _async_pg_pool = _async_redis = None
+    if pool is not None:
+        await pool.close()
+    if client is not None:
+        await client.aclose()
+
+def close_pools():
+    """Closes the shared pools, e.g. on application shutdown."""
+    global _pg_pool, _redis_pool
+    with _lock:
+        if _pg_pool is not None:
+            _pg_pool.closeall()
+            _pg_pool = None
+        if _redis_pool is not None:
+            _redis_pool.disconnect()
+            _redis_pool = None
@@ -0,0 +1,198 @@
+"""
+Persistent on-disk cache for historical bars.
+
+Bars are stored as one Parquet file per symbol and timeframe, together with the
+date ranges that have already been fetched. Requests for a range are served
+from disk and only the dates that were never fetched are requested upstream.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ..logger import get_logger, PROJECT_ROOT
+
+logger = get_logger(__name__)
+
+# Key under which the covered date ranges are kept in the Parquet schema metadata
+RANGES_METADATA_KEY = b'fgtf_covered_ranges'
+
+DateRange = Tuple[date, date]
+
+def _to_date(value) -> date:
+    """Parses a date string (YYYY-MM-DD or ISO timestamp) or date-like object into a date."""
+    return pd.Timestamp(value).date()
+
+def _merge_ranges(ranges: List[DateRange]) -> List[DateRange]:
+    """Merges overlapping or adjacent inclusive date ranges."""
+    merged: List[DateRange] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def _missing_ranges(start: date, end: date, covered: List[DateRange]) -> List[DateRange]:
+    """Returns the parts of [start, end] that are not inside any covered range."""
+    missing: List[DateRange] = []
+    cursor = start
+    for covered_start, covered_end in covered:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            missing.append((cursor, covered_start - timedelta(days=1)))
+        cursor = max(cursor, covered_end + timedelta(days=1))
+        if cursor > end:
+            break
+    if cursor <= end:
+        missing.append((cursor, end))
+    return missing
+
+CacheKey = Tuple[str, str]
+
+class BarCache:
+    """
+    A Parquet-backed store of historical bars keyed by symbol and timeframe.
+
+    Each symbol and timeframe has its own lock, so a slow upstream fetch only
+    blocks requests for the same series. The most recently used series are
+    also kept in memory, up to `max_frames` of them.
+    """
+    def __init__(self, cache_dir: str, max_frames: int = 64):
+        """
+        Initializes the BarCache.
+
+        Args:
+            cache_dir (str): Directory holding the Parquet files. Relative paths are
+                resolved against the project root.
+            max_frames (int): How many symbol/timeframe series to keep in memory;
+                the least recently used ones are reread from disk when needed.
+        """
+        if not os.path.isabs(cache_dir):
+            cache_dir = os.path.join(PROJECT_ROOT, cache_dir)
+        self.cache_dir = cache_dir
+        self.max_frames = max(max_frames, 1)
+        self._lock = threading.Lock() # Guards _frames and _key_locks
+        self._key_locks: Dict[CacheKey, threading.Lock] = {}
+        self._frames: "OrderedDict[CacheKey, Tuple[pd.DataFrame, List[DateRange]]]" = OrderedDict()
+        logger.info(f"BarCache initialized at {self.cache_dir}.")
+
+    def _path(self, symbol: str, timeframe) -> str:
+        return os.path.join(self.cache_dir, symbol.upper(), f"{timeframe}.parquet")
+
+    def _key_lock(self, key: CacheKey) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _remember(self, key: CacheKey, entry: Tuple[pd.DataFrame, List[DateRange]]):
+        """Keeps an entry in memory, evicting the least recently used ones beyond max_frames."""
+        with self._lock:
+            self._frames[key] = entry
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_frames:
+                self._frames.popitem(last=False)
+
+    def _load(self, symbol: str, timeframe) -> Tuple[pd.DataFrame, List[DateRange]]:
+        """Returns the cached bars and covered ranges, from memory or else from the Parquet file."""
+        key = (symbol.upper(), str(timeframe))
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                return self._frames[key]
+
+        path = self._path(symbol, timeframe)
+        if os.path.exists(path):
+            table = pq.read_table(path)
+            metadata = table.schema.metadata or {}
+            ranges = [
+                (date.fromisoformat(start), date.fromisoformat(end))
+                for start, end in json.loads(metadata.get(RANGES_METADATA_KEY, b'[]'))
+            ]
+            entry = (table.to_pandas(), ranges)
+        else:
+            entry = (pd.DataFrame(), [])
+        self._remember(key, entry)
+        return entry
+
+    def _store(self, symbol: str, timeframe, bars: pd.DataFrame, ranges: List[DateRange]):
+        """Writes the bars and covered ranges to disk, replacing the previous file atomically."""
+        path = self._path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        table = pa.Table.from_pandas(bars)
+        metadata = dict(table.schema.metadata or {})
+        metadata[RANGES_METADATA_KEY] = json.dumps(
+            [(start.isoformat(), end.isoformat()) for start, end in ranges]
+        ).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        tmp_path = f"{path}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+        self._remember((symbol.upper(), str(timeframe)), (bars, ranges))
+
+    def get_bars(self, symbol: str, timeframe, start_date: str, end_date: str,
+                 fetch: Callable[[str, object, str, str], Optional[pd.DataFrame]]) -> Optional[pd.DataFrame]:
+        """
+        Returns bars for [start_date, end_date], fetching only the dates not yet cached.
+
+        Dates from today onwards are never marked as covered, so the latest bar is
+        always refreshed from upstream while older history is served from disk.
+
+        Args:
+            symbol (str): The ticker symbol.
+            timeframe (TimeFrame): The timeframe for the bars (e.g., TimeFrame.Day).
+            start_date (str): The start date in ISO format (YYYY-MM-DD).
+            end_date (str): The end date in ISO format (YYYY-MM-DD), inclusive.
+            fetch (Callable): Called as fetch(symbol, timeframe, start, end) for each
+                missing range. Must return a DataFrame of bars or None on error.
+
+        Returns:
+            pd.DataFrame: The bars in the requested range, or None if a fetch fails.
+        """
+        start, end = _to_date(start_date), _to_date(end_date)
+        last_final_date = date.today() - timedelta(days=1)
+
+        with self._key_lock((symbol.upper(), str(timeframe))):
+            cached, stored_covered = self._load(symbol, timeframe)
+            covered = stored_covered
+            missing = _missing_ranges(start, end, covered)
+
+            if missing:
+                fetched_frames = []
+                for missing_start, missing_end in missing:
+                    fetched = fetch(symbol, timeframe, missing_start.isoformat(), missing_end.isoformat())
+                    if fetched is None:
+                        return None
+                    fetched_frames.append(fetched)
+                    if missing_start <= last_final_date:
+                        covered = covered + [(missing_start, min(missing_end, last_final_date))]
+
+                new_bars = [df for df in fetched_frames if not df.empty]
+                if new_bars:
+                    cached = pd.concat([cached] + new_bars) if not cached.empty else pd.concat(new_bars)
+                    cached = cached[~cached.index.duplicated(keep='last')].sort_index()
+                covered = _merge_ranges(covered)
+                if new_bars or covered != stored_covered:
+                    self._store(symbol, timeframe, cached, covered)
+                logger.debug(f"Fetched {len(missing)} missing range(s) of {timeframe} bars for {symbol}.")
+            else:
+                logger.debug(f"Served {timeframe} bars for {symbol} from {start} to {end} from cache.")
+
+        if cached.empty:
+            return cached.copy()
+
+        lower = pd.Timestamp(start)
+        upper = pd.Timestamp(end + timedelta(days=1))
+        if cached.index.tz is not None:
+            lower, upper = lower.tz_localize('UTC'), upper.tz_localize('UTC')
+        return cached[(cached.index >= lower) & (cached.index < upper)].copy()
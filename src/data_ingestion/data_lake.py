@@ -0,0 +1,354 @@
+"""
+Local Parquet mirror of the research tables.
+
+The sync job copies new rows of market_data, market_sentiment, market_regime
+and strategy_signals from PostgreSQL into a Parquet dataset on disk,
+hive-partitioned by asset (for per-asset tables) and UTC month:
+
+    <DATA_LAKE_DIR>/market_data/asset_id=1/month=2024-05/part-....parquet
+
+Each table is synced incrementally from a stored watermark, so a run only
+reads rows added or changed since the previous one. Append-only tables are
+read in keyset chunks after the watermark and written as new files; tables
+whose rows are updated in place (a sentiment backfill, a signal being
+executed) have every partition holding a changed row re-exported whole,
+replacing its files. Rows are only exported once their insert or update
+time is a minute old, so transactions still in flight are picked up by a
+later run rather than skipped; the database stamps those times as each row
+is written, so this holds as long as no transaction commits more than a
+minute after writing a row. Readers open the
+dataset with pyarrow: filters on asset, month and time skip whole directories
+and row groups, and only the requested columns are read, so notebooks and
+backtests can scan years of multi-asset history without touching the
+production database.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from ..config import settings
+from ..connections import db_connection
+from ..logger import get_logger, PROJECT_ROOT
+
+logger = get_logger(__name__)
+
+STATE_FILE = '_sync_state.json'
+
+class LakeTable(NamedTuple):
+    """How a table is exported: its columns, sync key and partitioning."""
+    columns: Tuple[Tuple[str, str, pa.DataType], ...] # (name, SQL expression, Arrow type)
+    key: Tuple[str, ...] # Monotonic key the sync resumes from; the last column must be unique
+    time_column: str
+    asset_column: Optional[str] = None
+    settled: str = 'TRUE' # Only rows matching this are exported, e.g. to skip uncommitted-looking ones
+    updated_column: Optional[str] = None # Set for tables updated in place; the sync then resumes from it
+
+# Inserts and updates are stamped by triggers as each row is written, so recent ones may still be uncommitted
+_SETTLE_DELAY = "INTERVAL '1 minute'"
+
+_TIMESTAMP = pa.timestamp('us', tz='UTC')
+
+LAKE_TABLES: Dict[str, LakeTable] = {
+    'market_data': LakeTable(
+        columns=(
+            ('data_id', 'data_id', pa.int64()),
+            ('asset_id', 'asset_id', pa.int32()),
+            ('timestamp', 'timestamp', _TIMESTAMP),
+            ('open', 'open::float8', pa.float64()),
+            ('high', 'high::float8', pa.float64()),
+            ('low', 'low::float8', pa.float64()),
+            ('close', 'close::float8', pa.float64()),
+            ('volume', 'volume::float8', pa.float64()),
+            ('quote_volume', 'quote_volume::float8', pa.float64()),
+            ('trades_count', 'trades_count', pa.int32()),
+            ('ingested_at', 'ingested_at', _TIMESTAMP),
+        ),
+        key=('ingested_at', 'data_id'),
+        time_column='timestamp',
+        asset_column='asset_id',
+        settled=f"ingested_at <= NOW() - {_SETTLE_DELAY}",
+    ),
+    'market_sentiment': LakeTable(
+        columns=(
+            ('id', 'id', pa.int32()),
+            ('timestamp', 'timestamp', _TIMESTAMP),
+            ('fear_greed_value', 'fear_greed_value', pa.int32()),
+            ('fear_greed_weight', 'fear_greed_weight::float8', pa.float64()),
+            ('on_chain_score', 'on_chain_score::float8', pa.float64()),
+            ('on_chain_weight', 'on_chain_weight::float8', pa.float64()),
+            ('social_score', 'social_score::float8', pa.float64()),
+            ('social_weight', 'social_weight::float8', pa.float64()),
+            ('options_score', 'options_score::float8', pa.float64()),
+            ('options_weight', 'options_weight::float8', pa.float64()),
+            ('composite_score', 'composite_score::float8', pa.float64()),
+            ('confidence_score', 'confidence_score::float8', pa.float64()),
+            ('updated_at', 'updated_at', _TIMESTAMP),
+        ),
+        key=('id',),
+        time_column='timestamp',
+        settled=f"updated_at <= NOW() - {_SETTLE_DELAY}",
+        updated_column='updated_at', # Backfills upsert rows in place
+    ),
+    'market_regime': LakeTable(
+        columns=(
+            ('id', 'id', pa.int32()),
+            ('sentiment_id', 'sentiment_id', pa.int32()),
+            ('zone', 'zone::text', pa.string()),
+            ('transition_strength', 'transition_strength::float8', pa.float64()),
+            ('is_transitioning', 'is_transitioning', pa.bool_()),
+            ('previous_zone', 'previous_zone::text', pa.string()),
+            ('next_zone', 'next_zone::text', pa.string()),
+            ('transition_start', 'transition_start', _TIMESTAMP),
+            ('transition_end', 'transition_end', _TIMESTAMP),
+            ('created_at', 'created_at', _TIMESTAMP),
+        ),
+        key=('created_at', 'id'),
+        time_column='created_at',
+        settled=f"created_at <= NOW() - {_SETTLE_DELAY}",
+    ),
+    'strategy_signals': LakeTable(
+        columns=(
+            ('signal_id', 'signal_id', pa.int32()),
+            ('strategy_id', 'strategy_id', pa.int32()),
+            ('asset_id', 'asset_id', pa.int32()),
+            ('timestamp', 'timestamp', _TIMESTAMP),
+            ('signal_type', 'signal_type', pa.string()),
+            ('strength', 'strength::float8', pa.float64()),
+            ('direction', 'direction', pa.string()),
+            ('price', 'price::float8', pa.float64()),
+            ('stop_loss', 'stop_loss::float8', pa.float64()),
+            ('take_profit', 'take_profit::float8', pa.float64()),
+            ('ttl', 'ttl', _TIMESTAMP),
+            ('is_executed', 'is_executed', pa.bool_()),
+            ('created_at', 'created_at', _TIMESTAMP),
+            ('updated_at', 'updated_at', _TIMESTAMP),
+        ),
+        key=('signal_id',),
+        time_column='timestamp',
+        asset_column='asset_id',
+        settled=f"updated_at <= NOW() - {_SETTLE_DELAY}",
+        updated_column='updated_at', # is_executed is set after the signal is stored
+    ),
+}
+
+def _lake_dir(lake_dir: Optional[str] = None) -> str:
+    lake_dir = lake_dir or settings.DATA_LAKE_DIR
+    return lake_dir if os.path.isabs(lake_dir) else os.path.join(PROJECT_ROOT, lake_dir)
+
+def _partitioning(spec: LakeTable) -> ds.Partitioning:
+    fields = ([(spec.asset_column, pa.int32())] if spec.asset_column else []) + [('month', pa.string())]
+    return ds.partitioning(pa.schema(fields), flavor='hive')
+
+def _file_schema(spec: LakeTable) -> pa.Schema:
+    return pa.schema([(name, arrow_type) for name, _, arrow_type in spec.columns])
+
+def _load_state(root: str) -> dict:
+    path = os.path.join(root, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def _save_state(root: str, state: dict):
+    path = os.path.join(root, STATE_FILE)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+def _month(spec: LakeTable) -> str:
+    return f"to_char({spec.time_column} AT TIME ZONE 'UTC', 'YYYY-MM')"
+
+def _select(spec: LakeTable) -> str:
+    return ", ".join(f"{expression} AS {column}" for column, expression, _ in spec.columns) + f", {_month(spec)} AS month"
+
+def _chunk_query(name: str, spec: LakeTable, resume: bool) -> str:
+    key = ", ".join(spec.key)
+    where = spec.settled
+    if resume:
+        where += f" AND ({key}) > ({', '.join(['%s'] * len(spec.key))})"
+    return (f"SELECT {_select(spec)} FROM trading_framework.{name} "
+            f"WHERE {where} ORDER BY {key} LIMIT %s")
+
+def _to_table(rows: list, schema: pa.Schema) -> pa.Table:
+    return pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)],
+                                schema=schema)
+
+def _sync_table(name: str, spec: LakeTable, root: str, watermark: Optional[list], chunk_size: int) -> Tuple[int, Optional[list]]:
+    """Exports the rows of one table after `watermark`, one keyset chunk at a time."""
+    schema = _file_schema(spec).append(pa.field('month', pa.string()))
+    key_positions = [schema.get_field_index(key) for key in spec.key]
+    exported = 0
+    with db_connection() as conn:
+        while True:
+            with conn.cursor() as cur:
+                cur.execute(_chunk_query(name, spec, watermark is not None),
+                            (*(watermark or ()), chunk_size))
+                rows = cur.fetchall()
+            conn.rollback()
+            if not rows:
+                break
+
+            table = _to_table(rows, schema)
+            # Named after the chunk's starting point, so a retried run overwrites instead of duplicating
+            chunk_id = hashlib.sha1(json.dumps(watermark, default=str).encode()).hexdigest()[:16]
+            ds.write_dataset(table, os.path.join(root, name), format='parquet',
+                             partitioning=_partitioning(spec),
+                             basename_template=f"part-{chunk_id}-{{i}}.parquet",
+                             existing_data_behavior='overwrite_or_ignore')
+
+            watermark = [rows[-1][position] for position in key_positions]
+            watermark = [value.isoformat() if isinstance(value, datetime) else value for value in watermark]
+            exported += len(rows)
+            if len(rows) < chunk_size:
+                break
+    return exported, watermark
+
+def _resync_partitions(name: str, spec: LakeTable, root: str, watermark: Optional[list]) -> Tuple[int, Optional[list]]:
+    """Re-exports, whole, every partition of a table holding rows changed after `watermark`."""
+    schema = _file_schema(spec).append(pa.field('month', pa.string()))
+    partition = ([spec.asset_column] if spec.asset_column else []) + [_month(spec)]
+    changed = spec.settled + (f" AND {spec.updated_column} > %s" if watermark else "")
+    exported = 0
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT {', '.join(partition)}, MAX({spec.updated_column}) FROM trading_framework.{name} "
+                        f"WHERE {changed} GROUP BY {', '.join(partition)}", tuple(watermark or ()))
+            touched = cur.fetchall()
+        conn.rollback()
+
+        for *values, _ in touched:
+            # Select the month by its time range, so the time index applies
+            month_start = pd.Timestamp(f"{values[-1]}-01", tz='UTC')
+            bounds = [month_start.to_pydatetime(), (month_start + pd.offsets.MonthBegin(1)).to_pydatetime()]
+            where = f"{spec.time_column} >= %s AND {spec.time_column} < %s"
+            if spec.asset_column:
+                where += f" AND {spec.asset_column} = %s"
+                bounds.append(values[0])
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT {_select(spec)} FROM trading_framework.{name} "
+                            f"WHERE {where} ORDER BY {', '.join(spec.key)}", bounds)
+                rows = cur.fetchall()
+            conn.rollback()
+            # Replaces the partition's files; a run that fails before saving the watermark redoes it
+            ds.write_dataset(_to_table(rows, schema), os.path.join(root, name), format='parquet',
+                             partitioning=_partitioning(spec), basename_template="part-{i}.parquet",
+                             existing_data_behavior='delete_matching')
+            exported += len(rows)
+
+    if touched:
+        watermark = [max(changed_at for *_, changed_at in touched).isoformat()]
+    return exported, watermark
+
+def sync_data_lake(tables: Optional[Iterable[str]] = None, lake_dir: Optional[str] = None,
+                   chunk_size: int = 100_000) -> Dict[str, int]:
+    """
+    Copies the rows added or changed since the last sync into the Parquet dataset.
+
+    Args:
+        tables (Iterable[str], optional): Tables to sync. Defaults to all of LAKE_TABLES.
+        lake_dir (str, optional): Dataset root. Defaults to settings.DATA_LAKE_DIR.
+        chunk_size (int): Rows read from PostgreSQL per query.
+
+    Returns:
+        Dict[str, int]: The number of rows exported per table.
+    """
+    root = _lake_dir(lake_dir)
+    os.makedirs(root, exist_ok=True)
+    state = _load_state(root)
+    exported = {}
+    for name in tables or LAKE_TABLES:
+        spec = LAKE_TABLES[name]
+        if spec.updated_column:
+            count, watermark = _resync_partitions(name, spec, root, state.get(name))
+        else:
+            count, watermark = _sync_table(name, spec, root, state.get(name), chunk_size)
+        exported[name] = count
+        if watermark is not None:
+            state[name] = watermark
+            _save_state(root, state)
+        logger.info(f"Data lake sync of {name}: {count} rows exported.")
+    return exported
+
+def compact_data_lake(tables: Optional[Iterable[str]] = None, lake_dir: Optional[str] = None) -> Dict[str, int]:
+    """
+    Rewrites every partition that holds more than one file as a single file
+    sorted by time, as incremental syncs leave one small file per run.
+
+    Returns:
+        Dict[str, int]: The number of partitions compacted per table.
+    """
+    root = _lake_dir(lake_dir)
+    compacted = {}
+    for name in tables or LAKE_TABLES:
+        spec = LAKE_TABLES[name]
+        count = 0
+        for directory, _, files in os.walk(os.path.join(root, name)):
+            parts = sorted(f for f in files if f.endswith('.parquet'))
+            if len(parts) < 2:
+                continue
+            table = pq.read_table([os.path.join(directory, f) for f in parts], schema=_file_schema(spec))
+            table = table.sort_by(spec.time_column)
+            tmp_path = os.path.join(directory, 'compacted.parquet.tmp')
+            pq.write_table(table, tmp_path)
+            for f in parts:
+                os.remove(os.path.join(directory, f))
+            os.replace(tmp_path, os.path.join(directory, 'part-compacted-0.parquet'))
+            count += 1
+        compacted[name] = count
+        logger.info(f"Data lake compaction of {name}: {count} partitions rewritten.")
+    return compacted
+
+def open_dataset(table: str, lake_dir: Optional[str] = None) -> ds.Dataset:
+    """Returns the pyarrow dataset of a table, with its asset and month partition columns."""
+    spec = LAKE_TABLES[table]
+    return ds.dataset(os.path.join(_lake_dir(lake_dir), table), format='parquet',
+                      schema=_file_schema(spec).append(pa.field('month', pa.string())),
+                      partitioning=_partitioning(spec))
+
+def read_lake(table: str, columns: Optional[Sequence[str]] = None, asset_ids: Optional[Sequence[int]] = None,
+              start=None, end=None, filter: Optional[ds.Expression] = None,
+              lake_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    Reads rows of a table from the Parquet dataset.
+
+    Args:
+        table (str): One of LAKE_TABLES.
+        columns (Sequence[str], optional): Columns to read. Defaults to all.
+        asset_ids (Sequence[int], optional): Assets to read, for per-asset tables.
+        start: First time to include (inclusive), as anything pd.Timestamp accepts; naive is UTC.
+        end: Time to stop at (exclusive).
+        filter (ds.Expression, optional): An additional row filter, e.g. ds.field('close') > 100.
+        lake_dir (str, optional): Dataset root. Defaults to settings.DATA_LAKE_DIR.
+
+    Returns:
+        pd.DataFrame: The matching rows, in no particular order.
+    """
+    spec = LAKE_TABLES[table]
+    dataset = open_dataset(table, lake_dir)
+    time = ds.field(spec.time_column)
+    conditions: List[ds.Expression] = []
+    if asset_ids is not None:
+        conditions.append(ds.field(spec.asset_column).isin(list(asset_ids)))
+    # The month bounds prune partitions; the time bounds filter within them
+    if start is not None:
+        start = pd.Timestamp(start)
+        start = start.tz_localize('UTC') if start.tzinfo is None else start.tz_convert('UTC')
+        conditions += [ds.field('month') >= start.strftime('%Y-%m'), time >= pa.scalar(start.to_pydatetime(), _TIMESTAMP)]
+    if end is not None:
+        end = pd.Timestamp(end)
+        end = end.tz_localize('UTC') if end.tzinfo is None else end.tz_convert('UTC')
+        conditions += [ds.field('month') <= end.strftime('%Y-%m'), time < pa.scalar(end.to_pydatetime(), _TIMESTAMP)]
+    if filter is not None:
+        conditions.append(filter)
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return dataset.to_table(columns=list(columns) if columns else None, filter=expression).to_pandas()
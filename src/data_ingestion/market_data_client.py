@@ -1,7 +1,10 @@
 """
 Market data client for fetching asset prices using the Alpaca API.
 """
+from typing import List, Optional
+import pandas as pd
 from alpaca_trade_api.rest import REST, TimeFrame
+from .bar_cache import BarCache
 from ..config import settings
 from ..logger import get_logger
 
@@ -11,11 +14,18 @@ class MarketDataClient:
     """
     A client for fetching market data from Alpaca.
     """
-    def __init__(self):
+    def __init__(self, bar_cache: Optional[BarCache] = None):
         """
         Initializes the MarketDataClient.
+
+        Args:
+            bar_cache (BarCache, optional): The on-disk cache for historical bars.
+                Defaults to a cache at settings.BAR_CACHE_DIR; disabled if that is empty.
         """
         self.api = None
+        if bar_cache is None and settings.BAR_CACHE_DIR:
+            bar_cache = BarCache(settings.BAR_CACHE_DIR)
+        self.bar_cache = bar_cache
         try:
             # The same API keys can be used for market data
             self.api = REST(
@@ -50,6 +60,9 @@ class MarketDataClient:
         """
         Fetches historical bar data for a given symbol.
 
+        Bars already in the bar cache are served locally; only the missing
+        dates are requested from Alpaca.
+
         Args:
             symbol (str): The ticker symbol.
             timeframe (TimeFrame): The timeframe for the bars (e.g., TimeFrame.Day).
@@ -59,6 +72,18 @@ class MarketDataClient:
         Returns:
             list: A list of bar objects, or None if an error occurs.
         """
+        if self.bar_cache is None:
+            return self._fetch_historical_bars(symbol, timeframe, start_date, end_date)
+        try:
+            return self.bar_cache.get_bars(symbol, timeframe, start_date, end_date, fetch=self._fetch_historical_bars)
+        except Exception as e:
+            logger.error(f"Bar cache failed for {symbol}, fetching directly: {e}")
+            return self._fetch_historical_bars(symbol, timeframe, start_date, end_date)
+
+    def _fetch_historical_bars(self, symbol: str, timeframe: TimeFrame, start_date: str, end_date: str):
+        """
+        Fetches historical bar data for a given symbol from Alpaca, bypassing the cache.
+        """
         try:
             bars = self.api.get_bars(symbol, timeframe, start_date, end_date).df
             logger.debug(f"Fetched {len(bars)} historical bars for {symbol} from {start_date} to {end_date}.")
@@ -67,6 +92,37 @@ class MarketDataClient:
             logger.error(f"Failed to get historical bars for {symbol}: {e}")
             return None
 
+    def get_historical_bars_multi(self, symbols: List[str], timeframe: TimeFrame, start_date: str, end_date: str,
+                                  chunk_size: int = 200):
+        """
+        Fetches historical bar data for many symbols with Alpaca's multi-symbol bars endpoint.
+
+        Symbols are requested in chunks of `chunk_size`, so the number of requests
+        grows with the number of chunks rather than the number of symbols.
+
+        Args:
+            symbols (List[str]): The ticker symbols.
+            timeframe (TimeFrame): The timeframe for the bars (e.g., TimeFrame.Day).
+            start_date (str): The start date in ISO format (YYYY-MM-DD).
+            end_date (str): The end date in ISO format (YYYY-MM-DD).
+            chunk_size (int): Maximum number of symbols per request.
+
+        Returns:
+            pd.DataFrame: The bars of all symbols with a 'symbol' column, or None if an error occurs.
+        """
+        frames = []
+        for i in range(0, len(symbols), chunk_size):
+            chunk = symbols[i:i + chunk_size]
+            try:
+                bars = self.api.get_bars(chunk, timeframe, start_date, end_date).df
+                logger.debug(f"Fetched {len(bars)} historical bars for {len(chunk)} symbols from {start_date} to {end_date}.")
+            except Exception as e:
+                logger.error(f"Failed to get historical bars for symbols {chunk[0]}..{chunk[-1]}: {e}")
+                return None
+            if not bars.empty:
+                frames.append(bars)
+        return pd.concat(frames) if frames else pd.DataFrame()
+
 if __name__ == '__main__':
     # Example usage:
     # Ensure your .env file has valid Alpaca API keys.
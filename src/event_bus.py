@@ -0,0 +1,274 @@
+"""
+Typed pipeline events on Redis Streams.
+
+Producers append an event to its type's stream once the data it describes is
+committed; downstream stages read the streams through a consumer group and
+react as soon as an event arrives, instead of polling the newest row on a
+timer. Each group sees every event once: an event is acknowledged only after
+its handler succeeds, and events left unacknowledged by a crashed consumer are
+claimed by another member of the group.
+
+Every event is also broadcast on a pub/sub channel named after its stream,
+for process-local caches that must hear about changes in every process
+rather than once per group; see `subscribe`.
+"""
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Callable, ClassVar, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+import redis
+from pydantic import BaseModel, ValidationError
+
+from .connections import get_redis_connection
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Approximate number of events retained per stream
+STREAM_MAXLEN = 100_000
+
+class Event(BaseModel):
+    """Base class of pipeline events; `timestamp` is the time of the data the event describes."""
+    stream: ClassVar[str]
+    timestamp: datetime
+
+class FearGreedUpdated(Event):
+    """New Fear & Greed Index values were stored; carries the newest."""
+    stream: ClassVar[str] = "events:fear_greed"
+    value: int
+    value_classification: Optional[str] = None
+
+class BarsIngested(Event):
+    """New OHLCV bars were stored for an asset; `timestamp` is the newest bar."""
+    stream: ClassVar[str] = "events:market_data"
+    asset_id: int
+    first_timestamp: datetime
+    count: int
+
+class SentimentIngested(Event):
+    """A new social sentiment reading was stored."""
+    stream: ClassVar[str] = "events:social_sentiment"
+    asset_id: int
+    source: str
+    sentiment_score: float
+
+class SentimentAggregated(Event):
+    """A new market_sentiment row was stored."""
+    stream: ClassVar[str] = "events:market_sentiment"
+    sentiment_id: int
+    composite_score: float
+    confidence_score: float
+
+class RegimeUpdated(Event):
+    """A new market_regime row was stored."""
+    stream: ClassVar[str] = "events:market_regime"
+    regime_id: int
+    sentiment_id: int
+    zone: str
+
+class SignalStored(Event):
+    """A trade signal was stored."""
+    stream: ClassVar[str] = "events:trade_signals"
+    asset_id: int
+    signal_id: int
+
+EVENT_TYPES: Dict[str, Type[Event]] = {
+    event_type.stream: event_type
+    for event_type in (FearGreedUpdated, BarsIngested, SentimentIngested, SentimentAggregated,
+                       RegimeUpdated, SignalStored)
+}
+
+def publish(event: Event, redis_conn: Optional[redis.Redis] = None) -> Optional[str]:
+    """
+    Appends an event to its stream and broadcasts it on the stream's pub/sub channel.
+
+    Args:
+        event (Event): The event to publish.
+        redis_conn (redis.Redis, optional): The Redis client. Defaults to the shared pool.
+
+    Returns:
+        Optional[str]: The stream entry id, or None if Redis is unavailable. Publishing never
+            raises, so a Redis outage does not fail the write the event describes.
+    """
+    try:
+        redis_conn = redis_conn or get_redis_connection()
+        data = event.model_dump_json()
+        pipe = redis_conn.pipeline(transaction=False)
+        pipe.xadd(event.stream, {'data': data}, maxlen=STREAM_MAXLEN, approximate=True)
+        pipe.publish(event.stream, data)
+        return pipe.execute()[0]
+    except redis.RedisError as e:
+        logger.error(f"Could not publish {type(event).__name__} to {event.stream}: {e}")
+        return None
+
+def latest_event(event_type: Type[Event], redis_conn: Optional[redis.Redis] = None) -> Optional[Event]:
+    """Returns the newest event on a stream without consuming it, or None if there is none."""
+    redis_conn = redis_conn or get_redis_connection()
+    entries = redis_conn.xrevrange(event_type.stream, count=1)
+    return event_type.model_validate_json(entries[0][1]['data']) if entries else None
+
+def subscribe(event_types: Sequence[Type[Event]], handler: Callable[[Event], None],
+              on_status: Optional[Callable[[bool], None]] = None,
+              stop: Optional[threading.Event] = None, poll_seconds: float = 1.0):
+    """
+    Calls `handler` with every event broadcast from now on, until `stop` is set.
+
+    Unlike EventConsumer, nothing is persisted: events published while the
+    subscriber is disconnected are lost, so callers holding state derived from
+    them should drop it when `on_status` reports a change. Connection errors
+    are logged and the subscription is retried.
+
+    Args:
+        event_types (Sequence[Type[Event]]): The events to receive.
+        handler (Callable[[Event], None]): Called with each event.
+        on_status (Callable[[bool], None], optional): Called with True once subscribed and False when
+            the subscription is lost.
+        stop (threading.Event, optional): Set to return.
+        poll_seconds (float): How long each wait for a message lasts. Keep below the Redis socket_timeout.
+    """
+    stop = stop or threading.Event()
+    on_status = on_status or (lambda connected: None)
+    channels = {event_type.stream: event_type for event_type in event_types}
+    while not stop.is_set():
+        pubsub = get_redis_connection().pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(*channels)
+            on_status(True)
+            while not stop.is_set():
+                message = pubsub.get_message(timeout=poll_seconds)
+                if message is None:
+                    continue
+                try:
+                    event = channels[message['channel']].model_validate_json(message['data'])
+                except (KeyError, ValidationError) as e:
+                    logger.error(f"Skipping malformed broadcast on {message.get('channel')}: {e}")
+                    continue
+                handler(event)
+        except redis.RedisError as e:
+            logger.error(f"Subscription to {', '.join(channels)} lost: {e}")
+            on_status(False)
+            time.sleep(1)
+        finally:
+            pubsub.close()
+
+class EventConsumer:
+    """
+    Reads events for one consumer group.
+
+    Start one EventConsumer per process in each downstream stage; members of a
+    group share its events between them.
+    """
+    def __init__(self, group: str, event_types: Sequence[Type[Event]], consumer: Optional[str] = None,
+                 batch_size: int = 100, block_ms: int = 1000, claim_idle_ms: int = 60_000):
+        """
+        Initializes the EventConsumer.
+
+        Args:
+            group (str): The consumer group, usually the name of the stage.
+            event_types (Sequence[Type[Event]]): The events to consume.
+            consumer (str, optional): This member's name. Defaults to the host name and process id.
+            batch_size (int): Maximum events read per stream per call.
+            block_ms (int): How long a read waits for new events. Keep below the Redis
+                socket_timeout in configs/redis.yaml.
+            claim_idle_ms (int): Unacknowledged events idle this long are claimed from other members.
+        """
+        self.group = group
+        self.streams = [event_type.stream for event_type in event_types]
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self._groups_created = False
+
+    def _ensure_groups(self, redis_conn: redis.Redis):
+        """Creates the consumer group on each stream; a new group starts with events published from now on."""
+        for stream in self.streams:
+            try:
+                redis_conn.xgroup_create(stream, self.group, id='$', mkstream=True)
+            except redis.ResponseError as e:
+                if 'BUSYGROUP' not in str(e):
+                    raise
+        self._groups_created = True
+
+    def _decode(self, stream: str, messages: Iterable) -> List[Tuple[str, str, Optional[Event]]]:
+        events = []
+        for message_id, fields in messages:
+            if not fields: # Trimmed from the stream before it was processed
+                events.append((stream, message_id, None))
+                continue
+            try:
+                events.append((stream, message_id, EVENT_TYPES[stream].model_validate_json(fields['data'])))
+            except (KeyError, ValidationError) as e:
+                logger.error(f"Skipping malformed event {message_id} on {stream}: {e}")
+                events.append((stream, message_id, None))
+        return events
+
+    def read(self) -> List[Tuple[str, str, Optional[Event]]]:
+        """
+        Returns the next batch of (stream, id, event) entries, waiting up to `block_ms` for new ones.
+        Events abandoned by other members are returned first. Entries that cannot be decoded have
+        an event of None and should be acknowledged without processing.
+        """
+        redis_conn = get_redis_connection()
+        if not self._groups_created:
+            self._ensure_groups(redis_conn)
+
+        events = []
+        for stream in self.streams:
+            _, messages, *_ = redis_conn.xautoclaim(stream, self.group, self.consumer, self.claim_idle_ms,
+                                                    start_id='0-0', count=self.batch_size)
+            events.extend(self._decode(stream, messages))
+        if events:
+            return events
+
+        response = redis_conn.xreadgroup(self.group, self.consumer, {stream: '>' for stream in self.streams},
+                                         count=self.batch_size, block=self.block_ms)
+        for stream, messages in response or []:
+            events.extend(self._decode(stream, messages))
+        return events
+
+    def ack(self, entries: Iterable[Tuple[str, str, Optional[Event]]]):
+        """Acknowledges processed entries so they are not delivered again."""
+        by_stream: Dict[str, List[str]] = {}
+        for stream, message_id, _ in entries:
+            by_stream.setdefault(stream, []).append(message_id)
+        redis_conn = get_redis_connection()
+        for stream, message_ids in by_stream.items():
+            redis_conn.xack(stream, self.group, *message_ids)
+
+    def run(self, handler: Callable[[List[Event]], None], stop: Optional[threading.Event] = None):
+        """
+        Calls `handler` with each batch of events until `stop` is set or the process is interrupted.
+
+        A batch is acknowledged after the handler returns. If the handler raises, the batch stays
+        pending and is delivered again once it has been idle for `claim_idle_ms`.
+        """
+        stop = stop or threading.Event()
+        logger.info(f"Consumer {self.consumer} of group '{self.group}' listening on {', '.join(self.streams)}.")
+        try:
+            while not stop.is_set():
+                try:
+                    entries = self.read()
+                except redis.RedisError as e:
+                    logger.error(f"Event read failed for group '{self.group}': {e}")
+                    self._groups_created = False
+                    time.sleep(1)
+                    continue
+                if not entries:
+                    continue
+                events = [event for _, _, event in entries if event is not None]
+                try:
+                    if events:
+                        handler(events)
+                except Exception as e:
+                    logger.error(f"Handler of group '{self.group}' failed on {len(events)} events: {e}")
+                    continue
+                try:
+                    self.ack(entries)
+                except redis.RedisError as e:
+                    logger.error(f"Event ack failed for group '{self.group}': {e}")
+        except KeyboardInterrupt:
+            logger.info(f"Consumer {self.consumer} of group '{self.group}' stopped.")
@@ -3,6 +3,8 @@ Main application entry point for the Fear & Greed Trading Framework.
 
 This script initializes the necessary components and runs the main trading loop.
 """
+import asyncio
+import statistics
 import time
 from src.logger import get_logger
 from src.config import settings
@@ -10,10 +12,104 @@ from src.execution.alpaca_client import AlpacaClient
 from src.data_ingestion.market_data_client import MarketDataClient
 from src.sentiment_engine.sentiment_analyzer import SentimentAnalyzer
 from src.strategies.fear_greed_strategy import FearGreedStrategy
+from src.replay.clients import (
+    RecordingAlpacaClient, RecordingMarketDataClient, ReplayAlpacaClient, ReplayClock, ReplayMarketDataClient,
+)
+from src.replay.session_log import SessionLog, SessionRecorder
+from src.utils.time_helpers import WallClock, seconds_until_next_tick
 
 # Initialize logger
 logger = get_logger(__name__)
 
+async def run_cycle(alpaca_client: AlpacaClient, market_data_client: MarketDataClient,
+                    sentiment_analyzer: SentimentAnalyzer, strategy: FearGreedStrategy,
+                    symbol: str = 'SPY', deadline: float = 30.0):
+    """
+    Runs a single fetch-score-decide cycle.
+
+    The Fear & Greed data, the account check and the latest quote are fetched
+    concurrently; if they have not all arrived within `deadline` seconds the
+    cycle is skipped.
+
+    Returns:
+        float: The cycle latency in seconds, or None if the cycle was skipped.
+    """
+    cycle_start = time.perf_counter()
+
+    # 1. Fetch the index inputs, account and quote concurrently.
+    try:
+        fear_greed_index, account, quote = await asyncio.wait_for(
+            asyncio.gather(
+                sentiment_analyzer.calculate_fear_greed_index_async(symbol),
+                asyncio.to_thread(alpaca_client.check_connection),
+                asyncio.to_thread(market_data_client.get_latest_quote, symbol),
+            ),
+            timeout=deadline,
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"Cycle data did not arrive within {deadline:.1f}s deadline. Skipping cycle.")
+        return None
+    data_latency = time.perf_counter() - cycle_start
+
+    if account is None:
+        logger.error("Alpaca account check failed. Skipping trade decision for this cycle.")
+        return None
+    if quote is not None:
+        logger.info(f"Latest {symbol} quote: bid {quote.get('bp')} / ask {quote.get('ap')}")
+
+    # 2. Generate a trade signal using the strategy module.
+    signal = strategy.generate_signal(fear_greed_index)
+
+    logger.info(f"Generated Signal: {signal}")
+
+    # 3. Execute the trade based on the signal.
+    if signal == "BUY":
+        logger.info("Executing BUY order.")
+        # await asyncio.to_thread(alpaca_client.place_order, symbol=symbol, qty=1, side='buy')
+    elif signal == "SELL":
+        logger.info("Executing SELL order.")
+        # await asyncio.to_thread(alpaca_client.place_order, symbol=symbol, qty=1, side='sell')
+    else:
+        logger.info("No action taken for HOLD signal.")
+
+    cycle_latency = time.perf_counter() - cycle_start
+    logger.info(f"Cycle latency: {cycle_latency * 1000:.0f} ms (data fetch {data_latency * 1000:.0f} ms)")
+    return cycle_latency
+
+async def run_trading_loop(alpaca_client: AlpacaClient, market_data_client: MarketDataClient,
+                           sentiment_analyzer: SentimentAnalyzer, strategy: FearGreedStrategy, clock=None):
+    """
+    Runs cycles on fixed clock boundaries until cancelled or the clock runs out.
+
+    Args:
+        clock: Schedules the cycles. Defaults to the wall clock; replay runs
+            pass an accelerated ReplayClock.
+    """
+    clock = clock or WallClock()
+    interval = settings.LOOP_INTERVAL_SECONDS
+    latencies = []
+    while not clock.finished():
+        # Sleep until the next clock boundary (e.g., the next 5-minute mark)
+        delay = seconds_until_next_tick(interval, clock.time())
+        logger.info(f"--- Sleeping {delay:.1f}s until next cycle ---")
+        await clock.sleep(delay)
+        if clock.finished():
+            break
+
+        try:
+            latency = await run_cycle(alpaca_client, market_data_client, sentiment_analyzer, strategy,
+                                      deadline=settings.CYCLE_DEADLINE_SECONDS)
+            if latency is not None:
+                latencies.append(latency)
+        except Exception as e:
+            logger.error(f"An unexpected error occurred in the trading cycle: {e}", exc_info=True)
+
+    if latencies:
+        logger.info(
+            f"--- Ran {len(latencies)} cycles: mean latency {statistics.mean(latencies) * 1000:.1f} ms, "
+            f"max {max(latencies) * 1000:.1f} ms ---"
+        )
+
 def main():
     """
     The main function that runs the trading framework.
@@ -22,53 +118,47 @@ def main():
     logger.info(f"Log Level set to: {settings.LOG_LEVEL}")
 
     # --- Initialize API Clients ---
-    if settings.EXCHANGE_API_KEY == "your_api_key_here":
-        logger.error("Alpaca API keys are not set. Please update your .env file.")
-        return
+    clock = None
+    recorder = None
+    if settings.SESSION_REPLAY_PATH:
+        # Serve a recorded session back without touching the network
+        session_log = SessionLog(settings.SESSION_REPLAY_PATH)
+        clock = ReplayClock(session_log.started_at, session_log.ended_at, speed=settings.SESSION_REPLAY_SPEED)
+        alpaca_client = ReplayAlpacaClient(session_log, clock)
+        market_data_client = ReplayMarketDataClient(session_log, clock)
+        logger.info(f"Replaying session {settings.SESSION_REPLAY_PATH} at {settings.SESSION_REPLAY_SPEED}x.")
+    else:
+        if settings.EXCHANGE_API_KEY == "your_api_key_here":
+            logger.error("Alpaca API keys are not set. Please update your .env file.")
+            return
+        alpaca_client = AlpacaClient()
+        market_data_client = MarketDataClient()
+        if settings.SESSION_RECORD_PATH:
+            recorder = SessionRecorder(settings.SESSION_RECORD_PATH)
+            alpaca_client = RecordingAlpacaClient(alpaca_client, recorder)
+            market_data_client = RecordingMarketDataClient(market_data_client, recorder)
 
-    alpaca_client = AlpacaClient()
     if not alpaca_client.check_connection():
         logger.error("Failed to connect to Alpaca. Exiting.")
         return
     logger.info("Successfully connected to Alpaca paper trading.")
-
-    market_data_client = MarketDataClient()
     logger.info("Market data client initialized.")
 
     # --- Initialize Core Components ---
-    sentiment_analyzer = SentimentAnalyzer(market_data_client)
+    sentiment_analyzer = SentimentAnalyzer(market_data_client, use_streaming_indicators=True)
     strategy = FearGreedStrategy(buy_threshold=30, sell_threshold=70)
     logger.info("Core components initialized.")
 
     # --- Main Application Loop ---
     try:
-        while True:
-            # 1. Calculate the Fear & Greed index.
-            fear_greed_index = sentiment_analyzer.calculate_fear_greed_index('SPY')
-
-            # 2. Generate a trade signal using the strategy module.
-            signal = strategy.generate_signal(fear_greed_index)
-            
-            logger.info(f"Generated Signal: {signal}")
-
-            # 3. Execute the trade based on the signal.
-            if signal == "BUY":
-                logger.info("Executing BUY order.")
-                # alpaca_client.place_order(symbol='SPY', qty=1, side='buy')
-            elif signal == "SELL":
-                logger.info("Executing SELL order.")
-                # alpaca_client.place_order(symbol='SPY', qty=1, side='sell')
-            else:
-                logger.info("No action taken for HOLD signal.")
-
-            # Sleep for a defined interval (e.g., 5 minutes)
-            logger.info("--- Loop finished, sleeping for 5 minutes ---")
-            time.sleep(300)
-
+        asyncio.run(run_trading_loop(alpaca_client, market_data_client, sentiment_analyzer, strategy, clock=clock))
     except KeyboardInterrupt:
         logger.info("--- Shutting down framework ---")
     except Exception as e:
         logger.error(f"An unexpected error occurred in the main loop: {e}", exc_info=True)
+    finally:
+        if recorder:
+            recorder.close()
 
 if __name__ == "__main__":
     main()
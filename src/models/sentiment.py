@@ -26,6 +26,7 @@ class MarketSentiment(Base):
     options_weight = Column(Float)
     composite_score = Column(Float, nullable=False)
     confidence_score = Column(Float, nullable=False)
+    updated_at = Column(DateTime) # Set by the database on insert and update
 
     __table_args__ = (UniqueConstraint('timestamp', name='uq_market_sentiment_timestamp'),)
 
@@ -25,6 +25,7 @@ class TradeSignal(Base):
     ttl = Column(DateTime)
     is_executed = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime) # Set by the database on insert and update
 
 class TradeSignalSchema(BaseModel):
     signal_id: Optional[int] = None
@@ -0,0 +1,141 @@
+"""
+Recording and replay stand-ins for MarketDataClient and AlpacaClient.
+
+The recording clients wrap the real ones and log every get_historical_bars,
+get_latest_quote, account check (get_account) and place_order (submit_order)
+call. The replay clients serve those results back from the log without any
+network access, at a configurable speed, so the real main loop can be run
+and profiled offline.
+"""
+import asyncio
+import time
+from typing import List
+
+from .session_log import SessionLog, SessionRecorder
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+class RecordingMarketDataClient:
+    """
+    Wraps a MarketDataClient and records its calls to a session log.
+    """
+    def __init__(self, client, recorder: SessionRecorder):
+        self.client = client
+        self.recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def get_latest_quote(self, symbol: str):
+        return self.recorder.record('get_latest_quote', symbol, (symbol,),
+                                    self.client.get_latest_quote, symbol)
+
+    def get_historical_bars(self, symbol: str, timeframe, start_date: str, end_date: str):
+        return self.recorder.record('get_historical_bars', symbol, (symbol, str(timeframe), start_date, end_date),
+                                    self.client.get_historical_bars, symbol, timeframe, start_date, end_date)
+
+    def get_historical_bars_multi(self, symbols: List[str], timeframe, start_date: str, end_date: str, chunk_size: int = 200):
+        return self.recorder.record('get_historical_bars_multi', ','.join(symbols), (str(timeframe), start_date, end_date),
+                                    self.client.get_historical_bars_multi, symbols, timeframe, start_date, end_date,
+                                    chunk_size=chunk_size)
+
+class RecordingAlpacaClient:
+    """
+    Wraps an AlpacaClient and records its calls to a session log.
+    """
+    def __init__(self, client, recorder: SessionRecorder):
+        self.client = client
+        self.recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def check_connection(self):
+        return self.recorder.record('check_connection', 'account', (), self.client.check_connection)
+
+    def place_order(self, symbol: str, qty: float, side: str, order_type: str = 'market', time_in_force: str = 'gtc'):
+        return self.recorder.record('place_order', symbol, (symbol, qty, side, order_type, time_in_force),
+                                    self.client.place_order, symbol, qty, side, order_type, time_in_force)
+
+class ReplayClock:
+    """
+    A simulated clock that starts at the recording's start time and ends where
+    the recording ends.
+
+    Simulated time only advances while the loop sleeps, so a replay runs the
+    same cycles as the recording regardless of how fast the machine is; `speed`
+    sets how much real time each simulated second of sleep and of recorded call
+    latency takes.
+    """
+    def __init__(self, started_at: float, ended_at: float, speed: float = 1.0):
+        """
+        Initializes the ReplayClock.
+
+        Args:
+            started_at (float): Recorded start time, in seconds since the epoch.
+            ended_at (float): Recorded end time, in seconds since the epoch.
+            speed (float): Replay speed multiplier (e.g., 1.0 for real time, 1000.0 for 1000x).
+        """
+        if speed <= 0:
+            raise ValueError("Replay speed must be positive.")
+        self.started_at = started_at
+        self.ended_at = ended_at
+        self.speed = speed
+        self._now = started_at
+
+    def time(self) -> float:
+        """Returns the current simulated time in seconds since the epoch."""
+        return self._now
+
+    async def sleep(self, seconds: float):
+        """Advances the simulated time, sleeping for the scaled real time."""
+        self._now += seconds
+        await asyncio.sleep(seconds / self.speed)
+
+    def finished(self) -> bool:
+        """Returns True once the simulated time has passed the end of the recording."""
+        return self._now >= self.ended_at
+
+    def wait_call(self, duration: float):
+        """Blocks for the recorded duration of a call, scaled by the replay speed."""
+        time.sleep(duration / self.speed)
+
+class _ReplayClient:
+    def __init__(self, session_log: SessionLog, clock: ReplayClock):
+        self.session_log = session_log
+        self.clock = clock
+
+    def _replay(self, method: str, key: str):
+        call = self.session_log.next_call(method, key)
+        if call is None:
+            logger.warning(f"No recorded {method} call left for {key}.")
+            return None
+        result, duration = call
+        self.clock.wait_call(duration)
+        return result
+
+class ReplayMarketDataClient(_ReplayClient):
+    """
+    Serves recorded MarketDataClient results from a session log.
+    """
+    bar_cache = None
+
+    def get_latest_quote(self, symbol: str):
+        return self._replay('get_latest_quote', symbol)
+
+    def get_historical_bars(self, symbol: str, timeframe, start_date: str, end_date: str):
+        return self._replay('get_historical_bars', symbol)
+
+    def get_historical_bars_multi(self, symbols: List[str], timeframe, start_date: str, end_date: str, chunk_size: int = 200):
+        return self._replay('get_historical_bars_multi', ','.join(symbols))
+
+class ReplayAlpacaClient(_ReplayClient):
+    """
+    Serves recorded AlpacaClient results from a session log.
+    """
+    def check_connection(self):
+        return self._replay('check_connection', 'account')
+
+    def place_order(self, symbol: str, qty: float, side: str, order_type: str = 'market', time_in_force: str = 'gtc'):
+        return self._replay('place_order', symbol)
@@ -0,0 +1,142 @@
+"""
+Compact on-disk log of API interactions for record-and-replay runs.
+
+A session log is a gzip-compressed JSON-lines file. The first line is a header
+with the recording start time; every following line is one client call with
+its wall-clock start time, duration, arguments and result. DataFrames are
+stored column-wise so bar responses round-trip without pickling.
+"""
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+LOG_FORMAT_VERSION = 1
+
+def _encode(value: Any) -> Any:
+    """Converts a client result into a JSON-serializable value."""
+    if isinstance(value, pd.DataFrame):
+        return {
+            '__dataframe__': {
+                'index': [ts.isoformat() for ts in value.index] if isinstance(value.index, pd.DatetimeIndex) else list(value.index),
+                'index_name': value.index.name,
+                'columns': list(value.columns),
+                'data': value.to_numpy().tolist(),
+            }
+        }
+    return value
+
+def _decode(value: Any) -> Any:
+    """Restores a value written by _encode."""
+    if isinstance(value, dict) and '__dataframe__' in value:
+        frame = value['__dataframe__']
+        index = pd.DatetimeIndex(pd.to_datetime(frame['index']), name=frame['index_name']) if frame['index'] else None
+        return pd.DataFrame(frame['data'], index=index, columns=frame['columns'])
+    return value
+
+class SessionRecorder:
+    """
+    Appends client calls to a session log as they happen.
+    """
+    def __init__(self, path: str):
+        """
+        Initializes the SessionRecorder and writes the log header.
+
+        Args:
+            path (str): Path of the session log to create.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+        self._write({'version': LOG_FORMAT_VERSION, 'started_at': time.time()})
+        logger.info(f"Recording client interactions to {path}.")
+
+    def _write(self, entry: Dict[str, Any]):
+        with self._lock:
+            self._file.write(json.dumps(entry, default=str) + '\n')
+            self._file.flush()
+
+    def record(self, method: str, key: str, args: Tuple, call: Callable, *call_args, **call_kwargs) -> Any:
+        """
+        Runs a client call and appends it to the log.
+
+        Args:
+            method (str): Name of the client method.
+            key (str): Replay key for the call, usually the symbol.
+            args (Tuple): Arguments to store with the call, for inspection.
+            call (Callable): The client method to run.
+
+        Returns:
+            Any: The result of the call.
+        """
+        started_at = time.time()
+        result = call(*call_args, **call_kwargs)
+        self._write({
+            't': started_at,
+            'dur': time.time() - started_at,
+            'm': method,
+            'k': key,
+            'a': list(args),
+            'r': _encode(result),
+        })
+        return result
+
+    def close(self):
+        """Closes the session log."""
+        with self._lock:
+            self._file.close()
+
+class SessionLog:
+    """
+    A recorded session loaded for replay.
+
+    Calls are served back in recorded order per method and key, so the
+    arguments do not need to match exactly (date ranges derived from the
+    current time differ between recording and replay).
+    """
+    def __init__(self, path: str):
+        """
+        Loads a session log.
+
+        Args:
+            path (str): Path of the session log to read.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[str, str], deque] = defaultdict(deque)
+        self.started_at: Optional[float] = None
+        self.ended_at: Optional[float] = None
+
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header.get('version') != LOG_FORMAT_VERSION:
+                raise ValueError(f"Unsupported session log version: {header.get('version')}")
+            self.started_at = header['started_at']
+            self.ended_at = self.started_at
+            count = 0
+            for line in f:
+                entry = json.loads(line)
+                self._calls[(entry['m'], entry['k'])].append(entry)
+                self.ended_at = max(self.ended_at, entry['t'] + entry['dur'])
+                count += 1
+        logger.info(f"Loaded {count} recorded calls from {path}.")
+
+    def next_call(self, method: str, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Returns the next recorded result and its duration for a method and key,
+        or None if the recording has no more calls for them.
+        """
+        with self._lock:
+            calls = self._calls.get((method, key))
+            if not calls:
+                return None
+            entry = calls.popleft()
+        return _decode(entry['r']), entry['dur']
@@ -1,12 +1,17 @@
 """
 Sentiment Engine for calculating the Fear & Greed Index.
 """
+import asyncio
+import threading
 import numpy as np
 import pandas as pd
 from alpaca_trade_api.rest import TimeFrame
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from .streaming_indicators import StreamingIndicators
 from ..data_ingestion.market_data_client import MarketDataClient
 from ..logger import get_logger
+from ..utils.time_helpers import WallClock
 
 logger = get_logger(__name__)
 
@@ -14,17 +19,37 @@ class SentimentAnalyzer:
     """
     Calculates the Fear & Greed Index based on market data.
     """
-    def __init__(self, market_data_client: MarketDataClient):
+    VOLATILITY_WINDOW = 30
+    MOMENTUM_WINDOW = 125
+    TRADING_DAYS_PER_YEAR = 252
+    # Volatility readings that fit in the 90-day window of the per-call path
+    STREAMING_VOLATILITY_LOOKBACK = 33
+
+    def __init__(self, market_data_client: MarketDataClient, use_streaming_indicators: bool = False, clock=None):
         """
         Initializes the SentimentAnalyzer.
 
         Args:
             market_data_client (MarketDataClient): The client for fetching market data.
+            use_streaming_indicators (bool): If True, calculate_fear_greed_index keeps
+                rolling indicator state per symbol and only feeds it the new bars,
+                instead of recomputing the windows from scratch on every call.
+            clock: Source of the current time for the data windows. Defaults to the
+                wall clock; backtests pass a simulated clock.
         """
         self.market_data_client = market_data_client
         self.volatility_weight = 0.40
         self.momentum_weight = 0.30
         self.social_sentiment_weight = 0.30
+        self.use_streaming_indicators = use_streaming_indicators
+        self._indicator_states: Dict[str, StreamingIndicators] = {}
+        self._indicator_locks: Dict[str, threading.Lock] = {}
+        self._indicator_locks_guard = threading.Lock()
+        self.clock = clock or WallClock()
+
+    def _now(self) -> datetime:
+        """Returns the current time in UTC according to the analyzer's clock."""
+        return datetime.fromtimestamp(self.clock.time(), tz=timezone.utc)
 
     def _get_volatility_score(self, symbol: str = 'SPY') -> float:
         """
@@ -32,7 +57,7 @@ class SentimentAnalyzer:
         Higher volatility = lower score (more fear).
         """
         try:
-            end_date = datetime.now()
+            end_date = self._now()
             start_date_90 = end_date - timedelta(days=90)
             
             bars = self.market_data_client.get_historical_bars(
@@ -45,7 +70,7 @@ class SentimentAnalyzer:
 
             # Calculate 30-day rolling volatility using a more robust method
             log_returns = np.log(bars['close'] / bars['close'].shift(1))
-            bars['volatility'] = log_returns.rolling(window=30).std() * np.sqrt(252)
+            bars['volatility'] = log_returns.rolling(window=self.VOLATILITY_WINDOW).std() * np.sqrt(self.TRADING_DAYS_PER_YEAR)
             
             current_volatility = bars['volatility'].iloc[-1]
             
@@ -69,7 +94,7 @@ class SentimentAnalyzer:
         Price above 125-day MA = higher score (more greed).
         """
         try:
-            end_date = datetime.now()
+            end_date = self._now()
             start_date = end_date - timedelta(days=200) # Need enough data for 125-day MA
             
             bars = self.market_data_client.get_historical_bars(
@@ -80,7 +105,7 @@ class SentimentAnalyzer:
                 logger.warning("Could not retrieve historical bars for momentum score.")
                 return 50.0
 
-            bars['ma_125'] = bars['close'].rolling(window=125).mean()
+            bars['ma_125'] = bars['close'].rolling(window=self.MOMENTUM_WINDOW).mean()
             
             current_price = bars['close'].iloc[-1]
             current_ma = bars['ma_125'].iloc[-1]
@@ -95,6 +120,62 @@ class SentimentAnalyzer:
             logger.error(f"Error calculating momentum score: {e}", exc_info=True)
             return 50.0
 
+    def _indicator_lock(self, symbol: str) -> threading.Lock:
+        """Returns the lock serializing updates of a symbol's indicator state."""
+        with self._indicator_locks_guard:
+            return self._indicator_locks.setdefault(symbol, threading.Lock())
+
+    def _get_streaming_scores(self, symbol: str = 'SPY') -> Tuple[float, float]:
+        """
+        Updates the rolling indicator state for a symbol with any new bars and
+        returns its volatility and momentum scores.
+
+        Calls for the same symbol are serialized: a worker thread left running by
+        a timed-out cycle finishes its update before the next cycle's starts.
+        """
+        with self._indicator_lock(symbol):
+            return self._update_streaming_scores(symbol)
+
+    def _update_streaming_scores(self, symbol: str) -> Tuple[float, float]:
+        try:
+            state = self._indicator_states.get(symbol)
+            end_date = self._now()
+            if state is None:
+                start_date = end_date - timedelta(days=200) # Seed enough history for the 125-day MA
+            else:
+                start_date = state.last_timestamp # Re-read the last bar in case it was still forming
+
+            bars = self.market_data_client.get_historical_bars(
+                symbol, TimeFrame.Day, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+            )
+
+            if state is None:
+                if bars is None or bars.empty:
+                    logger.warning("Could not retrieve historical bars to seed indicator state.")
+                    return 50.0, 50.0
+                state = StreamingIndicators(
+                    volatility_window=self.VOLATILITY_WINDOW,
+                    momentum_window=self.MOMENTUM_WINDOW,
+                    volatility_lookback=self.STREAMING_VOLATILITY_LOOKBACK,
+                    trading_days_per_year=self.TRADING_DAYS_PER_YEAR,
+                )
+                self._indicator_states[symbol] = state
+            elif bars is None:
+                logger.warning(f"Could not retrieve new bars for {symbol}, using last indicator state.")
+
+            if bars is not None:
+                for timestamp, close in zip(bars.index, bars['close']):
+                    if state.last_timestamp is None or timestamp >= state.last_timestamp:
+                        state.update(timestamp, close)
+
+            volatility_score = state.volatility_score()
+            momentum_score = state.momentum_score()
+            logger.info(f"Volatility score for {symbol}: {volatility_score:.2f}, momentum score: {momentum_score:.2f} (streaming)")
+            return volatility_score, momentum_score
+        except Exception as e:
+            logger.error(f"Error updating indicator state: {e}", exc_info=True)
+            return 50.0, 50.0
+
     def _get_social_sentiment_score(self) -> float:
         """
         Placeholder for social sentiment analysis.
@@ -114,8 +195,11 @@ class SentimentAnalyzer:
         """
         logger.info(f"Calculating Fear & Greed Index for {symbol}...")
         
-        volatility_score = self._get_volatility_score(symbol)
-        momentum_score = self._get_momentum_score(symbol)
+        if self.use_streaming_indicators:
+            volatility_score, momentum_score = self._get_streaming_scores(symbol)
+        else:
+            volatility_score = self._get_volatility_score(symbol)
+            momentum_score = self._get_momentum_score(symbol)
         social_score = self._get_social_sentiment_score()
 
         fear_greed_index = (
@@ -127,6 +211,174 @@ class SentimentAnalyzer:
         logger.info(f"--- Fear & Greed Index: {fear_greed_index:.2f} ---")
         return fear_greed_index
 
+    async def calculate_fear_greed_index_async(self, symbol: str = 'SPY') -> float:
+        """
+        Calculates the final Fear & Greed Index, fetching the volatility and
+        momentum data concurrently in worker threads.
+
+        Args:
+            symbol (str): The ticker symbol to analyze.
+
+        Returns:
+            float: The Fear & Greed Index value (0-100).
+        """
+        logger.info(f"Calculating Fear & Greed Index for {symbol}...")
+
+        if self.use_streaming_indicators:
+            volatility_score, momentum_score = await asyncio.to_thread(self._get_streaming_scores, symbol)
+        else:
+            volatility_score, momentum_score = await asyncio.gather(
+                asyncio.to_thread(self._get_volatility_score, symbol),
+                asyncio.to_thread(self._get_momentum_score, symbol),
+            )
+        social_score = self._get_social_sentiment_score()
+
+        fear_greed_index = (
+            volatility_score * self.volatility_weight +
+            momentum_score * self.momentum_weight +
+            social_score * self.social_sentiment_weight
+        )
+
+        logger.info(f"--- Fear & Greed Index: {fear_greed_index:.2f} ---")
+        return fear_greed_index
+
+    def compute_index_series(self, bars: pd.DataFrame, volatility_lookback: Optional[int] = None) -> pd.DataFrame:
+        """
+        Calculates the Fear & Greed Index for every bar of a price history in one pass.
+
+        Row i holds the same values that calculate_fear_greed_index returns when the
+        market data client serves bars.iloc[:i + 1], so backtests can use this instead
+        of re-running the single-point calculation once per day.
+
+        Args:
+            bars (pd.DataFrame): Historical bars with a 'close' column, oldest first.
+            volatility_lookback (int, optional): Number of volatility observations the
+                percentile is ranked against. Defaults to the full history seen so far.
+
+        Returns:
+            pd.DataFrame: The component scores and the index, aligned with `bars`.
+        """
+        close = bars['close']
+
+        log_returns = np.log(close / close.shift(1))
+        volatility = log_returns.rolling(window=self.VOLATILITY_WINDOW).std() * np.sqrt(self.TRADING_DAYS_PER_YEAR)
+
+        # Rank each volatility reading against the readings available at that bar.
+        # A missing reading falls back to the last ranked one, as the per-day path does.
+        has_volatility = volatility.notna().to_numpy()
+        valid_volatility = volatility[has_volatility]
+        if volatility_lookback is None:
+            ranks = valid_volatility.expanding().rank(pct=True)
+        else:
+            ranks = valid_volatility.rolling(window=volatility_lookback, min_periods=1).rank(pct=True)
+        percentile = pd.Series(np.nan, index=bars.index)
+        percentile[has_volatility] = ranks.to_numpy()
+        volatility_score = ((1 - percentile.ffill()) * 100).fillna(50.0)
+
+        ma_125 = close.rolling(window=self.MOMENTUM_WINDOW).mean()
+        momentum_score = (50 * (close / ma_125)).clip(lower=0, upper=100)
+
+        social_score = pd.Series(self._get_social_sentiment_score(), index=bars.index)
+
+        fear_greed_index = (
+            volatility_score * self.volatility_weight +
+            momentum_score * self.momentum_weight +
+            social_score * self.social_sentiment_weight
+        )
+
+        logger.info(f"Computed Fear & Greed Index series over {len(bars)} bars.")
+        return pd.DataFrame({
+            'volatility': volatility,
+            'volatility_score': volatility_score,
+            'ma_125': ma_125,
+            'momentum_score': momentum_score,
+            'social_score': social_score,
+            'fear_greed_index': fear_greed_index,
+        }, index=bars.index)
+
+    def calculate_fear_greed_index_batch(self, symbols: List[str], chunk_size: int = 200) -> pd.Series:
+        """
+        Calculates the Fear & Greed Index for a universe of symbols.
+
+        Bars are fetched with one multi-symbol request per chunk of symbols and the
+        component scores are computed column-wise on a price matrix. Each value
+        matches what calculate_fear_greed_index returns for that symbol.
+
+        Args:
+            symbols (List[str]): The ticker symbols to analyze.
+            chunk_size (int): Maximum number of symbols per bars request.
+
+        Returns:
+            pd.Series: The Fear & Greed Index value (0-100) for each symbol.
+        """
+        logger.info(f"Calculating Fear & Greed Index for {len(symbols)} symbols...")
+
+        end_date = self._now()
+        start_date = end_date - timedelta(days=200) # Need enough data for 125-day MA
+        start_date_90 = end_date - timedelta(days=90)
+
+        bars = self.market_data_client.get_historical_bars_multi(
+            symbols, TimeFrame.Day, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'), chunk_size=chunk_size
+        )
+
+        if bars is None or bars.empty:
+            logger.warning("Could not retrieve historical bars for the batch.")
+            computed = pd.DataFrame(columns=['volatility_score', 'momentum_score'], dtype=float)
+        else:
+            computed = self._compute_batch_scores(bars, start_date_90.strftime('%Y-%m-%d'))
+
+        # Symbols without bars get the neutral scores of the single-symbol path
+        scores = computed.reindex(pd.Index(symbols, name='symbol'))
+        scores.loc[~scores.index.isin(computed.index)] = 50.0
+
+        fear_greed_index = (
+            scores['volatility_score'] * self.volatility_weight +
+            scores['momentum_score'] * self.momentum_weight +
+            self._get_social_sentiment_score() * self.social_sentiment_weight
+        )
+
+        logger.info(f"--- Fear & Greed Index computed for {fear_greed_index.notna().sum()} of {len(symbols)} symbols ---")
+        return fear_greed_index.rename('fear_greed_index')
+
+    def _compute_batch_scores(self, bars: pd.DataFrame, volatility_start_date: str) -> pd.DataFrame:
+        """
+        Computes the latest volatility and momentum scores of every symbol in a
+        multi-symbol bars frame.
+
+        Args:
+            bars (pd.DataFrame): Bars indexed by timestamp with 'symbol' and 'close' columns.
+            volatility_start_date (str): First date (YYYY-MM-DD) of the volatility window.
+
+        Returns:
+            pd.DataFrame: 'volatility_score' and 'momentum_score' indexed by symbol.
+        """
+        frame = pd.DataFrame({
+            'symbol': bars['symbol'].to_numpy(),
+            'timestamp': bars.index,
+            'close': bars['close'].to_numpy(dtype=float),
+        }).sort_values(['symbol', 'timestamp'], kind='stable')
+
+        volatility_start = pd.Timestamp(volatility_start_date)
+        if frame['timestamp'].dt.tz is not None:
+            volatility_start = volatility_start.tz_localize('UTC')
+        frame['volatility_close'] = frame['close'].where(frame['timestamp'] >= volatility_start)
+
+        # Align every symbol on its position counted back from its latest bar, so each
+        # column is that symbol's own history even when trading days differ.
+        frame['position'] = frame.groupby('symbol').cumcount(ascending=False)
+        closes = frame.pivot(index='position', columns='symbol', values='close').sort_index(ascending=False)
+        volatility_closes = frame.pivot(index='position', columns='symbol', values='volatility_close').sort_index(ascending=False)
+
+        log_returns = np.log(volatility_closes / volatility_closes.shift(1))
+        volatility = log_returns.rolling(window=self.VOLATILITY_WINDOW).std() * np.sqrt(self.TRADING_DAYS_PER_YEAR)
+        percentile = volatility.rank(pct=True).ffill().iloc[-1]
+        volatility_score = ((1 - percentile) * 100).fillna(50.0)
+
+        ma_125 = closes.rolling(window=self.MOMENTUM_WINDOW).mean()
+        momentum_score = (50 * (closes.iloc[-1] / ma_125.iloc[-1])).clip(lower=0, upper=100)
+
+        return pd.DataFrame({'volatility_score': volatility_score, 'momentum_score': momentum_score})
+
 if __name__ == '__main__':
     from ..config import settings
     
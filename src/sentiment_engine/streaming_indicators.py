@@ -0,0 +1,199 @@
+"""
+Incremental indicator state for the live Fear & Greed loop.
+
+Holds the rolling state behind the volatility and momentum scores so that a new
+bar costs a constant number of updates instead of recomputing every window:
+a running sum for the moving average, a windowed Welford variance for the
+volatility and a sorted window of volatility readings for the percentile rank.
+"""
+import math
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from typing import Optional
+
+class StreamingIndicators:
+    """
+    Rolling volatility, volatility percentile and moving average updated one bar at a time.
+    """
+    def __init__(self, volatility_window: int = 30, momentum_window: int = 125,
+                 volatility_lookback: Optional[int] = None, trading_days_per_year: int = 252):
+        """
+        Initializes the StreamingIndicators.
+
+        Args:
+            volatility_window (int): Number of log returns in the rolling volatility.
+            momentum_window (int): Number of closes in the moving average.
+            volatility_lookback (int, optional): Number of volatility readings the current
+                reading is ranked against. Defaults to every reading seen so far.
+            trading_days_per_year (int): Annualization factor for the volatility.
+        """
+        self.volatility_window = volatility_window
+        self.momentum_window = momentum_window
+        self.volatility_lookback = volatility_lookback
+        self._annualization = math.sqrt(trading_days_per_year)
+
+        self.last_timestamp = None
+        self.last_close: Optional[float] = None
+
+        # Moving average: the last `momentum_window` closes and their running sum
+        self._closes = deque()
+        self._close_sum = 0.0
+
+        # Rolling variance of log returns (windowed Welford)
+        self._returns = deque()
+        self._return_mean = 0.0
+        self._return_m2 = 0.0
+
+        # Volatility readings in arrival order and in sorted order for ranking
+        self._readings = deque()
+        self._sorted_readings = []
+        self.volatility: Optional[float] = None
+        self.volatility_percentile: Optional[float] = None
+
+        # Enough information to take back the last update when its bar is revised
+        self._undo = None
+        self._updates_since_resync = 0
+
+    @property
+    def moving_average(self) -> Optional[float]:
+        """The moving average of the last `momentum_window` closes, or None until the window is full."""
+        if len(self._closes) < self.momentum_window:
+            return None
+        return self._close_sum / self.momentum_window
+
+    def update(self, timestamp, close: float):
+        """
+        Adds a bar to the rolling state.
+
+        A bar with the same timestamp as the previous one replaces it, so the
+        still-forming bar of the current period can be updated on every poll.
+
+        Args:
+            timestamp: The bar's timestamp. Bars must arrive in order.
+            close (float): The bar's closing price.
+        """
+        close = float(close)
+        if self._undo is not None and timestamp == self.last_timestamp:
+            self._revert()
+
+        prev_close = self.last_close
+        prev_volatility = self.volatility
+        prev_percentile = self.volatility_percentile
+
+        self._closes.append(close)
+        self._close_sum += close
+        evicted_close = self._closes.popleft() if len(self._closes) > self.momentum_window else None
+        if evicted_close is not None:
+            self._close_sum -= evicted_close
+
+        added_return = None
+        evicted_return = None
+        added_reading = None
+        evicted_reading = None
+        if prev_close is not None:
+            added_return = math.log(close / prev_close)
+            self._add_return(added_return)
+            if len(self._returns) > self.volatility_window:
+                evicted_return = self._returns.popleft()
+                self._remove_return(evicted_return)
+
+            if len(self._returns) == self.volatility_window:
+                variance = max(self._return_m2 / (self.volatility_window - 1), 0.0)
+                added_reading = math.sqrt(variance) * self._annualization
+                self._readings.append(added_reading)
+                insort(self._sorted_readings, added_reading)
+                if self.volatility_lookback is not None and len(self._readings) > self.volatility_lookback:
+                    evicted_reading = self._readings.popleft()
+                    del self._sorted_readings[bisect_left(self._sorted_readings, evicted_reading)]
+                self.volatility = added_reading
+                self.volatility_percentile = self._percentile_rank(added_reading)
+
+        self._undo = (self.last_timestamp, prev_close, prev_volatility, prev_percentile,
+                      evicted_close, added_return, evicted_return, added_reading, evicted_reading)
+        self.last_timestamp = timestamp
+        self.last_close = close
+
+        self._updates_since_resync += 1
+        if self._updates_since_resync >= max(self.volatility_window, self.momentum_window):
+            self._resync()
+
+    def volatility_score(self) -> float:
+        """
+        Returns the volatility score (0-100). Higher volatility = lower score.
+        Neutral (50.0) until the first volatility reading is available.
+        """
+        if self.volatility_percentile is None:
+            return 50.0
+        return (1 - self.volatility_percentile) * 100
+
+    def momentum_score(self) -> float:
+        """
+        Returns the momentum score (0-100). Price above the moving average = higher score.
+        NaN until the moving average window is full.
+        """
+        moving_average = self.moving_average
+        if moving_average is None:
+            return float('nan')
+        return min(max(50 * (self.last_close / moving_average), 0), 100)
+
+    def _percentile_rank(self, value: float) -> float:
+        """Average-method percentile rank of `value` among the readings in the window."""
+        lower = bisect_left(self._sorted_readings, value)
+        upper = bisect_right(self._sorted_readings, value)
+        return (lower + 1 + upper) / 2 / len(self._sorted_readings)
+
+    def _add_return(self, value: float):
+        self._returns.append(value)
+        delta = value - self._return_mean
+        self._return_mean += delta / len(self._returns)
+        self._return_m2 += delta * (value - self._return_mean)
+
+    def _remove_return(self, value: float):
+        count = len(self._returns)
+        if count == 0:
+            self._return_mean = 0.0
+            self._return_m2 = 0.0
+            return
+        delta = value - self._return_mean
+        self._return_mean -= delta / count
+        self._return_m2 -= delta * (value - self._return_mean)
+
+    def _revert(self):
+        """Takes back the last update so its bar can be replaced."""
+        (last_timestamp, prev_close, prev_volatility, prev_percentile,
+         evicted_close, added_return, evicted_return, added_reading, evicted_reading) = self._undo
+
+        self._close_sum -= self._closes.pop()
+        if evicted_close is not None:
+            self._closes.appendleft(evicted_close)
+            self._close_sum += evicted_close
+
+        if added_reading is not None:
+            self._readings.pop()
+            del self._sorted_readings[bisect_left(self._sorted_readings, added_reading)]
+            if evicted_reading is not None:
+                self._readings.appendleft(evicted_reading)
+                insort(self._sorted_readings, evicted_reading)
+
+        if added_return is not None:
+            self._returns.pop()
+            self._remove_return(added_return)
+            if evicted_return is not None:
+                self._returns.appendleft(evicted_return)
+                delta = evicted_return - self._return_mean
+                self._return_mean += delta / len(self._returns)
+                self._return_m2 += delta * (evicted_return - self._return_mean)
+
+        self.last_timestamp = last_timestamp
+        self.last_close = prev_close
+        self.volatility = prev_volatility
+        self.volatility_percentile = prev_percentile
+        self._undo = None
+
+    def _resync(self):
+        """Recomputes the running sums exactly to stop floating-point drift from accumulating."""
+        self._close_sum = math.fsum(self._closes)
+        if self._returns:
+            self._return_mean = math.fsum(self._returns) / len(self._returns)
+            self._return_m2 = math.fsum((r - self._return_mean) ** 2 for r in self._returns)
+        self._updates_since_resync = 0
@@ -0,0 +1,32 @@
+"""
+Clock helpers for scheduling the main loop.
+"""
+import asyncio
+import time
+
+def seconds_until_next_tick(interval: float, now: float = None) -> float:
+    """
+    Returns the number of seconds until the next wall-clock multiple of `interval`.
+
+    Aligning ticks to the clock instead of sleeping a fixed amount after each
+    cycle keeps the schedule from drifting by however long the cycles take.
+    """
+    now = time.time() if now is None else now
+    return interval - (now % interval)
+
+class WallClock:
+    """
+    The real wall clock. The main loop schedules its cycles through a clock
+    object so replay runs can substitute an accelerated one.
+    """
+    def time(self) -> float:
+        """Returns the current time in seconds since the epoch."""
+        return time.time()
+
+    async def sleep(self, seconds: float):
+        """Sleeps for the given number of seconds."""
+        await asyncio.sleep(seconds)
+
+    def finished(self) -> bool:
+        """The wall clock never runs out."""
+        return False
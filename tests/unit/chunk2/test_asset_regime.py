@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from chunks.chunk2_sentiment_engine.classifiers.dynamic_zones import get_default_thresholds
+from chunks.chunk2_sentiment_engine.config import load_sentiment_config
+from chunks.chunk2_sentiment_engine.transitions.asset_regime import REGIME_COLUMNS, update_asset_regimes
+from chunks.chunk2_sentiment_engine.transitions.hysteresis import HysteresisClassifier
+from chunks.chunk2_sentiment_engine.transitions.smoothing_engine import EwmaSmoother
+
+ASSET_IDS = [1, 2, 3, 4, 5, 6]
+
+def _zone_name(value):
+    return None if pd.isna(value) else value
+
+def _score_walks(seed: int, steps: int) -> np.ndarray:
+    """Random walks in [-1, 1], one column per asset, with steps large enough to cross zones often."""
+    rng = np.random.default_rng(seed)
+    return np.clip(np.cumsum(rng.normal(0, 0.2, (steps, len(ASSET_IDS))), axis=0), -1.0, 1.0)
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_vectorized_regimes_match_the_streaming_engine(seed):
+    settings = load_sentiment_config()["regime"]
+    rng = np.random.default_rng(seed + 100)
+    steps = 120
+    scores = _score_walks(seed, steps)
+    # Irregular update times, and assets that miss some cycles for lack of fresh sentiment
+    times = datetime(2024, 1, 1, tzinfo=timezone.utc) + np.cumsum(rng.integers(1, 90, steps)) * timedelta(minutes=1)
+    present = rng.random((steps, len(ASSET_IDS))) > 0.2
+
+    smoothers = {asset_id: EwmaSmoother(settings["smoothing_half_life_minutes"] * 60) for asset_id in ASSET_IDS}
+    classifiers = {asset_id: HysteresisClassifier(get_default_thresholds(), settings["hysteresis_band"],
+                                                  settings["confirm_updates"]) for asset_id in ASSET_IDS}
+    previous = pd.DataFrame(columns=list(REGIME_COLUMNS)).set_index("asset_id")
+
+    for step in range(steps):
+        asset_ids = [asset_id for column, asset_id in enumerate(ASSET_IDS) if present[step, column]]
+        if not asset_ids:
+            continue
+        sentiment = pd.DataFrame({"asset_id": asset_ids,
+                                  "composite_score": scores[step, [ASSET_IDS.index(a) for a in asset_ids]]})
+        regimes = update_asset_regimes(previous, sentiment, times[step])
+
+        for row, score in zip(regimes.itertuples(index=False), sentiment["composite_score"]):
+            smoothed = smoothers[row.asset_id].update(score, times[step])
+            expected = classifiers[row.asset_id].update(smoothed, times[step])
+            assert row.smoothed_score == pytest.approx(smoothed, abs=1e-12)
+            assert row.zone == expected.zone.value
+            assert row.pending_updates == classifiers[row.asset_id].pending_updates
+            assert row.is_transitioning == expected.is_transitioning
+            assert _zone_name(row.next_zone) == (expected.next_zone.value if expected.next_zone else None)
+            assert _zone_name(row.previous_zone) == (expected.previous_zone.value if expected.previous_zone else None)
+
+        previous = pd.concat([previous.drop(index=asset_ids, errors="ignore"), regimes.set_index("asset_id")])
@@ -0,0 +1,32 @@
+import numpy as np
+
+from chunks.chunk2_sentiment_engine.classifiers.dynamic_zones import (
+    ZONES, classify_scores, get_default_thresholds, get_sentiment_zone, zone_edges)
+
+def _expected_codes(scores: np.ndarray, thresholds) -> np.ndarray:
+    return np.array([-1 if np.isnan(score) else ZONES.index(get_sentiment_zone(score, thresholds))
+                     for score in scores.ravel()]).reshape(scores.shape)
+
+def test_classify_scores_matches_get_sentiment_zone():
+    thresholds = get_default_thresholds()
+    rng = np.random.default_rng(0)
+    bounds = [bound for bound_pair in thresholds.values() for bound in bound_pair]
+    scores = np.concatenate([rng.uniform(-1.0, 1.0, 5000), bounds, np.nextafter(bounds, 0.0), [np.nan]])
+
+    np.testing.assert_array_equal(classify_scores(scores, thresholds), _expected_codes(scores, thresholds))
+
+def test_classify_scores_keeps_the_shape_of_2d_scores():
+    thresholds = get_default_thresholds()
+    scores = np.random.default_rng(1).uniform(-1.0, 1.0, (50, 4))
+
+    codes = classify_scores(scores)
+
+    assert codes.shape == scores.shape
+    np.testing.assert_array_equal(codes, _expected_codes(scores, thresholds))
+
+def test_classify_scores_with_per_score_edges():
+    thresholds = get_default_thresholds()
+    scores = np.random.default_rng(2).uniform(-1.0, 1.0, 200)
+    edges = np.tile(zone_edges(thresholds), (len(scores), 1))
+
+    np.testing.assert_array_equal(classify_scores(scores, edges=edges), classify_scores(scores, thresholds))
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.sentiment_engine.sentiment_analyzer import SentimentAnalyzer
+from src.sentiment_engine.streaming_indicators import StreamingIndicators
+
+def _bars(seed: int, length: int = 600) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2015-01-01", periods=length, freq="B")
+    return pd.DataFrame({"close": 100 * np.exp(np.cumsum(rng.normal(0, 0.01, length)))}, index=index)
+
+def _streamed(bars: pd.DataFrame, volatility_lookback, revise_every: int = 0) -> pd.DataFrame:
+    indicators = StreamingIndicators(volatility_lookback=volatility_lookback)
+    rows = []
+    for i, (timestamp, close) in enumerate(zip(bars.index, bars["close"])):
+        if revise_every and i % revise_every == 0:
+            # A still-forming bar, revised twice before it closes
+            indicators.update(timestamp, close * 1.01)
+            indicators.update(timestamp, close * 0.98)
+        indicators.update(timestamp, close)
+        rows.append((indicators.volatility_score(), indicators.momentum_score()))
+    return pd.DataFrame(rows, index=bars.index, columns=["volatility_score", "momentum_score"])
+
+@pytest.mark.parametrize("volatility_lookback", [None, 33])
+@pytest.mark.parametrize("revise_every", [0, 7])
+def test_streaming_scores_match_index_series(volatility_lookback, revise_every):
+    bars = _bars(seed=revise_every + (volatility_lookback or 0))
+    expected = SentimentAnalyzer(None).compute_index_series(bars, volatility_lookback=volatility_lookback)
+    streamed = _streamed(bars, volatility_lookback, revise_every)
+
+    np.testing.assert_allclose(streamed["volatility_score"], expected["volatility_score"], atol=1e-9)
+    np.testing.assert_allclose(streamed["momentum_score"], expected["momentum_score"], atol=1e-9)